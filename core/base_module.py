@@ -1,7 +1,7 @@
 # core/base_module.py
 import dearpygui.dearpygui as dpg
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Sequence, Tuple
 import json
 import logging
 
@@ -16,6 +16,8 @@ class ModuleBase(ABC):
         self.logger = logging.getLogger(module_id)
         self.is_initialized = False
         self.window_tag = f"{module_id}_window"
+        # Tab item -> setup function for tabs whose contents are not built yet
+        self._lazy_tabs: Dict[int, Callable[[], None]] = {}
         
     @abstractmethod
     def initialize(self) -> bool:
@@ -73,6 +75,33 @@ class ModuleBase(ABC):
         """Setup module's window contents. Must be implemented by child classes."""
         pass
 
+    def _setup_lazy_tabs(self, tabs: Sequence[Tuple[str, Callable[[], None]]]) -> None:
+        """
+        Create a tab bar whose tab contents are built when a tab is first opened.
+        The first tab is visible by default, so it is built right away.
+        Args:
+            tabs: (label, setup function) pairs in display order
+        """
+        with dpg.tab_bar(callback=self._on_tab_changed):
+            for i, (label, setup) in enumerate(tabs):
+                with dpg.tab(label=label) as tab:
+                    if i == 0:
+                        setup()
+                    else:
+                        self._lazy_tabs[tab] = setup
+
+    def _on_tab_changed(self, sender, app_data, user_data) -> None:
+        """Build the contents of a lazily created tab the first time it is selected."""
+        setup = self._lazy_tabs.pop(app_data, None)
+        if setup is None:
+            return
+        with dpg.mutex():
+            dpg.push_container_stack(app_data)
+            try:
+                setup()
+            finally:
+                dpg.pop_container_stack()
+
     def show_window(self) -> None:
         """Show module's window."""
         dpg.show_item(self.window_tag)
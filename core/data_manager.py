@@ -1,31 +1,55 @@
 # core/data_manager.py
-from typing import Dict, List, Any, Optional, Set, Callable
+from typing import Dict, List, Any, Optional, Set, Callable, Tuple
 import asyncio
 import logging
-from datetime import datetime
 import json
-from decimal import Decimal
 import threading
+from dataclasses import dataclass
+import numpy as np
+from sortedcontainers import SortedDict
 
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
-from utils.websocket_client import KrakenWebsocketClient
+from utils.websocket_client import KrakenWebsocketClient, BookUpdate, TradeUpdate
+from utils.fast_parse import TRADE_DTYPE, parse_trades, parse_book_levels, decimal_scale
+from utils.ring_buffer import RingBuffer
+
+@dataclass(slots=True, frozen=True)
+class TickerSnapshot:
+    """Immutable ticker state for a pair, published as PRICE_UPDATE event data"""
+    pair: str
+    price: float
+    volume: float   # Last 24 hours
+    vwap: float     # Last 24 hours
+    trades: int     # Last 24 hours
+    low: float
+    high: float
+    open: float
+    bid: float      # Best bid
+    ask: float      # Best ask
 
 class DataManager:
     """
     Manages market data and WebSocket connections
     Handles data distribution and caching
     """
+    # Levels per side included in order book events
+    BOOK_EVENT_DEPTH = 25
+
     def __init__(self):
         self.logger = logging.getLogger("DataManager")
         self._ws_client: Optional[KrakenWebsocketClient] = None
         self._running = False
-        self._lock = threading.RLock()
+        # One lock per pair so updates for different pairs never contend
+        self._locks: Dict[str, threading.Lock] = {}
         
         # Data caches
+        # Books hold integer ticks -> lots; floats only appear at the API boundary
         self._order_books: Dict[str, Dict] = {}
-        self._latest_trades: Dict[str, List] = {}
-        self._ticker_data: Dict[str, Dict] = {}
+        self._book_scales: Dict[str, Tuple[int, int]] = {}  # pair -> (price_scale, volume_scale)
+        self._latest_trades: Dict[str, RingBuffer] = {}
+        # Replaced wholesale on every update (copy-on-write) so readers need no lock
+        self._ticker_data: Dict[str, TickerSnapshot] = {}
         
         # Subscription management
         self._subscribed_pairs: Set[str] = set()
@@ -92,6 +116,11 @@ class DataManager:
         if self._ws_client:
             await self._ws_client.disconnect()
             self._ws_client = None
+
+        # Release shared trade rings
+        for pair, ring in self._latest_trades.items():
+            with self._locks[pair]:
+                ring.close()
             
         state_manager.set_state(
             "data_manager_status",
@@ -118,90 +147,141 @@ class DataManager:
             self._subscribed_pairs.add(pair)
             
             # Initialize caches
-            self._order_books[pair] = {"bids": {}, "asks": {}}
-            self._latest_trades[pair] = []
-            self._ticker_data[pair] = {}
+            self._locks[pair] = threading.Lock()
+            self._order_books[pair] = {
+                "bids": SortedDict(lambda ticks: -ticks),  # Best (highest) bid first
+                "asks": SortedDict()                        # Best (lowest) ask first
+            }
+            # Keep last 1000 trades in shared memory so other processes can map them
+            self._latest_trades[pair] = RingBuffer(1000, TRADE_DTYPE, shared=True)
             
         except Exception as e:
             self.logger.error(f"Error subscribing to {pair}: {str(e)}")
 
-    def _handle_order_book(self, pair: str, data: Dict):
+    def _handle_order_book(self, update: BookUpdate):
         """Handle order book updates"""
-        with self._lock:
+        pair = update.pair
+        scales = self._book_scales.get(pair)
+        if scales is None:
+            # Kraken pads levels to the pair's precision, so the first level fixes the tick and lot size
+            levels = update.bids or update.asks
+            if not levels:
+                return
+            price, volume = levels[0][0], levels[0][1]
+            scales = self._book_scales[pair] = (decimal_scale(price), decimal_scale(volume))
+        price_scale, volume_scale = scales
+
+        # Parse outside the lock; only the book mutation is serialized
+        deltas = [
+            (side, parse_book_levels(levels, price_scale, volume_scale))
+            for side, levels in (("bids", update.bids), ("asks", update.asks))
+            if levels
+        ]
+
+        with self._locks[pair]:
             # Update order book cache
             book = self._order_books[pair]
-            for side in ["bids", "asks"]:
-                if side in data:
-                    for price, volume, _ in data[side]:
-                        if float(volume) == 0:
-                            book[side].pop(price, None)
-                        else:
-                            book[side][price] = float(volume)
+            for side, (updates, removals) in deltas:
+                side_book = book[side]
+                for ticks in removals:
+                    side_book.pop(ticks, None)
+                side_book.update(updates)
 
             # Publish event
-            event_system.publish(Event(
-                type=EventTypes.ORDER_BOOK_UPDATE,
-                data={
-                    "pair": pair,
-                    "book": book,
-                    "timestamp": datetime.utcnow()
-                },
-                source="DataManager"
-            ))
+            if event_system.has_subscribers(EventTypes.ORDER_BOOK_UPDATE):
+                snapshot = self._book_levels(pair, self.BOOK_EVENT_DEPTH)
+            else:
+                snapshot = None
 
-    def _handle_trade(self, pair: str, data: List):
-        """Handle trade updates"""
-        with self._lock:
-            # Update trade cache
-            trades = [
-                {
-                    "price": float(trade[0]),
-                    "volume": float(trade[1]),
-                    "time": float(trade[2]),
-                    "side": trade[3],
-                    "type": trade[4]
-                }
-                for trade in data
+        if snapshot is not None:
+            event_system.emit(
+                EventTypes.ORDER_BOOK_UPDATE,
+                {"pair": pair, "book": snapshot},
+                "DataManager"
+            )
+
+    def _book_snapshot(self, pair: str, depth: Optional[int] = None) -> Dict[str, Dict[float, float]]:
+        """
+        Convert the integer book for a pair back to float prices and volumes
+        Caller must hold the pair lock
+        Args:
+            pair: Trading pair
+            depth: Number of levels per side, or None for the whole book
+        Returns:
+            Dict of bids and asks mapping price to volume, best level first
+        """
+        book = self._order_books[pair]
+        scales = self._book_scales.get(pair)
+        if scales is None:
+            return {"bids": {}, "asks": {}}
+        price_scale, volume_scale = scales
+        return {
+            side: {
+                ticks / price_scale: lots / volume_scale
+                for ticks, lots in book[side].items()[:depth]
+            }
+            for side in ("bids", "asks")
+        }
+
+    def _book_levels(self, pair: str, depth: int) -> Dict[str, List[Tuple[float, float]]]:
+        """
+        Top of the integer book for a pair as float (price, volume) levels
+        Caller must hold the pair lock
+        Args:
+            pair: Trading pair
+            depth: Number of levels per side
+        Returns:
+            Dict of bids and asks as level lists, best level first
+        """
+        book = self._order_books[pair]
+        scales = self._book_scales.get(pair)
+        if scales is None:
+            return {"bids": [], "asks": []}
+        price_scale, volume_scale = scales
+        return {
+            side: [
+                (ticks / price_scale, lots / volume_scale)
+                for ticks, lots in book[side].items()[:depth]
             ]
-            
+            for side in ("bids", "asks")
+        }
+
+    def _handle_trade(self, update: TradeUpdate):
+        """Handle trade updates"""
+        pair = update.pair
+        trades = parse_trades(update.trades)
+
+        # Update trade cache
+        with self._locks[pair]:
             self._latest_trades[pair].extend(trades)
-            self._latest_trades[pair] = self._latest_trades[pair][-1000:]  # Keep last 1000 trades
 
-            # Publish event
-            event_system.publish(Event(
-                type=EventTypes.TRADE_UPDATE,
-                data={
-                    "pair": pair,
-                    "trades": trades,
-                    "timestamp": datetime.utcnow()
-                },
-                source="DataManager"
-            ))
+        # Publish event
+        event_system.emit(
+            EventTypes.TRADE_UPDATE,
+            {"pair": pair, "trades": trades},
+            "DataManager"
+        )
 
     def _handle_ticker(self, pair: str, data: Dict):
         """Handle ticker updates"""
-        with self._lock:
-            # Update ticker cache
-            self._ticker_data[pair] = {
-                "price": float(data["c"][0]),
-                "volume": float(data["v"][1]),
-                "vwap": float(data["p"][1]),
-                "trades": int(data["t"][1]),
-                "low": float(data["l"][1]),
-                "high": float(data["h"][1]),
-                "open": float(data["o"][1])
-            }
+        ticker = TickerSnapshot(
+            pair=pair,
+            price=float(data["c"][0]),
+            volume=float(data["v"][1]),
+            vwap=float(data["p"][1]),
+            trades=int(data["t"][1]),
+            low=float(data["l"][1]),
+            high=float(data["h"][1]),
+            open=float(data["o"][1]),
+            bid=float(data["b"][0]),
+            ask=float(data["a"][0])
+        )
 
-            # Publish event
-            event_system.publish(Event(
-                type=EventTypes.PRICE_UPDATE,
-                data={
-                    "pair": pair,
-                    "ticker": self._ticker_data[pair],
-                    "timestamp": datetime.utcnow()
-                },
-                source="DataManager"
-            ))
+        # Publish a new snapshot; the reference swap is atomic under the GIL
+        self._ticker_data = {**self._ticker_data, pair: ticker}
+
+        # Publish event
+        event_system.emit(EventTypes.PRICE_UPDATE, ticker, "DataManager")
 
     def _handle_error(self, error: str):
         """Handle WebSocket errors"""
@@ -210,27 +290,77 @@ class DataManager:
             type=EventTypes.MODULE_ERROR,
             data={
                 "module": "DataManager",
-                "error": error,
-                "timestamp": datetime.utcnow()
+                "error": error
             },
             source="DataManager"
         ))
 
     def get_order_book(self, pair: str) -> Optional[Dict]:
         """Get current order book for a pair"""
-        with self._lock:
-            return self._order_books.get(pair)
+        lock = self._locks.get(pair)
+        if lock is None:
+            return None
+        with lock:
+            return self._book_snapshot(pair)
+
+    def get_top_of_book(self, pair: str, depth: int = 10) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Get the best price levels for a pair as contiguous arrays
+        Args:
+            pair: Trading pair
+            depth: Number of levels per side
+        Returns:
+            Dict with bid/ask price and volume arrays, best level first
+        """
+        lock = self._locks.get(pair)
+        if lock is None:
+            return None
+        with lock:
+            book = self._order_books[pair]
+            bids = book["bids"]
+            asks = book["asks"]
+            bid_ticks = np.array(bids.keys()[:depth], dtype=np.int64)
+            bid_lots = np.array(bids.values()[:depth], dtype=np.int64)
+            ask_ticks = np.array(asks.keys()[:depth], dtype=np.int64)
+            ask_lots = np.array(asks.values()[:depth], dtype=np.int64)
+            price_scale, volume_scale = self._book_scales.get(pair, (1, 1))
 
-    def get_latest_trades(self, pair: str, limit: int = 100) -> List[Dict]:
-        """Get latest trades for a pair"""
-        with self._lock:
-            trades = self._latest_trades.get(pair, [])
-            return trades[-limit:]
+        return {
+            "bid_price": bid_ticks / price_scale,
+            "bid_volume": bid_lots / volume_scale,
+            "ask_price": ask_ticks / price_scale,
+            "ask_volume": ask_lots / volume_scale
+        }
+
+    def get_latest_trades(self, pair: str, limit: int = 100) -> np.ndarray:
+        """Get latest trades for a pair as read-only TRADE_DTYPE records"""
+        lock = self._locks.get(pair)
+        if lock is None:
+            return np.empty(0, dtype=TRADE_DTYPE)
+        with lock:
+            return self._latest_trades[pair].latest(limit)
 
-    def get_ticker(self, pair: str) -> Optional[Dict]:
+    def get_trade_ring(self, pair: str) -> Optional[Dict[str, Any]]:
+        """
+        Get what another process needs to map a pair's trade ring
+        Pass the result to RingBuffer.attach(**info)
+        Args:
+            pair: Trading pair
+        Returns:
+            Dict with shared memory name, capacity and dtype
+        """
+        ring = self._latest_trades.get(pair)
+        if ring is None:
+            return None
+        return {
+            "name": ring.name,
+            "capacity": ring.capacity,
+            "dtype": ring.dtype
+        }
+
+    def get_ticker(self, pair: str) -> Optional[TickerSnapshot]:
         """Get current ticker data for a pair"""
-        with self._lock:
-            return self._ticker_data.get(pair)
+        return self._ticker_data.get(pair)
 
     def get_status(self) -> Dict[str, Any]:
         """Get data manager status"""
@@ -273,36 +403,36 @@ class DataManager:
 
     def _handle_own_trades(self, data: Dict):
         """Handle own trades updates"""
-        event_system.publish(Event(
-            type=EventTypes.OWN_TRADES_UPDATE,
-            data={
-                "trades": data,
-                "timestamp": datetime.utcnow()
-            },
-            source="DataManager"
-        ))
+        if event_system.has_subscribers(EventTypes.OWN_TRADES_UPDATE):
+            event_system.publish(Event(
+                type=EventTypes.OWN_TRADES_UPDATE,
+                data={
+                    "trades": data
+                },
+                source="DataManager"
+            ))
 
     def _handle_open_orders(self, data: Dict):
         """Handle open orders updates"""
-        event_system.publish(Event(
-            type=EventTypes.OPEN_ORDERS_UPDATE,
-            data={
-                "orders": data,
-                "timestamp": datetime.utcnow()
-            },
-            source="DataManager"
-        ))
+        if event_system.has_subscribers(EventTypes.OPEN_ORDERS_UPDATE):
+            event_system.publish(Event(
+                type=EventTypes.OPEN_ORDERS_UPDATE,
+                data={
+                    "orders": data
+                },
+                source="DataManager"
+            ))
 
     def _handle_balances(self, data: Dict):
         """Handle balance updates"""
-        event_system.publish(Event(
-            type=EventTypes.BALANCE_UPDATE,
-            data={
-                "balances": data,
-                "timestamp": datetime.utcnow()
-            },
-            source="DataManager"
-        ))
+        if event_system.has_subscribers(EventTypes.BALANCE_UPDATE):
+            event_system.publish(Event(
+                type=EventTypes.BALANCE_UPDATE,
+                data={
+                    "balances": data
+                },
+                source="DataManager"
+            ))
 
 # Global data manager instance
 data_manager = DataManager()
\ No newline at end of file
@@ -1,39 +1,55 @@
 # core/event_system.py
-from typing import Dict, Set, Callable, Any
-from queue import Queue
+from typing import Dict, Set, Tuple, Callable, Any, Optional
+from queue import Queue, Empty
 import logging
 import threading
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Event:
     """Event data structure"""
     type: str
     data: Any
     source: str
-    timestamp: datetime = None
+    timestamp: int = field(default_factory=time.time_ns)  # Nanoseconds since the epoch
 
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.utcnow()
+    @property
+    def datetime(self) -> datetime:
+        """Event time as a naive UTC datetime, converted on demand"""
+        return datetime.utcfromtimestamp(self.timestamp / 1e9)
 
 class EventSystem:
     """
     Event system for inter-module communication
     Handles event publishing and subscription
     """
+    # Maximum number of queued events drained per wakeup
+    BATCH_SIZE = 128
+
     def __init__(self):
         self._subscribers: Dict[str, Set[Callable]] = {}
+        # Immutable per-type snapshots read by dispatch without locking;
+        # rebuilt under _subscribe_lock whenever subscriptions change
+        self._dispatch_table: Dict[str, Tuple[Callable, ...]] = {}
+        # Filtered subscriptions keyed by (event type, data field, value), plus the
+        # fields each event type is filtered on; snapshots maintained like the above
+        self._filtered_subscribers: Dict[Tuple[str, str, Any], Set[Callable]] = {}
+        self._filtered_table: Dict[Tuple[str, str, Any], Tuple[Callable, ...]] = {}
+        self._filter_keys: Dict[str, Tuple[str, ...]] = {}
+        self._subscribe_lock = threading.Lock()
         self._event_queue: Queue = Queue()
+        # Events published but not yet dispatched; tracked here because
+        # Queue.qsize() takes the queue mutex the dispatch thread contends on
+        self._depth = 0
         self._running = False
         self._thread = None
         self.logger = logging.getLogger("EventSystem")
         
         # Track event statistics
         self._event_counts: Dict[str, int] = {}
-        self._last_event_time: Dict[str, datetime] = {}
+        self._last_event_time: Dict[str, int] = {}
 
     def start(self):
         """Start the event processing thread"""
@@ -49,58 +65,177 @@ class EventSystem:
         """Stop the event processing thread"""
         self._running = False
         if self._thread:
+            # Wake the processing thread so it exits without waiting for the timeout
+            self._event_queue.put(None)
             self._thread.join()
             self._thread = None
         self.logger.info("Event system stopped")
 
-    def subscribe(self, event_type: str, callback: Callable[[Event], None]):
+    def subscribe(self, event_type: str, callback: Callable[[Event], None],
+                  filter_key: Optional[str] = None, filter_value: Any = None):
         """
         Subscribe to an event type
         Args:
             event_type: Type of event to subscribe to
             callback: Function to call when event occurs
+            filter_key: Optional event data field; the callback then only receives
+                events whose field equals filter_value
+            filter_value: Value of filter_key to match
         """
-        if event_type not in self._subscribers:
-            self._subscribers[event_type] = set()
-        self._subscribers[event_type].add(callback)
+        if filter_key is not None:
+            self._subscribe_filtered((event_type, filter_key, filter_value), callback)
+            return
+        with self._subscribe_lock:
+            if event_type not in self._subscribers:
+                self._subscribers[event_type] = set()
+            self._subscribers[event_type].add(callback)
+            self._dispatch_table[event_type] = tuple(self._subscribers[event_type])
         self.logger.debug(f"Subscribed to event: {event_type}")
 
-    def unsubscribe(self, event_type: str, callback: Callable[[Event], None]):
+    def unsubscribe(self, event_type: str, callback: Callable[[Event], None],
+                    filter_key: Optional[str] = None, filter_value: Any = None):
         """
         Unsubscribe from an event type
         Args:
             event_type: Type of event to unsubscribe from
             callback: Function to remove from subscribers
+            filter_key: Filter field the callback was subscribed with, if any
+            filter_value: Filter value the callback was subscribed with
         """
-        if event_type in self._subscribers:
-            self._subscribers[event_type].discard(callback)
-            if not self._subscribers[event_type]:
-                del self._subscribers[event_type]
+        if filter_key is not None:
+            self._unsubscribe_filtered((event_type, filter_key, filter_value), callback)
+            return
+        with self._subscribe_lock:
+            if event_type in self._subscribers:
+                self._subscribers[event_type].discard(callback)
+                if self._subscribers[event_type]:
+                    self._dispatch_table[event_type] = tuple(self._subscribers[event_type])
+                else:
+                    del self._subscribers[event_type]
+                    self._dispatch_table.pop(event_type, None)
         self.logger.debug(f"Unsubscribed from event: {event_type}")
 
+    def _subscribe_filtered(self, index: Tuple[str, str, Any], callback: Callable[[Event], None]):
+        """Add a callback under an (event type, field, value) index"""
+        with self._subscribe_lock:
+            subscribers = self._filtered_subscribers.setdefault(index, set())
+            subscribers.add(callback)
+            self._filtered_table[index] = tuple(subscribers)
+            self._rebuild_filter_keys(index[0])
+        self.logger.debug(f"Subscribed to event: {index[0]} where {index[1]} == {index[2]!r}")
+
+    def _unsubscribe_filtered(self, index: Tuple[str, str, Any], callback: Callable[[Event], None]):
+        """Remove a callback from an (event type, field, value) index"""
+        with self._subscribe_lock:
+            subscribers = self._filtered_subscribers.get(index)
+            if subscribers is not None:
+                subscribers.discard(callback)
+                if subscribers:
+                    self._filtered_table[index] = tuple(subscribers)
+                else:
+                    del self._filtered_subscribers[index]
+                    self._filtered_table.pop(index, None)
+                self._rebuild_filter_keys(index[0])
+        self.logger.debug(f"Unsubscribed from event: {index[0]} where {index[1]} == {index[2]!r}")
+
+    def _rebuild_filter_keys(self, event_type: str):
+        """Recompute the fields an event type is filtered on; caller holds _subscribe_lock"""
+        keys = tuple({key for type_, key, _ in self._filtered_subscribers if type_ == event_type})
+        if keys:
+            self._filter_keys[event_type] = keys
+        else:
+            self._filter_keys.pop(event_type, None)
+
+    def _filtered_callbacks(self, event_type: str, data: Any, keys: Tuple[str, ...]) -> Tuple[Callable, ...]:
+        """Collect the filtered callbacks matching an event's data, one index lookup per field"""
+        table = self._filtered_table
+        callbacks = ()
+        for key in keys:
+            value = data.get(key) if isinstance(data, dict) else getattr(data, key, None)
+            try:
+                callbacks += table.get((event_type, key, value), ())
+            except TypeError:  # Unhashable field value; nothing can be subscribed to it
+                pass
+        return callbacks
+
+    def has_subscribers(self, event_type: str) -> bool:
+        """
+        Check whether an event type has any subscribers
+        Lets publishers skip building events nobody will receive
+        Args:
+            event_type: Type of event to check
+        """
+        return event_type in self._dispatch_table or event_type in self._filter_keys
+
     def publish(self, event: Event):
         """
         Publish an event to all subscribers
         Args:
             event: Event to publish
         """
+        self._depth += 1
         self._event_queue.put(event)
-        
-        # Update statistics
-        self._event_counts[event.type] = self._event_counts.get(event.type, 0) + 1
-        self._last_event_time[event.type] = event.timestamp
+        self._record_event(event)
+
+    def emit(self, type_: str, data: Any, source: str):
+        """
+        Dispatch an event synchronously on the calling thread
+        Skips the queue hand-off to the processing thread, so callbacks run
+        inline and must not block. The Event is only built if someone is
+        subscribed, so unobserved types cost one dict lookup. Intended for
+        the market data path running on the DataManager's event loop.
+        Args:
+            type_: Event type
+            data: Event payload
+            source: Publishing component
+        """
+        callbacks = self._dispatch_table.get(type_, ())
+        filter_keys = self._filter_keys.get(type_)
+        if filter_keys:
+            callbacks += self._filtered_callbacks(type_, data, filter_keys)
+        if not callbacks:
+            return
+        event = Event(type=type_, data=data, source=source)
+        self._record_event(event)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error(f"Error in event callback: {str(e)}")
+
+    def _record_event(self, event: Event):
+        """Update statistics for a published event"""
+        event_type = event.type
+        counts = self._event_counts
+        counts[event_type] = counts.get(event_type, 0) + 1
+        self._last_event_time[event_type] = event.timestamp
 
     def _process_events(self):
-        """Process events from the queue"""
+        """Process events from the queue in batches"""
+        queue = self._event_queue
+        batch_size = self.BATCH_SIZE
         while self._running:
             try:
-                if not self._event_queue.empty():
-                    event = self._event_queue.get()
+                event = queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+            # Drain whatever else is already queued to amortize lock overhead
+            batch = [event]
+            while len(batch) < batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except Empty:
+                    break
+
+            for event in batch:
+                if event is None:  # Shutdown sentinel
+                    continue
+                self._depth -= 1
+                try:
                     self._dispatch_event(event)
-                else:
-                    time.sleep(0.001)  # Small sleep to prevent CPU spinning
-            except Exception as e:
-                self.logger.error(f"Error processing event: {str(e)}")
+                except Exception as e:
+                    self.logger.error(f"Error processing event: {str(e)}")
 
     def _dispatch_event(self, event: Event):
         """
@@ -108,12 +243,15 @@ class EventSystem:
         Args:
             event: Event to dispatch
         """
-        if event.type in self._subscribers:
-            for callback in self._subscribers[event.type]:
-                try:
-                    callback(event)
-                except Exception as e:
-                    self.logger.error(f"Error in event callback: {str(e)}")
+        callbacks = self._dispatch_table.get(event.type, ())
+        filter_keys = self._filter_keys.get(event.type)
+        if filter_keys:
+            callbacks += self._filtered_callbacks(event.type, event.data, filter_keys)
+        for callback in callbacks:
+            try:
+                callback(event)
+            except Exception as e:
+                self.logger.error(f"Error in event callback: {str(e)}")
 
     def get_statistics(self) -> Dict[str, Any]:
         """Get event system statistics"""
@@ -122,9 +260,13 @@ class EventSystem:
             "last_event_times": self._last_event_time.copy(),
             "subscriber_counts": {
                 event_type: len(subscribers)
-                for event_type, subscribers in self._subscribers.items()
+                for event_type, subscribers in self._dispatch_table.items()
+            },
+            "filtered_subscriber_counts": {
+                f"{event_type}[{key}={value}]": len(subscribers)
+                for (event_type, key, value), subscribers in self._filtered_table.items()
             },
-            "queue_size": self._event_queue.qsize()
+            "queue_size": max(self._depth, 0)
         }
 
     def clear_statistics(self):
@@ -134,13 +276,19 @@ class EventSystem:
 
 # Common event types
 class EventTypes:
-    """Common event types used in the system"""
+    """
+    Common event types used in the system
+    Values are identifier-like literals, which CPython interns, so dict
+    lookups on them resolve by pointer comparison with a cached hash
+    """
     # Market Data Events
     PRICE_UPDATE = "PRICE_UPDATE"
     ORDER_BOOK_UPDATE = "ORDER_BOOK_UPDATE"
     TRADE_UPDATE = "TRADE_UPDATE"
     
     # Trading Events
+    ORDER_REQUEST = "ORDER_REQUEST"
+    ORDER_UPDATE = "ORDER_UPDATE"
     ORDER_PLACED = "ORDER_PLACED"
     ORDER_FILLED = "ORDER_FILLED"
     ORDER_CANCELLED = "ORDER_CANCELLED"
@@ -151,6 +299,7 @@ class EventTypes:
     MODULE_ERROR = "MODULE_ERROR"
     CONFIG_CHANGED = "CONFIG_CHANGED"
     STATE_CHANGED = "STATE_CHANGED"
+    STATE_WATCH_NOTIFICATION = "STATE_WATCH_NOTIFICATION"
     
     
     # Analysis Events
@@ -164,6 +313,8 @@ class EventTypes:
     CONNECTION_STATUS = "CONNECTION_STATUS"
 
     BALANCE_UPDATE = "BALANCE_UPDATE"
+    OWN_TRADES_UPDATE = "OWN_TRADES_UPDATE"
+    OPEN_ORDERS_UPDATE = "OPEN_ORDERS_UPDATE"
 
 # Global event system instance
 event_system = EventSystem()
\ No newline at end of file
@@ -1,21 +1,34 @@
 # core/state_manager.py
-from typing import Dict, Any, Optional, List, Set
+from typing import Dict, Any, Optional, List, Set, Tuple
+import asyncio
+import heapq
 import threading
-import json
 import logging
-from datetime import datetime
-from dataclasses import dataclass, asdict
+import time
+import msgpack
+from dataclasses import dataclass
 from core.event_system import event_system, Event, EventTypes
 
-@dataclass
+@dataclass(slots=True)
 class StateValue:
     """Container for state values with metadata"""
     value: Any
-    timestamp: datetime
+    timestamp: int             # Nanoseconds since the epoch
     source: str
     ttl: Optional[int] = None  # Time to live in seconds
     persistent: bool = True    # Whether to save to disk
 
+    @property
+    def expires_at(self) -> Optional[int]:
+        """Expiry time in nanoseconds since the epoch, or None without a TTL"""
+        if self.ttl is None:
+            return None
+        return self.timestamp + self.ttl * 1_000_000_000
+
+    def to_record(self) -> tuple:
+        """Flat field tuple for serialization; avoids asdict's recursive deep copy"""
+        return (self.value, self.timestamp, self.source, self.ttl, self.persistent)
+
 class StateManager:
     """
     Manages shared state between modules
@@ -25,6 +38,9 @@ class StateManager:
         self._state: Dict[str, StateValue] = {}
         self._lock = threading.RLock()
         self._watchers: Dict[str, Set[str]] = {}  # key -> set of module_ids
+        # Min-heap of (expires_at, key); entries for overwritten keys are skipped when popped
+        self._expiry_heap: List[Tuple[int, str]] = []
+        self._sweeper_task: Optional[asyncio.Task] = None
         self.logger = logging.getLogger("StateManager")
 
     def set_state(self, key: str, value: Any, source: str, 
@@ -44,30 +60,34 @@ class StateManager:
             with self._lock:
                 state_value = StateValue(
                     value=value,
-                    timestamp=datetime.utcnow(),
+                    timestamp=time.time_ns(),
                     source=source,
                     ttl=ttl,
                     persistent=persistent
                 )
                 old_value = self._state.get(key)
                 self._state[key] = state_value
+                if ttl is not None:
+                    heapq.heappush(self._expiry_heap, (state_value.expires_at, key))
+                watchers = tuple(self._watchers.get(key, ()))
 
-                # Publish state change event
-                event_system.publish(Event(
-                    type=EventTypes.STATE_CHANGED,
-                    data={
-                        "key": key,
-                        "old_value": old_value.value if old_value else None,
-                        "new_value": value,
-                        "source": source
-                    },
-                    source="StateManager"
-                ))
-
-                # Notify watchers
-                self._notify_watchers(key, state_value)
-                
-                return True
+            # Publish outside the lock so event allocation never extends the critical section
+            event_system.publish(Event(
+                type=EventTypes.STATE_CHANGED,
+                data={
+                    "key": key,
+                    "old_value": old_value.value if old_value else None,
+                    "new_value": value,
+                    "source": source
+                },
+                source="StateManager"
+            ))
+
+            # Notify watchers
+            if watchers:
+                self._notify_watchers(key, state_value, watchers)
+            
+            return True
         except Exception as e:
             self.logger.error(f"Error setting state {key}: {str(e)}")
             return False
@@ -86,15 +106,70 @@ class StateManager:
             if state_value is None:
                 return default
             
-            # Check TTL
-            if state_value.ttl is not None:
-                age = (datetime.utcnow() - state_value.timestamp).total_seconds()
-                if age > state_value.ttl:
-                    del self._state[key]
-                    return default
+            # Expired values are hidden here and removed by sweep_expired()
+            if state_value.ttl is not None and time.time_ns() > state_value.expires_at:
+                return default
                 
             return state_value.value
 
+    def get_usd_price(self, asset: str) -> float:
+        """
+        Get the USD price of one unit of an asset from the published pair prices
+        Args:
+            asset: Asset code
+        Returns:
+            Price via the asset's USD pair, else its USDT pair, else 0.0
+        """
+        if asset == "USD":
+            return 1.0
+        price = self.get_state(f"price_{asset}/USD", None)
+        if price is None:
+            price = self.get_state(f"price_{asset}/USDT", 0.0)
+        return price
+
+    def sweep_expired(self) -> int:
+        """
+        Remove all values whose TTL has elapsed
+        Returns:
+            int: Number of keys removed
+        """
+        now = time.time_ns()
+        removed = 0
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < now:
+                expires_at, key = heapq.heappop(heap)
+                state_value = self._state.get(key)
+                # Skip entries left behind by a later set_state or clear_state
+                if state_value is not None and state_value.expires_at == expires_at:
+                    del self._state[key]
+                    removed += 1
+        return removed
+
+    def start_sweeper(self, interval: float = 1.0):
+        """
+        Start the background expiry sweep on the running event loop
+        Args:
+            interval: Seconds between sweeps
+        """
+        if self._sweeper_task is None:
+            self._sweeper_task = asyncio.create_task(self._sweep_expired(interval))
+
+    def stop_sweeper(self):
+        """Stop the background expiry sweep"""
+        if self._sweeper_task is not None:
+            self._sweeper_task.cancel()
+            self._sweeper_task = None
+
+    async def _sweep_expired(self, interval: float):
+        """Periodically remove expired values until cancelled"""
+        while True:
+            try:
+                self.sweep_expired()
+            except Exception as e:
+                self.logger.error(f"Error sweeping expired state: {str(e)}")
+            await asyncio.sleep(interval)
+
     def watch_state(self, key: str, module_id: str):
         """
         Register a module to watch a state key
@@ -120,25 +195,25 @@ class StateManager:
                 if not self._watchers[key]:
                     del self._watchers[key]
 
-    def _notify_watchers(self, key: str, state_value: StateValue):
+    def _notify_watchers(self, key: str, state_value: StateValue, watchers: Tuple[str, ...]):
         """
-        Notify modules watching a state key
+        Notify modules watching a state key with a single event
         Args:
             key: State key that changed
             state_value: New state value
+            watchers: Module IDs watching the key
         """
-        if key in self._watchers:
-            for module_id in self._watchers[key]:
-                event_system.publish(Event(
-                    type=EventTypes.STATE_WATCH_NOTIFICATION,
-                    data={
-                        "key": key,
-                        "value": state_value.value,
-                        "timestamp": state_value.timestamp,
-                        "source": state_value.source
-                    },
-                    source="StateManager"
-                ))
+        event_system.publish(Event(
+            type=EventTypes.STATE_WATCH_NOTIFICATION,
+            data={
+                "key": key,
+                "value": state_value.value,
+                "timestamp": state_value.timestamp,
+                "source": state_value.source,
+                "watchers": watchers
+            },
+            source="StateManager"
+        ))
 
     def save_state(self, filepath: str) -> bool:
         """
@@ -151,12 +226,12 @@ class StateManager:
         try:
             with self._lock:
                 persistent_state = {
-                    key: asdict(value) for key, value in self._state.items()
+                    key: value.to_record() for key, value in self._state.items()
                     if value.persistent
                 }
                 
-                with open(filepath, 'w') as f:
-                    json.dump(persistent_state, f, indent=4, default=str)
+                with open(filepath, 'wb') as f:
+                    f.write(msgpack.packb(persistent_state, use_bin_type=True, default=str))
                 return True
         except Exception as e:
             self.logger.error(f"Error saving state: {str(e)}")
@@ -171,13 +246,15 @@ class StateManager:
             bool: Success
         """
         try:
-            with open(filepath, 'r') as f:
-                loaded_state = json.load(f)
+            with open(filepath, 'rb') as f:
+                loaded_state = msgpack.unpackb(f.read(), raw=False)
                 
             with self._lock:
-                for key, value_dict in loaded_state.items():
-                    value_dict['timestamp'] = datetime.fromisoformat(value_dict['timestamp'])
-                    self._state[key] = StateValue(**value_dict)
+                for key, record in loaded_state.items():
+                    state_value = StateValue(*record)
+                    self._state[key] = state_value
+                    if state_value.ttl is not None:
+                        heapq.heappush(self._expiry_heap, (state_value.expires_at, key))
                 return True
         except Exception as e:
             self.logger.error(f"Error loading state: {str(e)}")
@@ -197,6 +274,7 @@ class StateManager:
                 }
             else:
                 self._state.clear()
+                self._expiry_heap.clear()
 
     def get_state_info(self) -> Dict[str, Any]:
         """
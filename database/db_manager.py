@@ -1,252 +1,1110 @@
 # database/db_manager.py
 import sqlite3
+import atexit
+import functools
+import csv
+import time
+import threading
 from pathlib import Path
-import json
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from collections import deque
+from typing import Dict, List, Any, Callable, Optional, Iterable, Iterator, Sequence, Union
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+import numpy as np
 import pandas as pd
+import zstandard as zstd
+
+from utils import fast_json
+
+CREATE_TRADES_SQL = """
+    CREATE TABLE IF NOT EXISTS trades (
+        trade_id TEXT PRIMARY KEY,
+        timestamp INTEGER,          -- Microseconds since the epoch (UTC)
+        pair TEXT,
+        side INTEGER,               -- enum_side id
+        type INTEGER,               -- enum_type id
+        price REAL,
+        volume REAL,
+        cost REAL,
+        fee REAL,
+        strategy_id TEXT,
+        extra_data BLOB             -- zstd-compressed JSON, NULL when empty
+    )
+"""
+
+CREATE_ORDERS_SQL = """
+    CREATE TABLE IF NOT EXISTS orders (
+        order_id TEXT PRIMARY KEY,
+        timestamp INTEGER,          -- Microseconds since the epoch (UTC)
+        pair TEXT,
+        side INTEGER,               -- enum_side id
+        type INTEGER,               -- enum_type id
+        price REAL,
+        volume REAL,
+        status INTEGER,             -- enum_status id
+        strategy_id TEXT,
+        extra_data BLOB             -- zstd-compressed JSON, NULL when empty
+    )
+"""
+
+# Dictionary-encoded columns: column -> names seeded with ids 1, 2, ...
+# Names outside these sets get the next free id on first use
+ENUM_COLUMNS = {
+    "side": ("buy", "sell"),
+    "type": ("market", "limit", "stop"),
+    "status": ("open", "closed", "canceled", "filled", "cancelled", "expired")
+}
+
+CREATE_ENUM_SQL = """
+    CREATE TABLE IF NOT EXISTS enum_{column} (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE NOT NULL
+    )
+"""
+
+# Read-only views with the enum columns translated back to names, for ad-hoc SQL
+CREATE_TRADES_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS trades_v AS
+    SELECT
+        t.trade_id, t.timestamp, t.pair, s.name AS side, y.name AS type,
+        t.price, t.volume, t.cost, t.fee, t.strategy_id, t.extra_data
+    FROM trades t
+    LEFT JOIN enum_side s ON s.id = t.side
+    LEFT JOIN enum_type y ON y.id = t.type
+"""
+
+CREATE_ORDERS_VIEW_SQL = """
+    CREATE VIEW IF NOT EXISTS orders_v AS
+    SELECT
+        o.order_id, o.timestamp, o.pair, s.name AS side, y.name AS type,
+        o.price, o.volume, st.name AS status, o.strategy_id, o.extra_data
+    FROM orders o
+    LEFT JOIN enum_side s ON s.id = o.side
+    LEFT JOIN enum_type y ON y.id = o.type
+    LEFT JOIN enum_status st ON st.id = o.status
+"""
+
+# Trained zstd dictionaries for extra_data; every one ever used stays here
+CREATE_ZSTD_DICTIONARIES_SQL = """
+    CREATE TABLE IF NOT EXISTS zstd_dictionaries (
+        dict_id INTEGER PRIMARY KEY,
+        created INTEGER,            -- Microseconds since the epoch (UTC)
+        data BLOB
+    )
+"""
+
+# History tables are split into one table per month ({name}_YYYYMM), read
+# through a UNION ALL view under the base name
+SHARDED_TABLES_SQL = {
+    "balance_history": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            timestamp INTEGER,          -- Microseconds since the epoch (UTC)
+            asset TEXT,
+            total REAL,
+            available REAL,
+            in_orders REAL,
+            PRIMARY KEY (timestamp, asset)
+        ) WITHOUT ROWID
+    """,
+    "strategy_performance": """
+        CREATE TABLE IF NOT EXISTS {table} (
+            timestamp INTEGER,          -- Microseconds since the epoch (UTC)
+            strategy_id TEXT,
+            metric_name TEXT,
+            value REAL,
+            PRIMARY KEY (timestamp, strategy_id, metric_name)
+        ) WITHOUT ROWID
+    """
+}
+
+# PRAGMA user_version once stored timestamps are all integers; earlier
+# databases kept DATETIME text, which is converted once at startup
+TIMESTAMP_SCHEMA_VERSION = 1
+
+# Secondary indexes backing the get_trades/get_orders filters
+TRADE_INDEXES_SQL = {
+    "idx_trades_pair_ts": "CREATE INDEX IF NOT EXISTS idx_trades_pair_ts ON trades(pair, timestamp)",
+    "idx_trades_strat_ts": "CREATE INDEX IF NOT EXISTS idx_trades_strat_ts ON trades(strategy_id, timestamp)"
+}
+
+ORDER_INDEXES_SQL = {
+    "idx_orders_status_ts": "CREATE INDEX IF NOT EXISTS idx_orders_status_ts ON orders(status, timestamp)",
+    "idx_orders_pair_ts": "CREATE INDEX IF NOT EXISTS idx_orders_pair_ts ON orders(pair, timestamp)"
+}
+
+# Representative reader filters that must be answered by an index search
+INDEXED_QUERIES_SQL = (
+    ("SELECT * FROM trades WHERE pair = ? AND timestamp >= ?", ("X", 0)),
+    ("SELECT * FROM trades WHERE strategy_id = ? AND timestamp >= ?", ("X", 0)),
+    ("SELECT * FROM orders WHERE status = ? AND timestamp >= ?", ("X", 0)),
+    ("SELECT * FROM orders WHERE pair = ? AND timestamp >= ?", ("X", 0))
+)
+
+INSERT_TRADE_SQL = """
+    INSERT OR REPLACE INTO trades (
+        trade_id, timestamp, pair, side, type,
+        price, volume, cost, fee, strategy_id, extra_data
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_ORDER_SQL = """
+    INSERT OR REPLACE INTO orders (
+        order_id, timestamp, pair, side, type,
+        price, volume, status, strategy_id, extra_data
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_BALANCE_SQL = """
+    INSERT INTO {table} (
+        timestamp, asset, total, available, in_orders
+    ) VALUES (?, ?, ?, ?, ?)
+"""
+
+INSERT_ZSTD_DICTIONARY_SQL = """
+    INSERT OR IGNORE INTO zstd_dictionaries (dict_id, created, data) VALUES (?, ?, ?)
+"""
+
+BALANCE_COLUMNS = ("timestamp", "asset", "total", "available", "in_orders")
+
+# Queryable columns; the default projections leave out the extra_data blob
+TRADE_COLUMNS = (
+    "trade_id", "timestamp", "pair", "side", "type",
+    "price", "volume", "cost", "fee", "strategy_id", "extra_data"
+)
+ORDER_COLUMNS = (
+    "order_id", "timestamp", "pair", "side", "type",
+    "price", "volume", "status", "strategy_id", "extra_data"
+)
+DEFAULT_TRADE_COLUMNS = TRADE_COLUMNS[:-1]
+DEFAULT_ORDER_COLUMNS = ORDER_COLUMNS[:-1]
+
+# Encoded extra_data meaning "none"; such rows store NULL
+_EMPTY_EXTRA = "{}"
+
+# Leading bytes of a zstd frame; extra_data without them is uncompressed JSON
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+# Result column dtypes; columns not listed stay as Python objects
+_COLUMN_DTYPES = {
+    "timestamp": "datetime64[us]",
+    "price": np.float64,
+    "volume": np.float64,
+    "cost": np.float64,
+    "fee": np.float64,
+    "total": np.float64,
+    "available": np.float64,
+    "in_orders": np.float64,
+    "value": np.float64
+}
+
+def _rows_to_frame(
+    rows: List[tuple],
+    columns: List[str],
+    converters: Optional[Dict[str, Callable[[Any], Any]]] = None
+) -> pd.DataFrame:
+    """
+    Build a DataFrame column by column with fixed dtypes
+    Skips pandas' per-cell type inference over the fetched rows
+    Args:
+        rows: Rows fetched from a cursor
+        columns: Column names from cursor.description
+        converters: Optional column name -> function applied to each stored value
+    """
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    data = {}
+    for name, column in zip(columns, values):
+        if converters and name in converters:
+            column = [converters[name](value) for value in column]
+        dtype = _COLUMN_DTYPES.get(name, object)
+        if name == "timestamp":
+            data[name] = np.array(column, dtype=np.int64).astype(dtype)
+        else:
+            data[name] = np.array(column, dtype=dtype)
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+def _logged(operation: str) -> Callable:
+    """
+    Log and re-raise exceptions escaping a DatabaseManager method
+    Args:
+        operation: Description used in the log message, e.g. "saving trade"
+    """
+    def decorator(method: Callable) -> Callable:
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            except Exception as e:
+                self.logger.error("Error %s: %s", operation, e)
+                raise
+        return wrapper
+    return decorator
+
+def _month_suffix(timestamp_us: int) -> str:
+    """Get the YYYYMM shard suffix for a timestamp in epoch microseconds"""
+    return datetime.fromtimestamp(timestamp_us / 1_000_000, timezone.utc).strftime("%Y%m")
+
+def _epoch_us(value: Any) -> int:
+    """
+    Convert a timestamp to integer microseconds since the epoch
+    Args:
+        value: datetime (naive values are taken as UTC), ISO string, or epoch seconds
+    Returns:
+        int: Microseconds since the epoch
+    """
+    if isinstance(value, str):
+        try:
+            value = float(value)
+        except ValueError:
+            value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return int(value.timestamp() * 1_000_000)
+    return int(float(value) * 1_000_000)
+
+def _text_epoch_us(value: str) -> Optional[int]:
+    """SQL function converting a stored DATETIME string to epoch microseconds, NULL if unparsable"""
+    try:
+        return _epoch_us(value)
+    except ValueError:
+        return None
 
 class DatabaseManager:
     """Manages database operations for the trading system"""
     
+    # Connection PRAGMAs applied in order at startup; subclasses may override
+    PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "temp_store": "MEMORY",
+        "cache_size": -65536,        # 64 MiB page cache
+        "mmap_size": 268435456,      # 256 MiB memory-mapped I/O
+        "wal_autocheckpoint": 1000   # Pages
+    }
+    
+    # Buffered trade/order writes are flushed on this interval, in batches of at most FLUSH_BATCH rows
+    FLUSH_INTERVAL = 0.05
+    FLUSH_BATCH = 1000
+    
+    # Retries for acquiring the write lock when another connection holds it
+    BEGIN_RETRIES = 5
+    BEGIN_BACKOFF = 0.01  # Seconds, doubled after each failed attempt
+    
+    # extra_data compression; a shared dictionary is trained from the first samples
+    EXTRA_COMPRESSION_LEVEL = 3
+    EXTRA_DICT_SAMPLES = 1000
+    EXTRA_DICT_SIZE = 16384  # Bytes
+    
     def __init__(self):
         self.logger = logging.getLogger("DatabaseManager")
         self.db_dir = Path("database")
         self.db_dir.mkdir(exist_ok=True)
         self.db_path = self.db_dir / "trading_data.db"
         
+        # One long-lived connection shared by all threads; the lock serializes access
+        self._conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            isolation_level=None,
+            cached_statements=256
+        )
+        self._lock = threading.RLock()
+        self._shards: Dict[str, List[str]] = {}  # base table -> shard tables, oldest first
+        atexit.register(self._conn.close)
+        self._configure_connection()
+        
+        # Enum column -> name -> id, and the reverse; filled by _load_enums
+        self._enum_ids: Dict[str, Dict[str, int]] = {column: {} for column in ENUM_COLUMNS}
+        self._enum_names: Dict[str, Dict[int, str]] = {column: {} for column in ENUM_COLUMNS}
+        # Names registered inside the open transaction, published to the lookups only on commit
+        self._pending_enums: Dict[str, Dict[str, int]] = {column: {} for column in ENUM_COLUMNS}
+        
         # Initialize database
         self._initialize_database()
+        
+        # extra_data codec; zstd (de)compressors are not thread-safe, so _codec_lock guards them
+        self._codec_lock = threading.Lock()
+        self._compressor = zstd.ZstdCompressor(level=self.EXTRA_COMPRESSION_LEVEL)
+        self._decompressors: Dict[int, zstd.ZstdDecompressor] = {0: zstd.ZstdDecompressor()}
+        self._extra_samples: Optional[List[bytes]] = []  # None once a dictionary is in use
+        self._pending_dictionary: Optional[zstd.ZstdCompressionDict] = None  # Trained, not yet stored
+        self._converters = {"extra_data": self._decode_extra}
+        for column, names in self._enum_names.items():
+            self._converters[column] = names.get
+        self._load_extra_dictionaries()
+        
+        # Pending trade/order rows, written by a background flush thread
+        self._trade_queue: deque = deque()
+        self._order_queue: deque = deque()
+        self._flush_stop = threading.Event()
+        self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flush_thread.start()
+        # Registered after close, so it runs first at exit
+        atexit.register(self.close)
+
+    def _configure_connection(self):
+        """Apply connection PRAGMAs"""
+        with self._lock:
+            for name, value in self.PRAGMAS.items():
+                self._conn.execute(f"PRAGMA {name}={value}")
+            
+            journal_mode = self._conn.execute("PRAGMA journal_mode").fetchone()[0]
+            if journal_mode.lower() != str(self.PRAGMAS.get("journal_mode", journal_mode)).lower():
+                self.logger.warning(f"Requested journal mode not applied, using {journal_mode}")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        Run statements in a single explicit write transaction
+        The connection is in autocommit mode, so `with conn:` alone would
+        not open one. BEGIN IMMEDIATE takes the write lock up front rather
+        than upgrading mid-transaction, where a busy error cannot be retried
+        """
+        with self._lock:
+            self._begin_immediate()
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                self._settle_pending_enums(committed=False)
+                raise
+            else:
+                self._conn.execute("COMMIT")
+                self._settle_pending_enums(committed=True)
+
+    def _begin_immediate(self):
+        """Open a write transaction, backing off while the database is busy"""
+        delay = self.BEGIN_BACKOFF
+        for attempt in range(self.BEGIN_RETRIES):
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                return
+            except sqlite3.OperationalError as e:
+                if attempt == self.BEGIN_RETRIES - 1 or "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                self.logger.warning(f"Database busy, retrying in {delay:.2f}s")
+                time.sleep(delay)
+                delay *= 2
 
+    @_logged("initializing database")
     def _initialize_database(self):
         """Initialize database tables"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                # Trades table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS trades (
-                        trade_id TEXT PRIMARY KEY,
-                        timestamp DATETIME,
-                        pair TEXT,
-                        side TEXT,
-                        type TEXT,
-                        price REAL,
-                        volume REAL,
-                        cost REAL,
-                        fee REAL,
-                        strategy_id TEXT,
-                        extra_data TEXT
+        with self._lock:
+            cursor = self._conn.cursor()
+            
+            for column, names in ENUM_COLUMNS.items():
+                cursor.execute(CREATE_ENUM_SQL.format(column=column))
+                cursor.executemany(
+                    f"INSERT OR IGNORE INTO enum_{column} (id, name) VALUES (?, ?)",
+                    enumerate(names, 1)
+                )
+            
+            self._migrate_enum_columns("trades", CREATE_TRADES_SQL, TRADE_COLUMNS)
+            self._migrate_enum_columns("orders", CREATE_ORDERS_SQL, ORDER_COLUMNS)
+            cursor.execute(CREATE_TRADES_SQL)
+            cursor.execute(CREATE_ORDERS_SQL)
+            cursor.execute(CREATE_TRADES_VIEW_SQL)
+            cursor.execute(CREATE_ORDERS_VIEW_SQL)
+            cursor.execute(CREATE_ZSTD_DICTIONARIES_SQL)
+            self._load_enums()
+            
+            for table in SHARDED_TABLES_SQL:
+                self._initialize_shards(table)
+            self._migrate_text_timestamps()
+            
+            for index_sql in (*TRADE_INDEXES_SQL.values(), *ORDER_INDEXES_SQL.values()):
+                cursor.execute(index_sql)
+            
+            self._check_query_plans()
+
+    def _load_enums(self):
+        """Read the enum tables into the name/id lookups"""
+        for column in ENUM_COLUMNS:
+            rows = self._conn.execute(f"SELECT id, name FROM enum_{column}").fetchall()
+            self._enum_ids[column].update((name, enum_id) for enum_id, name in rows)
+            self._enum_names[column].update(rows)
+
+    def _enum_id(self, column: str, name: Optional[str]) -> Optional[int]:
+        """
+        Get the id stored for an enum column value, registering unseen names
+        Args:
+            column: Enum column name
+            name: Value to encode, or None
+        """
+        if name is None:
+            return None
+        ids = self._enum_ids[column]
+        enum_id = ids.get(name)
+        if enum_id is None:
+            with self._lock:
+                enum_id = ids.get(name)
+                if enum_id is None:
+                    pending = self._pending_enums[column]
+                    enum_id = pending.get(name)
+                    if enum_id is None:
+                        enum_id = self._conn.execute(
+                            f"INSERT INTO enum_{column} (name) VALUES (?)", (name,)
+                        ).lastrowid
+                        if self._conn.in_transaction:
+                            # A rollback would free the id for reuse, so keep it out of the lookups for now
+                            pending[name] = enum_id
+                        else:
+                            self._enum_names[column][enum_id] = name
+                            ids[name] = enum_id
+        return enum_id
+
+    def _settle_pending_enums(self, committed: bool):
+        """Publish names registered in the finished transaction, or forget them if it rolled back"""
+        for column, pending in self._pending_enums.items():
+            if pending and committed:
+                for name, enum_id in pending.items():
+                    self._enum_names[column][enum_id] = name
+                    self._enum_ids[column][name] = enum_id
+            pending.clear()
+
+    def _migrate_enum_columns(self, table: str, create_sql: str, columns: Sequence[str]):
+        """
+        Rebuild a table created with TEXT enum columns, encoding its rows
+        Args:
+            table: Table name
+            create_sql: CREATE TABLE IF NOT EXISTS statement for the new layout
+            columns: Columns of the table
+        """
+        types = {row[1]: row[2].upper() for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        if not types or all(types.get(column) != "TEXT" for column in columns if column in ENUM_COLUMNS):
+            return
+        
+        self.logger.info(f"Migrating {table} to integer enum columns")
+        with self._transaction() as conn:
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            conn.execute(create_sql)
+            self._copy_rows(conn, f"{table}_old", table, columns)
+            conn.execute(f"DROP TABLE {table}_old")
+
+    @staticmethod
+    def _copy_rows(
+        conn: sqlite3.Connection,
+        source: str,
+        target: str,
+        columns: Sequence[str],
+        enum_schema: Optional[str] = None,
+        verb: str = "INSERT"
+    ) -> int:
+        """
+        Copy rows between tables, re-encoding enum columns with this database's ids
+        Args:
+            conn: Connection inside a transaction
+            source: Source table, optionally schema-qualified
+            target: Target table in the main database
+            columns: Columns of both tables
+            enum_schema: Schema holding the source's enum tables, or None if the source stores names
+            verb: Insert statement prefix, e.g. "INSERT OR IGNORE"
+        Returns:
+            int: Number of rows copied
+        """
+        expressions = []
+        for column in columns:
+            if column not in ENUM_COLUMNS:
+                expressions.append(f"s.{column}")
+                continue
+            name = f"(SELECT name FROM {enum_schema}.enum_{column} WHERE id = s.{column})" if enum_schema else f"s.{column}"
+            conn.execute(
+                f"INSERT OR IGNORE INTO main.enum_{column} (name) "
+                f"SELECT DISTINCT {name} FROM {source} AS s WHERE {name} IS NOT NULL"
+            )
+            expressions.append(f"(SELECT id FROM main.enum_{column} WHERE name = {name})")
+        
+        cursor = conn.execute(
+            f"{verb} INTO main.{target} ({', '.join(columns)}) "
+            f"SELECT {', '.join(expressions)} FROM {source} AS s"
+        )
+        return cursor.rowcount
+
+    def _migrate_text_timestamps(self):
+        """Convert DATETIME text timestamps written by earlier versions to epoch microseconds"""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= TIMESTAMP_SCHEMA_VERSION:
+            return
+        
+        tables = ["trades", "orders"]
+        for shards in self._shards.values():
+            tables.extend(shards)
+        
+        self._conn.create_function("text_epoch_us", 1, _text_epoch_us, deterministic=True)
+        with self._transaction() as conn:
+            for table in tables:
+                count = conn.execute(
+                    f"UPDATE {table} SET timestamp = text_epoch_us(timestamp) "
+                    f"WHERE typeof(timestamp) = 'text' AND text_epoch_us(timestamp) IS NOT NULL"
+                ).rowcount
+                if count:
+                    self.logger.info(f"Converted {count} text timestamps in {table}")
+                left = conn.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE typeof(timestamp) = 'text'"
+                ).fetchone()[0]
+                if left:
+                    self.logger.warning(f"{left} unparsable text timestamps left in {table}")
+            conn.execute(f"PRAGMA user_version={TIMESTAMP_SCHEMA_VERSION}")
+
+    def _check_query_plans(self):
+        """Warn about reader filters that SQLite would answer with a full table scan"""
+        for query, params in INDEXED_QUERIES_SQL:
+            plan = self._conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            if not any(row[3].startswith("SEARCH") and "INDEX" in row[3] for row in plan):
+                details = "; ".join(row[3] for row in plan)
+                self.logger.warning(f"Unindexed query plan for '{query}': {details}")
+
+    def _initialize_shards(self, table: str):
+        """
+        Load the month shards of a history table and rebuild its view
+        A pre-sharding table under the base name is kept as {table}_legacy
+        Args:
+            table: Base table name
+        """
+        shard_sql = SHARDED_TABLES_SQL[table]
+        legacy = f"{table}_legacy"
+        if self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone():
+            # Tables created before they were declared WITHOUT ROWID
+            self._rebuild_without_rowid(table, shard_sql.format(table=table))
+            self.logger.info(f"Keeping unsharded {table} rows as {legacy}")
+            self._conn.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        
+        rows = self._conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND (name = ? OR name GLOB ?)",
+            (legacy, f"{table}_[0-9][0-9][0-9][0-9][0-9][0-9]")
+        ).fetchall()
+        # "_legacy" sorts after the digits, so put it first explicitly
+        shards = sorted(name for (name,) in rows if name != legacy)
+        self._shards[table] = ([legacy] if (legacy,) in rows else []) + shards
+        
+        if not self._shards[table]:
+            # The view needs at least one table to select from
+            self._ensure_shard(table, _month_suffix(time.time_ns() // 1000))
+        else:
+            self._refresh_shard_view(table)
+
+    def _ensure_shard(self, table: str, suffix: str) -> str:
+        """
+        Get the shard of a history table for a month, creating it on first use
+        Args:
+            table: Base table name
+            suffix: Month as YYYYMM
+        Returns:
+            str: Shard table name
+        """
+        shard = f"{table}_{suffix}"
+        shards = self._shards[table]
+        if shard not in shards:
+            with self._lock:
+                if shard not in shards:
+                    self._conn.execute(SHARDED_TABLES_SQL[table].format(table=shard))
+                    shards.append(shard)
+                    shards.sort(key=lambda name: (not name.endswith("_legacy"), name))
+                    self._refresh_shard_view(table)
+        return shard
+
+    def _refresh_shard_view(self, table: str):
+        """Recreate the UNION ALL view that reads every shard of a history table"""
+        union = " UNION ALL ".join(f"SELECT * FROM {shard}" for shard in self._shards[table])
+        self._conn.execute(f"DROP VIEW IF EXISTS {table}")
+        self._conn.execute(f"CREATE VIEW {table} AS {union}")
+
+    def _rebuild_without_rowid(self, table: str, create_sql: str):
+        """
+        Recreate an existing rowid table from its WITHOUT ROWID definition, keeping its rows
+        Args:
+            table: Table name
+            create_sql: CREATE TABLE IF NOT EXISTS statement for the new layout
+        """
+        row = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+        if row is None or "WITHOUT ROWID" in row[0].upper():
+            return
+        
+        self.logger.info(f"Migrating {table} to WITHOUT ROWID")
+        with self._transaction() as conn:
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            conn.execute(create_sql)
+            conn.execute(f"INSERT INTO {table} SELECT * FROM {table}_old")
+            conn.execute(f"DROP TABLE {table}_old")
+
+    def _load_extra_dictionaries(self):
+        """Register stored zstd dictionaries, compressing with the newest one"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT dict_id, data FROM zstd_dictionaries ORDER BY created"
+            ).fetchall()
+            with self._codec_lock:
+                for dict_id, data in rows:
+                    dictionary = zstd.ZstdCompressionDict(data)
+                    self._decompressors[dict_id] = zstd.ZstdDecompressor(dict_data=dictionary)
+                if rows and self._extra_samples is not None:
+                    self._compressor = zstd.ZstdCompressor(
+                        level=self.EXTRA_COMPRESSION_LEVEL, dict_data=dictionary
                     )
-                ''')
-                
-                # Orders table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS orders (
-                        order_id TEXT PRIMARY KEY,
-                        timestamp DATETIME,
-                        pair TEXT,
-                        side TEXT,
-                        type TEXT,
-                        price REAL,
-                        volume REAL,
-                        status TEXT,
-                        strategy_id TEXT,
-                        extra_data TEXT
+                    self._extra_samples = None
+
+    def _encode_extra(self, extra: Any) -> Optional[bytes]:
+        """
+        Compress extra_data for storage
+        Args:
+            extra: Dict, or JSON text that is already encoded (e.g. read from CSV)
+        Returns:
+            zstd frame, or None when there is no extra data
+        """
+        if isinstance(extra, str):
+            data = extra.encode() if extra and extra != _EMPTY_EXTRA else None
+        else:
+            data = fast_json.dumps(extra).encode() if extra else None
+        if data is None:
+            return None
+        
+        with self._codec_lock:
+            if self._extra_samples is not None:
+                self._sample_extra(data)
+            return self._compressor.compress(data)
+
+    def _sample_extra(self, data: bytes):
+        """
+        Collect an extra_data sample, training the shared dictionary once there are enough
+        The new dictionary is stored by the next write transaction; callers hold _codec_lock
+        """
+        self._extra_samples.append(data)
+        if len(self._extra_samples) < self.EXTRA_DICT_SAMPLES:
+            return
+        
+        samples, self._extra_samples = self._extra_samples, None
+        try:
+            dictionary = zstd.train_dictionary(self.EXTRA_DICT_SIZE, samples)
+        except zstd.ZstdError as e:
+            self.logger.warning(f"Could not train extra_data dictionary: {str(e)}")
+            return
+        
+        self._decompressors[dictionary.dict_id()] = zstd.ZstdDecompressor(dict_data=dictionary)
+        self._compressor = zstd.ZstdCompressor(level=self.EXTRA_COMPRESSION_LEVEL, dict_data=dictionary)
+        self._pending_dictionary = dictionary
+        self.logger.info(f"Trained extra_data dictionary {dictionary.dict_id()}")
+
+    def _write_pending_dictionary(self, conn: sqlite3.Connection) -> Optional[zstd.ZstdCompressionDict]:
+        """
+        Store a newly trained dictionary in the transaction of the rows compressed with it
+        Returns:
+            The dictionary written, to pass to _dictionary_committed after commit
+        """
+        with self._codec_lock:
+            dictionary = self._pending_dictionary
+        if dictionary is not None:
+            conn.execute(
+                INSERT_ZSTD_DICTIONARY_SQL,
+                (dictionary.dict_id(), time.time_ns() // 1000, dictionary.as_bytes())
+            )
+        return dictionary
+
+    def _dictionary_committed(self, dictionary: Optional[zstd.ZstdCompressionDict]):
+        """Stop writing a pending dictionary once a transaction storing it has committed"""
+        if dictionary is None:
+            return
+        with self._codec_lock:
+            if self._pending_dictionary is dictionary:
+                self._pending_dictionary = None
+
+    def _decode_extra(self, value: Any) -> Optional[str]:
+        """
+        Get the JSON text of a stored extra_data value
+        Args:
+            value: zstd frame, uncompressed JSON from before compression, or None
+        """
+        if not isinstance(value, bytes):
+            return value
+        if not value.startswith(_ZSTD_MAGIC):
+            return value.decode()
+        
+        dict_id = zstd.get_frame_parameters(value).dict_id
+        with self._codec_lock:
+            decompressor = self._decompressors.get(dict_id)
+            if decompressor is None:
+                raise ValueError(f"Unknown extra_data dictionary {dict_id}")
+            return decompressor.decompress(value).decode()
+
+    @_logged("saving trade")
+    def save_trade(self, trade_data: Dict[str, Any]):
+        """Queue a trade to be written on the next flush"""
+        self._trade_queue.append(self._trade_row(trade_data))
+
+    @_logged("bulk loading trades")
+    def bulk_load_trades(self, trades: Iterable[Dict[str, Any]], drop_indexes: bool = True) -> int:
+        """
+        Insert a large batch of historical trades in one transaction
+        Durability is relaxed for the duration of the load, and the trade
+        indexes are rebuilt once at the end instead of maintained per row
+        Args:
+            trades: Trade dicts in the save_trade format
+            drop_indexes: Drop and recreate the trade indexes around the load
+        Returns:
+            int: Number of rows written
+        """
+        self.flush()
+        with self._lock:
+            if drop_indexes:
+                for name in TRADE_INDEXES_SQL:
+                    self._conn.execute(f"DROP INDEX IF EXISTS {name}")
+            self._conn.execute("PRAGMA synchronous=OFF")
+            self._conn.execute("PRAGMA journal_mode=MEMORY")
+            try:
+                with self._transaction() as conn:
+                    cursor = conn.executemany(
+                        INSERT_TRADE_SQL, (self._trade_row(trade) for trade in trades)
                     )
-                ''')
-                
-                # Balance history table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS balance_history (
-                        timestamp DATETIME,
-                        asset TEXT,
-                        total REAL,
-                        available REAL,
-                        in_orders REAL,
-                        PRIMARY KEY (timestamp, asset)
+                    dictionary = self._write_pending_dictionary(conn)
+                self._dictionary_committed(dictionary)
+                return cursor.rowcount
+            finally:
+                for name in ("journal_mode", "synchronous"):
+                    if name in self.PRAGMAS:
+                        self._conn.execute(f"PRAGMA {name}={self.PRAGMAS[name]}")
+                for index_sql in TRADE_INDEXES_SQL.values():
+                    self._conn.execute(index_sql)
+
+    @_logged("importing trades")
+    def import_trades_from_db(self, src_path: Union[str, Path]) -> int:
+        """
+        Copy trades from another trading database without leaving SQLite
+        Rows whose trade_id already exists are skipped
+        Args:
+            src_path: Database file with a trades table in this schema
+        Returns:
+            int: Number of rows imported
+        """
+        self.flush()
+        with self._lock:
+            self._conn.execute("ATTACH DATABASE ? AS src", (str(src_path),))
+            try:
+                src_tables = {
+                    name for (name,) in self._conn.execute(
+                        "SELECT name FROM src.sqlite_master WHERE type = 'table'"
                     )
-                ''')
-                
-                # Strategy performance table
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS strategy_performance (
-                        timestamp DATETIME,
-                        strategy_id TEXT,
-                        metric_name TEXT,
-                        value REAL,
-                        PRIMARY KEY (timestamp, strategy_id, metric_name)
+                }
+                with self._transaction() as conn:
+                    # Imported extra_data may be compressed with the source's dictionaries
+                    if "zstd_dictionaries" in src_tables:
+                        conn.execute("INSERT OR IGNORE INTO zstd_dictionaries SELECT * FROM src.zstd_dictionaries")
+                    # Sources from before enum encoding store side/type as names
+                    enum_schema = "src" if "enum_side" in src_tables else None
+                    imported = self._copy_rows(
+                        conn, "src.trades", "trades", TRADE_COLUMNS, enum_schema, "INSERT OR IGNORE"
                     )
-                ''')
-                
-                conn.commit()
-                
-        except Exception as e:
-            self.logger.error(f"Error initializing database: {str(e)}")
-            raise
+                self._load_extra_dictionaries()
+                self._load_enums()
+                return imported
+            finally:
+                self._conn.execute("DETACH DATABASE src")
 
-    def save_trade(self, trade_data: Dict[str, Any]):
-        """Save trade to database"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                extra_data = json.dumps(trade_data.get('extra_data', {}))
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO trades (
-                        trade_id, timestamp, pair, side, type, 
-                        price, volume, cost, fee, strategy_id, extra_data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    trade_data['trade_id'],
-                    trade_data['timestamp'],
-                    trade_data['pair'],
-                    trade_data['side'],
-                    trade_data['type'],
-                    trade_data['price'],
-                    trade_data['volume'],
-                    trade_data['cost'],
-                    trade_data['fee'],
-                    trade_data.get('strategy_id'),
-                    extra_data
-                ))
-                
-                conn.commit()
-                
-        except Exception as e:
-            self.logger.error(f"Error saving trade: {str(e)}")
-            raise
+    def import_trades_from_csv(self, csv_path: Union[str, Path]) -> int:
+        """
+        Bulk load trades from a CSV file with a header row of trade column names
+        Args:
+            csv_path: CSV file to import
+        Returns:
+            int: Number of rows written
+        """
+        with open(csv_path, newline='') as f:
+            return self.bulk_load_trades(csv.DictReader(f))
+
+    def _trade_row(self, trade_data: Dict[str, Any]) -> tuple:
+        """Convert a trade dict into an INSERT_TRADE_SQL parameter row"""
+        return (
+            trade_data['trade_id'],
+            _epoch_us(trade_data['timestamp']),
+            trade_data['pair'],
+            self._enum_id("side", trade_data['side']),
+            self._enum_id("type", trade_data['type']),
+            trade_data['price'],
+            trade_data['volume'],
+            trade_data['cost'],
+            trade_data['fee'],
+            trade_data.get('strategy_id') or None,
+            self._encode_extra(trade_data.get('extra_data'))
+        )
 
+    @_logged("saving order")
     def save_order(self, order_data: Dict[str, Any]):
-        """Save order to database"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                
-                extra_data = json.dumps(order_data.get('extra_data', {}))
-                
-                cursor.execute('''
-                    INSERT OR REPLACE INTO orders (
-                        order_id, timestamp, pair, side, type,
-                        price, volume, status, strategy_id, extra_data
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    order_data['order_id'],
-                    order_data['timestamp'],
-                    order_data['pair'],
-                    order_data['side'],
-                    order_data['type'],
-                    order_data['price'],
-                    order_data['volume'],
-                    order_data['status'],
-                    order_data.get('strategy_id'),
-                    extra_data
-                ))
-                
-                conn.commit()
-                
-        except Exception as e:
-            self.logger.error(f"Error saving order: {str(e)}")
-            raise
-
-    def save_balance(self, balance_data: Dict[str, Dict[str, float]]):
-        """Save balance snapshot to database"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-                timestamp = datetime.utcnow()
-                
-                for asset, data in balance_data.items():
-                    cursor.execute('''
-                        INSERT INTO balance_history (
-                            timestamp, asset, total, available, in_orders
-                        ) VALUES (?, ?, ?, ?, ?)
-                    ''', (
-                        timestamp,
-                        asset,
-                        data['total'],
-                        data['available'],
-                        data['in_orders']
-                    ))
-                
-                conn.commit()
-                
-        except Exception as e:
-            self.logger.error(f"Error saving balance: {str(e)}")
-            raise
+        """Queue an order to be written on the next flush"""
+        self._order_queue.append((
+            order_data['order_id'],
+            _epoch_us(order_data['timestamp']),
+            order_data['pair'],
+            self._enum_id("side", order_data['side']),
+            self._enum_id("type", order_data['type']),
+            order_data['price'],
+            order_data['volume'],
+            self._enum_id("status", order_data['status']),
+            order_data.get('strategy_id'),
+            self._encode_extra(order_data.get('extra_data'))
+        ))
+
+    def flush(self):
+        """Write all queued trades and orders"""
+        while self._trade_queue or self._order_queue:
+            self._flush_pending(self.FLUSH_BATCH)
+
+    def close(self):
+        """Stop the flush thread and write anything still queued"""
+        self._flush_stop.set()
+        if self._flush_thread.is_alive():
+            self._flush_thread.join()
+        self.flush()
+
+    def _flush_loop(self):
+        """Periodically flush queued writes until closed"""
+        while not self._flush_stop.wait(self.FLUSH_INTERVAL):
+            self._flush_pending(self.FLUSH_BATCH)
+
+    def _flush_pending(self, limit: int):
+        """
+        Write up to `limit` queued rows per table in one transaction
+        Args:
+            limit: Maximum rows taken from each queue
+        """
+        # Drain under the lock so concurrent flushes commit batches in queue order
+        with self._lock:
+            trades = self._drain(self._trade_queue, limit)
+            orders = self._drain(self._order_queue, limit)
+            if not trades and not orders:
+                return
+            
+            try:
+                with self._transaction() as conn:
+                    if trades:
+                        conn.executemany(INSERT_TRADE_SQL, trades)
+                    if orders:
+                        conn.executemany(INSERT_ORDER_SQL, orders)
+                    dictionary = self._write_pending_dictionary(conn)
+                self._dictionary_committed(dictionary)
+            except Exception as e:
+                self.logger.error(f"Error flushing {len(trades)} trades and {len(orders)} orders: {str(e)}")
+
+    @staticmethod
+    def _drain(queue: deque, limit: int) -> List[tuple]:
+        """Pop up to `limit` rows from the front of a queue"""
+        rows = []
+        while queue and len(rows) < limit:
+            rows.append(queue.popleft())
+        return rows
+
+    @_logged("saving balance")
+    def save_balance(self, balance_data: Dict[str, Dict[str, float]], timestamp: Optional[datetime] = None):
+        """
+        Save balance snapshot to database
+        Args:
+            balance_data: Asset -> total/available/in_orders amounts
+            timestamp: Snapshot time; defaults to now
+        """
+        # All row values are computed before the connection lock is taken
+        timestamp = _epoch_us(timestamp) if timestamp is not None else time.time_ns() // 1000
+        rows = [
+            (timestamp, asset, data['total'], data['available'], data['in_orders'])
+            for asset, data in balance_data.items()
+        ]
+        
+        shard = self._ensure_shard("balance_history", _month_suffix(timestamp))
+        
+        # One transaction per snapshot instead of one per asset
+        with self._transaction() as conn:
+            conn.executemany(INSERT_BALANCE_SQL.format(table=shard), rows)
+
+    @_logged("getting balance history")
+    def get_balance_history(
+        self,
+        asset: Optional[str] = None,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        """
+        Get balance snapshots, reading only the month shards the time range covers
+        Args:
+            asset: Optional asset filter
+            start_time: Optional inclusive lower bound
+            end_time: Optional inclusive upper bound
+        """
+        conditions = []
+        params = []
+        
+        if asset:
+            conditions.append("asset = ?")
+            params.append(asset)
+        
+        first_month = last_month = None
+        if start_time:
+            start_us = _epoch_us(start_time)
+            conditions.append("timestamp >= ?")
+            params.append(start_us)
+            first_month = _month_suffix(start_us)
+            
+        if end_time:
+            end_us = _epoch_us(end_time)
+            conditions.append("timestamp <= ?")
+            params.append(end_us)
+            last_month = _month_suffix(end_us)
+        
+        where = " WHERE " + " AND ".join(conditions) if conditions else ""
+        columns = ", ".join(BALANCE_COLUMNS)
+        with self._lock:
+            shards = [
+                shard for shard in self._shards["balance_history"]
+                if shard.endswith("_legacy")
+                or ((first_month is None or shard[-6:] >= first_month)
+                    and (last_month is None or shard[-6:] <= last_month))
+            ]
+            if not shards:
+                return _rows_to_frame([], list(BALANCE_COLUMNS))
+            query = " UNION ALL ".join(f"SELECT {columns} FROM {shard}{where}" for shard in shards)
+            return self._read_frame(query, params * len(shards))
 
+    @_logged("getting trades")
     def get_trades(
         self,
         pair: Optional[str] = None,
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None,
-        strategy_id: Optional[str] = None
-    ) -> pd.DataFrame:
-        """Get trades from database with optional filters"""
-        try:
-            query = "SELECT * FROM trades WHERE 1=1"
-            params = []
-            
-            if pair:
-                query += " AND pair = ?"
-                params.append(pair)
+        strategy_id: Optional[str] = None,
+        chunksize: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        Get trades from database with optional filters
+        With chunksize set, returns an iterator of DataFrames of at most
+        that many rows instead of one frame. Columns default to every
+        trade column except extra_data
+        """
+        self.flush()
+
+        projection = self._projection(columns, TRADE_COLUMNS, DEFAULT_TRADE_COLUMNS)
+        query = f"SELECT {projection} FROM trades WHERE 1=1"
+        params = []
+        
+        if pair:
+            query += " AND pair = ?"
+            params.append(pair)
+        
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(_epoch_us(start_time))
             
-            if start_time:
-                query += " AND timestamp >= ?"
-                params.append(start_time)
-                
-            if end_time:
-                query += " AND timestamp <= ?"
-                params.append(end_time)
-                
-            if strategy_id:
-                query += " AND strategy_id = ?"
-                params.append(strategy_id)
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(_epoch_us(end_time))
             
-            with sqlite3.connect(self.db_path) as conn:
-                return pd.read_sql_query(query, conn, params=params)
-                
-        except Exception as e:
-            self.logger.error(f"Error getting trades: {str(e)}")
-            raise
+        if strategy_id:
+            query += " AND strategy_id = ?"
+            params.append(strategy_id)
+        
+        return self._read_frame(query, params, chunksize)
 
+    @_logged("getting orders")
     def get_orders(
         self,
         status: Optional[str] = None,
         pair: Optional[str] = None,
         start_time: Optional[datetime] = None,
-        end_time: Optional[datetime] = None
-    ) -> pd.DataFrame:
-        """Get orders from database with optional filters"""
-        try:
-            query = "SELECT * FROM orders WHERE 1=1"
-            params = []
-            
-            if status:
-                query += " AND status = ?"
-                params.append(status)
-            
-            if pair:
-                query += " AND pair = ?"
-                params.append(pair)
-            
-            if start_time:
-                query += " AND timestamp >= ?"
-                params.append(start_time)
-                
-            if end_time:
-                query += " AND timestamp <= ?"
-                params.append(end_time)
+        end_time: Optional[datetime] = None,
+        chunksize: Optional[int] = None,
+        columns: Optional[Sequence[str]] = None
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        Get orders from database with optional filters
+        With chunksize set, returns an iterator of DataFrames of at most
+        that many rows instead of one frame. Columns default to every
+        order column except extra_data
+        """
+        self.flush()
+
+        projection = self._projection(columns, ORDER_COLUMNS, DEFAULT_ORDER_COLUMNS)
+        query = f"SELECT {projection} FROM orders WHERE 1=1"
+        params = []
+        
+        if status:
+            query += " AND status = ?"
+            params.append(self._enum_ids["status"].get(status))  # Unknown names match nothing
+        
+        if pair:
+            query += " AND pair = ?"
+            params.append(pair)
+        
+        if start_time:
+            query += " AND timestamp >= ?"
+            params.append(_epoch_us(start_time))
             
-            with sqlite3.connect(self.db_path) as conn:
-                return pd.read_sql_query(query, conn, params=params)
-                
-        except Exception as e:
-            self.logger.error(f"Error getting orders: {str(e)}")
-            raise
-
-# Global database manager instance
-db_manager = DatabaseManager()
+        if end_time:
+            query += " AND timestamp <= ?"
+            params.append(_epoch_us(end_time))
+        
+        return self._read_frame(query, params, chunksize)
+
+    @staticmethod
+    def _projection(columns: Optional[Sequence[str]], allowed: Sequence[str], default: Sequence[str]) -> str:
+        """
+        Build a SELECT column list, rejecting names outside the table schema
+        Args:
+            columns: Requested columns, or None for the default set
+            allowed: Columns of the table
+            default: Columns used when none are requested
+        """
+        if columns is None:
+            columns = default
+        unknown = [column for column in columns if column not in allowed]
+        if unknown or not columns:
+            raise ValueError(f"Invalid columns: {unknown or 'none requested'}")
+        return ", ".join(columns)
+
+    def _read_frame(
+        self,
+        query: str,
+        params: List[Any],
+        chunksize: Optional[int] = None
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        Run a query into a DataFrame, or an iterator of DataFrames when chunked
+        Args:
+            query: SELECT statement
+            params: Bound parameters
+            chunksize: Rows per chunk, or None for a single frame
+        """
+        if chunksize is None:
+            with self._lock:
+                cursor = self._conn.execute(query, params)
+                columns = [column[0] for column in cursor.description]
+                rows = cursor.fetchall()
+            return _rows_to_frame(rows, columns, self._converters)
+        return self._iter_frames(query, params, chunksize)
+
+    def _iter_frames(self, query: str, params: List[Any], chunksize: int) -> Iterator[pd.DataFrame]:
+        """Yield query results chunk by chunk, holding the lock only while fetching"""
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(chunksize)
+                if not rows:
+                    break
+                yield _rows_to_frame(rows, columns, self._converters)
+        finally:
+            cursor.close()
+
+# Global database manager instance, created on first use so importing
+# this module does not open the database
+_instance: Optional[DatabaseManager] = None
+_instance_lock = threading.Lock()
+
+def get_db_manager() -> DatabaseManager:
+    """Get the shared database manager, creating it on first call"""
+    global _instance
+    if _instance is None:
+        with _instance_lock:
+            if _instance is None:
+                _instance = DatabaseManager()
+    return _instance
@@ -2,19 +2,21 @@
 import dearpygui.dearpygui as dpg
 import asyncio
 import threading
-from typing import Dict, Any, Optional, List
+from queue import Queue, Empty
+from typing import Dict, Any, Optional, List, Tuple
 import logging
 from datetime import datetime
 import psutil
 import os
 from pathlib import Path
-import json
 import time
 
+from config.config import TRADING_PAIRS
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
 from core.data_manager import data_manager
 from gui.theme import setup_theme
+from utils import fast_json
 from modules.market_data_display import MarketDataDisplay
 from modules.order_management import OrderManagement
 from modules.position_monitor import PositionMonitor
@@ -22,10 +24,23 @@ from modules.account_balance import AccountBalance
 from modules.strategies.moving_average_cross import MovingAverageCross
 
 class MainWindow:
+    # Module types offered by the Load Module dialog, in display order
+    _MODULE_TYPES = {
+        "Market Data Display": MarketDataDisplay,
+        "Order Management": OrderManagement,
+        "Position Monitor": PositionMonitor,
+        "Account Balance": AccountBalance,
+        "Moving Average Cross": MovingAverageCross
+    }
+
     def __init__(self):
         self.logger = logging.getLogger("MainWindow")
         self._modules: Dict[str, Any] = {}
         self._active_windows: set = set()
+        # Tags of top-level windows created by this class, checked instead of asking DPG
+        self._created_items: set = set()
+        # Layout geometry, kept current by resize handlers rather than queried on save
+        self._layout_cache: Dict[str, Any] = {}
         
         # Window settings
         self.WINDOW_WIDTH = 1600
@@ -41,9 +56,24 @@ class MainWindow:
         self._open_orders: Dict[str, Any] = {}
         self._positions: Dict[str, Any] = {}
         
-        # System monitoring
-        self._last_system_update = 0
+        # Latest price per pair, and those updated since the last frame; written by the event thread
+        self._last_prices: Dict[str, float] = {}
+        self._dirty_prices: Dict[str, float] = {}
+        # Per-pair display (tag, text template) and the price it currently shows
+        self._price_tags: Dict[str, Tuple[str, str]] = {}
+        self._shown_prices: Dict[str, float] = {}
+        
+        # System monitoring, gated on the monotonic clock
+        self._last_system_update = 0.0
         self._system_update_interval = 1.0  # seconds
+        # Changed status texts by tag, sampled on a worker thread and applied on the GUI thread
+        self._status_queue: Queue = Queue()
+        self._sysmon_stop = threading.Event()
+        
+        # Event loop for coroutines started from GUI callbacks, run on its own thread
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # (function, args) posted from other threads, run on the next frame
+        self._gui_calls: Queue = Queue()
 
     def setup(self):
         """Initialize Dear PyGui and setup main window"""
@@ -69,6 +99,10 @@ class MainWindow:
         ):
             self._setup_menu_bar()
             self._setup_main_layout()
+        self._created_items.add("main_window")
+        
+        self._setup_popups()
+        self._setup_layout_tracking()
             
         # Setup handlers
         self._setup_event_handlers()
@@ -76,6 +110,25 @@ class MainWindow:
         # Setup viewport
         dpg.setup_dearpygui()
         dpg.show_viewport()
+        
+        # Sample system resources off the render thread
+        threading.Thread(target=self._sysmon_worker, daemon=True).start()
+        
+        # DPG callbacks run without an event loop, so coroutines are submitted to this one
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, daemon=True).start()
+
+    def _setup_layout_tracking(self):
+        """Record the sidebar width whenever it changes"""
+        self._layout_cache["left_sidebar_width"] = dpg.get_item_width("left_sidebar")
+        with dpg.item_handler_registry(tag="layout_handlers"):
+            dpg.add_item_resize_handler(callback=self._on_layout_resize)
+        dpg.bind_item_handler_registry("left_sidebar", "layout_handlers")
+
+    def _on_layout_resize(self, sender, app_data):
+        """Cache the width of a resized layout item"""
+        item = dpg.get_item_alias(app_data) or app_data
+        self._layout_cache[f"{item}_width"] = dpg.get_item_width(app_data)
 
     def _setup_menu_bar(self):
         """Setup main menu bar"""
@@ -167,6 +220,9 @@ class MainWindow:
             ):
                 dpg.add_text("Price Overview")
                 dpg.add_separator()
+                # One line per configured pair, filled in by _flush_price_updates
+                for pair in TRADING_PAIRS:
+                    dpg.add_text(f"{pair}: -", tag=f"price_{pair}")
 
             # Charts
             with dpg.child_window(
@@ -266,11 +322,31 @@ class MainWindow:
         event_system.subscribe(EventTypes.MODULE_ERROR, self._handle_error)
         
     def _handle_price_update(self, event: Event):
-        """Handle price updates"""
-        data = event.data
-        pair = data["pair"]
-        price = data["ticker"]["price"]
-        dpg.set_value(f"price_{pair}", f"{pair}: {price:.2f}")
+        """Handle price updates; the display is refreshed on the next frame"""
+        ticker = event.data
+        self._last_prices[ticker.pair] = ticker.price
+        self._dirty_prices[ticker.pair] = ticker.price
+
+    def _flush_price_updates(self):
+        """Apply the latest price of each pair updated since the last frame"""
+        if not self._dirty_prices:
+            return
+        # Swap rather than clear so ticks arriving meanwhile land in the new dict
+        dirty, self._dirty_prices = self._dirty_prices, {}
+        for pair, price in dirty.items():
+            if self._shown_prices.get(pair) == price:
+                continue
+            display = self._price_tags.get(pair)
+            if display is None:
+                tag = f"price_{pair}"
+                if not dpg.does_item_exist(tag):
+                    # Only configured pairs have a price line
+                    continue
+                # %-formatting a pre-baked template beats both f-strings and str.format here
+                display = self._price_tags[pair] = (tag, pair.replace("%", "%%") + ": %.2f")
+            tag, template = display
+            dpg.set_value(tag, template % price)
+            self._shown_prices[pair] = price
 
     def _handle_balance_update(self, event: Event):
         """Handle balance updates"""
@@ -286,7 +362,7 @@ class MainWindow:
         pass
 
     def _save_config(self):
-        """Save application configuration"""
+        """Save application configuration; the file is written off the GUI thread"""
         try:
             config = {
                 "window": {
@@ -304,27 +380,46 @@ class MainWindow:
                 },
                 "layout": self._save_layout_state()
             }
+            asyncio.run_coroutine_threadsafe(self._write_config(config), self._loop)
             
-            with open(self.config_file, 'w') as f:
-                json.dump(config, f, indent=4)
+        except Exception as e:
+            self.logger.error(f"Error saving configuration: {str(e)}")
+            self._show_error("Save Error", f"Could not save configuration: {str(e)}")
+
+    async def _write_config(self, config: Dict[str, Any]):
+        """Write a configuration snapshot to disk"""
+        try:
+            data = fast_json.dumps(config, indent=True)
+            await asyncio.to_thread(self.config_file.write_text, data)
             
             self.logger.info("Configuration saved successfully")
-            dpg.show_item("save_success_popup")
+            self._call_on_gui(dpg.show_item, "save_success_popup")
             
         except Exception as e:
             self.logger.error(f"Error saving configuration: {str(e)}")
-            self._show_error("Save Error", f"Could not save configuration: {str(e)}")
+            self._call_on_gui(self._show_error, "Save Error", f"Could not save configuration: {str(e)}")
 
     def _load_config(self):
-        """Load application configuration"""
+        """Load application configuration; the file is read off the GUI thread"""
+        asyncio.run_coroutine_threadsafe(self._read_config(), self._loop)
+
+    async def _read_config(self):
+        """Read the configuration file and apply it on the next frame"""
         try:
-            if not self.config_file.exists():
+            if not await asyncio.to_thread(self.config_file.exists):
                 self.logger.info("No configuration file found")
                 return
             
-            with open(self.config_file, 'r') as f:
-                config = json.load(f)
+            config = fast_json.loads(await asyncio.to_thread(self.config_file.read_bytes))
+            self._call_on_gui(self._apply_config, config)
             
+        except Exception as e:
+            self.logger.error(f"Error loading configuration: {str(e)}")
+            self._call_on_gui(self._show_error, "Load Error", f"Could not load configuration: {str(e)}")
+
+    def _apply_config(self, config: Dict[str, Any]):
+        """Apply a loaded configuration to the GUI and modules"""
+        try:
             # Apply window settings
             if "window" in config:
                 dpg.set_viewport_width(config["window"]["width"])
@@ -362,7 +457,7 @@ class MainWindow:
     def _save_layout_state(self) -> Dict:
         """Save the current layout state"""
         return {
-            "left_sidebar_width": dpg.get_item_width("left_sidebar"),
+            **self._layout_cache,
             "tab_selected": dpg.get_value("main_tabs"),
             "window_positions": {
                 window: dpg.get_item_pos(window)
@@ -374,39 +469,39 @@ class MainWindow:
         """Restore the saved layout state"""
         if "left_sidebar_width" in layout:
             dpg.set_item_width("left_sidebar", layout["left_sidebar_width"])
+            self._layout_cache["left_sidebar_width"] = layout["left_sidebar_width"]
         
         if "tab_selected" in layout:
             dpg.set_value("main_tabs", layout["tab_selected"])
         
         if "window_positions" in layout:
             for window, pos in layout["window_positions"].items():
-                if dpg.does_item_exist(window):
+                if window in self._created_items:
                     dpg.set_item_pos(window, pos)
 
-    async def _place_order(self, side: str):
+    async def _place_order(self, side: str, pair: str, order_type: str, amount: float, price: Optional[float]):
         """
-        Place an order
+        Place an order; runs on the background loop, so GUI calls go through _call_on_gui
         Args:
             side: "buy" or "sell"
+            pair: Trading pair from the order form
+            order_type: "Market" or "Limit"
+            amount: Order amount
+            price: Limit price, None for market orders
         """
         try:
-            pair = dpg.get_value("trading_pair_selector")
-            order_type = dpg.get_value("order_type")
-            amount = dpg.get_value("order_amount")
-            price = dpg.get_value("order_price") if order_type == "Limit" else None
-            
             if not pair or not amount:
-                self._show_error("Order Error", "Please fill in all required fields")
+                self._call_on_gui(self._show_error, "Order Error", "Please fill in all required fields")
                 return
             
             # Validate amount
             if amount <= 0:
-                self._show_error("Order Error", "Amount must be greater than 0")
+                self._call_on_gui(self._show_error, "Order Error", "Amount must be greater than 0")
                 return
             
             # Validate price for limit orders
             if order_type == "Limit" and (not price or price <= 0):
-                self._show_error("Order Error", "Invalid price for limit order")
+                self._call_on_gui(self._show_error, "Order Error", "Invalid price for limit order")
                 return
             
             # Get current balance
@@ -414,9 +509,9 @@ class MainWindow:
             
             # Check if enough balance for buy orders
             if side == "buy":
-                required_balance = amount * (price or float(dpg.get_value(f"price_{pair}")))
+                required_balance = amount * (price or self._last_prices.get(pair, 0.0))
                 if required_balance > balance:
-                    self._show_error("Order Error", "Insufficient balance")
+                    self._call_on_gui(self._show_error, "Order Error", "Insufficient balance")
                     return
             
             # Create order
@@ -436,67 +531,88 @@ class MainWindow:
             ))
             
             # Clear form
-            dpg.set_value("order_amount", 0.0)
+            self._call_on_gui(dpg.set_value, "order_amount", 0.0)
             if order_type == "Limit":
-                dpg.set_value("order_price", 0.0)
+                self._call_on_gui(dpg.set_value, "order_price", 0.0)
             
         except Exception as e:
             self.logger.error(f"Error placing order: {str(e)}")
-            self._show_error("Order Error", f"Could not place order: {str(e)}")
+            self._call_on_gui(self._show_error, "Order Error", f"Could not place order: {str(e)}")
+
+    def _submit_order_form(self, side: str):
+        """Read the order form on the GUI thread and place the order on the background loop"""
+        order_type = dpg.get_value("order_type")
+        asyncio.run_coroutine_threadsafe(self._place_order(
+            side,
+            dpg.get_value("trading_pair_selector"),
+            order_type,
+            dpg.get_value("order_amount"),
+            dpg.get_value("order_price") if order_type == "Limit" else None
+        ), self._loop)
 
     def _place_buy_order(self):
         """Place buy order"""
-        asyncio.create_task(self._place_order("buy"))
+        self._submit_order_form("buy")
 
     def _place_sell_order(self):
         """Place sell order"""
-        asyncio.create_task(self._place_order("sell"))
+        self._submit_order_form("sell")
 
     def _update_system_status(self):
         """Update system status information"""
-        current_time = time.time()
+        current_time = time.monotonic()
         if current_time - self._last_system_update < self._system_update_interval:
             return
             
         try:
-            # Update connection status
-            connection_status = state_manager.get_state("data_manager_status", "unknown")
-            dpg.set_value("connection_status", f"Connection: {connection_status}")
-            
-            # Update active pairs
-            active_pairs = data_manager.get_status()["subscribed_pairs"]
-            dpg.set_value("active_pairs", f"Active Pairs: {', '.join(active_pairs)}")
+            # Each sample holds only the texts that changed; the newest text per tag wins
+            changes = {}
+            while True:
+                try:
+                    changes.update(self._status_queue.get_nowait())
+                except Empty:
+                    break
             
-            # Update system resources
-            process = psutil.Process(os.getpid())
-            memory_usage = process.memory_info().rss / 1024 / 1024  # MB
-            cpu_usage = process.cpu_percent()
-            
-            dpg.set_value("memory_usage", f"Memory Usage: {memory_usage:.1f} MB")
-            dpg.set_value("cpu_usage", f"CPU Usage: {cpu_usage:.1f}%")
+            for tag, text in changes.items():
+                dpg.set_value(tag, text)
             
             self._last_system_update = current_time
             
         except Exception as e:
             self.logger.error(f"Error updating system status: {str(e)}")
 
+    def _sysmon_worker(self):
+        """Sample system status on a background thread and queue it for the GUI"""
+        process = psutil.Process(os.getpid())
+        process.cpu_percent()  # The first call only primes the counter
+        shown: Dict[str, str] = {}
+        
+        while not self._sysmon_stop.wait(self._system_update_interval):
+            try:
+                connection_status = state_manager.get_state("data_manager_status", "unknown")
+                active_pairs = data_manager.get_status()["subscribed_pairs"]
+                memory_usage = process.memory_info().rss / 1024 / 1024  # MB
+                cpu_usage = process.cpu_percent()
+                
+                status = {
+                    "connection_status": f"Connection: {connection_status}",
+                    "active_pairs": f"Active Pairs: {', '.join(sorted(active_pairs))}",
+                    "memory_usage": f"Memory Usage: {memory_usage:.1f} MB",
+                    "cpu_usage": f"CPU Usage: {cpu_usage:.1f}%"
+                }
+                changes = {tag: text for tag, text in status.items() if shown.get(tag) != text}
+                if changes:
+                    self._status_queue.put(changes)
+                    shown.update(changes)
+                
+            except Exception as e:
+                self.logger.error(f"Error sampling system status: {str(e)}")
+
     def _show_error(self, title: str, message: str):
         """Show error popup"""
-        with dpg.window(
-            label=title,
-            modal=True,
-            show=True,
-            tag="error_popup",
-            width=400,
-            height=150
-        ):
-            dpg.add_text(message)
-            dpg.add_separator()
-            dpg.add_button(
-                label="OK",
-                callback=lambda: dpg.delete_item("error_popup"),
-                width=75
-            )
+        dpg.set_value("error_popup_text", message)
+        dpg.configure_item("error_popup", label=title)
+        dpg.show_item("error_popup")
 
     def _setup_popups(self):
         """Setup popup windows"""
@@ -514,15 +630,57 @@ class MainWindow:
                 callback=lambda: dpg.hide_item("save_success_popup"),
                 width=75
             )
+        
+        self._created_items.add("save_success_popup")
+        
+        # Reused by _show_error; only the title and message change
+        with dpg.window(
+            label="Error",
+            modal=True,
+            show=False,
+            tag="error_popup",
+            width=400,
+            height=150
+        ):
+            dpg.add_text("", tag="error_popup_text")
+            dpg.add_separator()
+            dpg.add_button(
+                label="OK",
+                callback=lambda: dpg.hide_item("error_popup"),
+                width=75
+            )
+        self._created_items.add("error_popup")
+
+    def toggle_window(self, window: str, show: Optional[bool] = None):
+        """
+        Show or hide a top-level window
+        Args:
+            window: Window tag
+            show: True/False to force visibility, None to toggle
+        """
+        if window not in self._created_items:
+            self.logger.warning(f"Unknown window: {window}")
+            return
+        
+        if show is None:
+            show = window not in self._active_windows
+        dpg.configure_item(window, show=show)
+        if show:
+            self._active_windows.add(window)
+        else:
+            self._active_windows.discard(window)
 
     def _exit_application(self):
         """Handle application exit"""
         try:
             # Cleanup and stop all modules
-            for module in self._modules:
+            for module in self._modules.values():
                 module.cleanup()
             
             # Stop core systems
+            self._sysmon_stop.set()
+            if self._loop:
+                self._loop.call_soon_threadsafe(self._loop.stop)
             event_system.stop()
             data_manager.stop()
             
@@ -533,20 +691,48 @@ class MainWindow:
         except Exception as e:
             self.logger.error(f"Error during application exit: {str(e)}")
 
+    def _call_on_gui(self, func, *args):
+        """Run a function on the GUI thread before the next frame"""
+        self._gui_calls.put((func, args))
+
+    def _run_gui_calls(self):
+        """Run functions posted with _call_on_gui"""
+        while True:
+            try:
+                func, args = self._gui_calls.get_nowait()
+            except Empty:
+                return
+            try:
+                func(*args)
+            except Exception as e:
+                self.logger.error(f"Error in GUI call {func.__name__}: {str(e)}")
+
+    def register_module(self, module):
+        """Add an initialized module so it is updated every frame and saved with the config"""
+        self._modules[module.module_id] = module
+
+    def process_frame(self):
+        """Run per-frame GUI work; called once before each frame is rendered"""
+        self._run_gui_calls()
+        try:
+            self._flush_price_updates()
+        except Exception as e:
+            self.logger.error(f"Error updating prices: {str(e)}")
+        self._update_system_status()
+        
+        # Copied since modules can be added from DPG callback threads
+        for module in tuple(self._modules.values()):
+            try:
+                module.update()
+            except Exception as e:
+                self.logger.error(f"Error updating module {module.module_id}: {str(e)}")
+
     def run(self):
-        """Start the main event loop"""
+        """Start the main render loop"""
         try:
-            # Start update loop
-            async def update_loop():
-                while dpg.is_dearpygui_running():
-                    self._update_system_status()
-                    await asyncio.sleep(0.1)
-            
-            # Run event loop
-            loop = asyncio.get_event_loop()
-            loop.create_task(update_loop())
-            
-            dpg.start_dearpygui()
+            while dpg.is_dearpygui_running():
+                self.process_frame()
+                dpg.render_dearpygui_frame()
             
         except Exception as e:
             self.logger.error(f"Error in main loop: {str(e)}")
@@ -567,13 +753,7 @@ class MainWindow:
                 dpg.add_text("Select Module Type:")
                 
                 # Module types list
-                module_types = [
-                    "Market Data Display",
-                    "Order Management",
-                    "Position Monitor",
-                    "Account Balance",
-                    "Moving Average Cross"
-                ]
+                module_types = list(self._MODULE_TYPES)
                 
                 dpg.add_listbox(
                     items=module_types,
@@ -609,20 +789,11 @@ class MainWindow:
             module_id = dpg.get_value("module_id_input")
             
             # Create the selected module type
-            new_module = None
-            if module_type == "Market Data Display":
-                new_module = MarketDataDisplay(module_id)
-            elif module_type == "Order Management":
-                new_module = OrderManagement(module_id)
-            elif module_type == "Position Monitor":
-                new_module = PositionMonitor(module_id)
-            elif module_type == "Account Balance":
-                new_module = AccountBalance(module_id)
-            elif module_type == "Moving Average Cross":
-                new_module = MovingAverageCross(module_id)
+            module_class = self._MODULE_TYPES.get(module_type)
+            new_module = module_class(module_id) if module_class else None
                 
             if new_module and new_module.initialize():
-                self._modules.append(new_module)
+                self._modules[module_id] = new_module
                 self.logger.info(f"Loaded new module: {module_type} ({module_id})")
             else:
                 self._show_error("Error", f"Failed to initialize module: {module_type}")
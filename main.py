@@ -2,6 +2,7 @@
 import asyncio
 import logging
 import sys
+import time
 from pathlib import Path
 import dearpygui.dearpygui as dpg
 
@@ -16,6 +17,14 @@ from modules.account_balance import AccountBalance
 from modules.strategies.moving_average_cross import MovingAverageCross
 from config.config import TRADING_PAIRS
 
+try:
+    import uvloop
+except ImportError:  # Not available on Windows; fall back to the default loop
+    uvloop = None
+
+# Render loop frame rate cap
+MAX_FPS = 60
+
 def setup_logging():
     """Setup logging configuration"""
     log_file = Path("logs/trading_system.log")
@@ -32,16 +41,6 @@ def setup_logging():
 async def initialize_system():
     """Initialize all system components"""
     try:
-        # Setup logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("trading_system.log"),
-                logging.StreamHandler(sys.stdout)
-            ]
-        )
-        
         # Create necessary directories
         Path("data").mkdir(exist_ok=True)
         Path("logs").mkdir(exist_ok=True)
@@ -54,6 +53,7 @@ async def initialize_system():
         dpg.setup_dearpygui()
         
         # Initialize core components
+        state_manager.start_sweeper()
         await data_manager.start()
         logging.info("Data manager started")
         
@@ -75,6 +75,7 @@ async def initialize_system():
                 if not module.initialize():
                     logging.error(f"Failed to initialize module: {module.module_name}")
                     return False
+                main_window.register_module(module)
                 logging.info(f"Initialized module: {module.module_name}")
             except Exception as e:
                 logging.error(f"Error initializing module {module.module_name}: {str(e)}")
@@ -91,6 +92,7 @@ async def cleanup_system():
     """Cleanup system resources"""
     try:
         await data_manager.stop()
+        state_manager.stop_sweeper()
         # Add any other cleanup tasks here
         
     except Exception as e:
@@ -99,15 +101,28 @@ async def cleanup_system():
 async def main():
     """Main application entry point"""
     try:
+        setup_logging()
+        
         # Initialize system
         if not await initialize_system():
             logging.error("System initialization failed")
             return
         
-        # Start main event loop
+        # Start main event loop, pacing frames against the monotonic clock
+        frame_interval = 1 / MAX_FPS
+        next_frame = time.monotonic()
         while dpg.is_dearpygui_running():
-            await asyncio.sleep(0.1)
+            main_window.process_frame()
             dpg.render_dearpygui_frame()
+            
+            next_frame += frame_interval
+            delay = next_frame - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # Running behind; let other tasks run and restart pacing from now
+                next_frame = time.monotonic()
+                await asyncio.sleep(0)
         
         # Cleanup
         await cleanup_system()
@@ -118,4 +133,6 @@ async def main():
         dpg.destroy_context()
 
 if __name__ == "__main__":
+    if uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     asyncio.run(main())
\ No newline at end of file
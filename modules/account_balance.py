@@ -1,13 +1,53 @@
 import dearpygui.dearpygui as dpg
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-import logging
-from decimal import Decimal
-import json
+import numpy as np
+from typing import Dict, Any, Optional, Sequence
+from datetime import datetime, timezone
+import time
+import functools
+import threading
+from queue import Queue
+import os
+from pathlib import Path
 
 from core.base_module import ModuleBase
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
+from utils import fast_json
+from utils.column_history import ColumnHistory
+
+# Full history written at cleanup, and the entries tracked since, one JSON object per line
+HISTORY_SNAPSHOT_PATH = Path("data/balance_history.json")
+HISTORY_LOG_PATH = Path("data/balance_history.jsonl")
+
+# Length of each fixed history period in microseconds; None shows everything
+HISTORY_PERIODS_US = {
+    "24 Hours": 86_400_000_000,
+    "7 Days": 7 * 86_400_000_000,
+    "30 Days": 30 * 86_400_000_000,
+    "90 Days": 90 * 86_400_000_000,
+    "All Time": None
+}
+
+def _epoch_us(value: Any) -> int:
+    """Convert epoch microseconds or a naive-UTC ISO string from older history files"""
+    if isinstance(value, str):
+        # numpy reads naive ISO strings as UTC, exactly, without building a datetime
+        return int(np.datetime64(value, "us").astype(np.int64))
+    return int(value)
+
+def _epoch_us_array(values: Sequence[str]) -> np.ndarray:
+    """Convert naive-UTC ISO strings from older history files to epoch microseconds in one pass"""
+    return np.array(values, dtype="datetime64[us]").astype(np.int64)
+
+@functools.lru_cache(maxsize=512)
+def _resolve_unit_price(asset: str, epoch: int) -> float:
+    """
+    Get the USD price of one unit of an asset
+    Args:
+        asset: Asset code
+        epoch: Price epoch the result is valid for; only part of the cache key
+    """
+    return state_manager.get_usd_price(asset)
 
 class AccountBalance(ModuleBase):
     def __init__(self, module_id: str):
@@ -17,17 +57,61 @@ class AccountBalance(ModuleBase):
         
         # Balance tracking
         self._balances: Dict[str, float] = {}
-        self._equity_history: List[Dict] = []
-        self._balance_history: Dict[str, List[Dict]] = {}
-        
-        # Display settings
-        self._value_precision = 8  # For crypto amounts
-        self._fiat_precision = 2   # For fiat values
-        
+        # Price pairs that value a held asset -> that asset, rebuilt when the held set changes
+        self._tracked_pairs: Dict[str, str] = {}
         # Tracking settings
         self._track_interval = 3600  # 1 hour in seconds
-        self._last_track_time = 0
+        self._retention_hours = 24 * 365  # History older than this is dropped
+        self._last_track_time = float("-inf")  # time.monotonic() of the last tracked entry
+        # Set by the event thread when an entry is due; the entry is recorded by update(),
+        # so the history arrays are only ever touched on the GUI thread
+        self._track_due = False
         self._base_currency = "USD"  # For value calculations
+        self._price_epoch = 0  # Bumped on every price update to invalidate cached prices
+        self._hist_fh = None  # Append handle for HISTORY_LOG_PATH, opened on first entry
+        # Log entries are written on a background thread; None stops it
+        self._history_queue: Queue = Queue()
+        self._history_writer: Optional[threading.Thread] = None
+        
+        # Column-wise history keyed by epoch microseconds, capped at the retention period
+        self._equity_history = ColumnHistory(("value",), maxlen=self._history_maxlen())
+        self._balance_history: Dict[str, ColumnHistory] = {}
+        
+        # Display settings
+        self._set_precision(8, 2)  # Crypto amounts, fiat values
+        
+        # Display refresh, coalesced to at most one repaint per interval
+        self._ui_refresh_interval = 0.25  # seconds
+        self._last_ui_refresh = 0.0
+        self._ui_dirty = False
+        self._history_dirty = False
+        # Set while the portfolio analysis is out of date and its tab is hidden
+        self._portfolio_dirty = False
+
+    def _set_precision(self, value_precision: int, fiat_precision: int):
+        """Set display precision and rebuild the cell format templates"""
+        self._value_precision = value_precision
+        self._fiat_precision = fiat_precision
+        self._val_fmt = "%%.%df" % value_precision
+        self._fiat_fmt = "$%%.%df" % fiat_precision
+        self._pct_fmt = "%.2f%%"
+
+    def _history_maxlen(self) -> int:
+        """Number of tracking intervals in the retention period"""
+        return max(1, self._retention_hours * 3600 // self._track_interval)
+
+    def set_retention(self, hours: int):
+        """
+        Set how much balance history is kept, dropping anything older
+        Args:
+            hours: Retention period in hours
+        """
+        self._retention_hours = hours
+        maxlen = self._history_maxlen()
+        self._equity_history.set_maxlen(maxlen)
+        for history in self._balance_history.values():
+            history.set_maxlen(maxlen)
+        self._history_dirty = True
 
     def initialize(self) -> bool:
         """Initialize the module"""
@@ -41,6 +125,9 @@ class AccountBalance(ModuleBase):
             
             # Load historical data
             self._load_history()
+            self._update_history_view()
+            self._history_writer = threading.Thread(target=self._history_writer_loop, daemon=True)
+            self._history_writer.start()
             
             return True
         except Exception as e:
@@ -111,10 +198,9 @@ class AccountBalance(ModuleBase):
             tag=f"{self.module_id}_balance_plot"
         ):
             dpg.add_plot_legend()
-            dpg.add_plot_axis(dpg.mvXAxis, label="Date")
-            dpg.add_plot_axis(dpg.mvYAxis, label="Value (USD)")
-            
-            # Line series will be added dynamically
+            dpg.add_plot_axis(dpg.mvXAxis, label="Date", scale=dpg.mvPlotScale_Time)
+            with dpg.plot_axis(dpg.mvYAxis, label="Value (USD)", tag=f"{self.module_id}_balance_y_axis"):
+                dpg.add_line_series([], [], label="Total Equity", tag=f"{self.module_id}_equity_series")
 
     def _setup_portfolio_analysis(self):
         """Setup portfolio analysis view"""
@@ -127,7 +213,13 @@ class AccountBalance(ModuleBase):
         ):
             dpg.add_plot_legend()
             dpg.add_plot_axis(dpg.mvXAxis, no_tick_labels=True)
-            dpg.add_plot_axis(dpg.mvYAxis, no_tick_labels=True)
+            with dpg.plot_axis(dpg.mvYAxis, no_tick_labels=True):
+                dpg.add_pie_series(0.5, 0.5, 0.5, [], [], tag=f"{self.module_id}_allocation_series")
+        
+        # Catch up on analysis deferred while the tab was hidden
+        with dpg.item_handler_registry() as handlers:
+            dpg.add_item_visible_handler(callback=self._on_portfolio_visible)
+        dpg.bind_item_handler_registry(f"{self.module_id}_allocation_plot", handlers)
         
         dpg.add_separator()
         
@@ -157,17 +249,24 @@ class AccountBalance(ModuleBase):
             balances = event.data["balances"]
             
             # Update balance tracking
+            if balances.keys() != self._balances.keys():
+                self._tracked_pairs = {
+                    f"{asset}/{quote}": asset
+                    for asset in balances
+                    for quote in ("USD", "USDT")
+                }
+                # Newly held assets may have prices cached from before they were tracked
+                self._price_epoch += 1
             self._balances = balances
             
-            # Track historical data
-            current_time = datetime.utcnow().timestamp()
+            # Track historical data on the next update()
+            current_time = time.monotonic()
             if current_time - self._last_track_time >= self._track_interval:
-                self._track_balance_history()
+                self._track_due = True
                 self._last_track_time = current_time
             
-            # Update displays
-            self._update_balances_table()
-            self._update_portfolio_analysis()
+            # Repainted by the next update()
+            self._ui_dirty = True
             
         except Exception as e:
             self.logger.error(f"Error handling balance update: {str(e)}")
@@ -175,15 +274,12 @@ class AccountBalance(ModuleBase):
     def _handle_price_update(self, event: Event):
         """Handle price updates for value calculations"""
         try:
-            data = event.data
-            pair = data["pair"]
-            price = data["ticker"]["price"]
-            
-            # Update value calculations if the price is for a held asset
-            asset = pair.split('/')[0]
-            if asset in self._balances:
-                self._update_balances_table()
-                self._update_portfolio_analysis()
+            # Prices of assets not held are never looked up, so skip them outright
+            if event.data.pair not in self._tracked_pairs:
+                return
+            
+            self._price_epoch += 1
+            self._ui_dirty = True
                 
         except Exception as e:
             self.logger.error(f"Error handling price update: {str(e)}")
@@ -191,38 +287,37 @@ class AccountBalance(ModuleBase):
     def _update_balances_table(self):
         """Update balances table display"""
         try:
-            # Clear existing rows
-            dpg.delete_item(f"{self.module_id}_balances_table", children_only=True, slot=1)
+            table = f"{self.module_id}_balances_table"
             
-            total_value = 0
+            # Value every asset up front so each row is built with its final percentage
+            prices = self._unit_prices()
+            values = [
+                (asset, balance, prices[asset] * balance["total"])
+                for asset, balance in self._balances.items()
+            ]
+            total_value = sum(value for _, _, value in values)
             
-            # Add balance rows
-            for asset, balance in self._balances.items():
-                # Get asset value in USD
-                value = self._get_asset_value_usd(asset, balance["total"])
-                total_value += value
+            val_fmt = self._val_fmt
+            fiat_fmt = self._fiat_fmt
+            pct_fmt = self._pct_fmt
+            # Percentages come straight from the computed values, never from the table cells
+            pct_scale = 100 / total_value if total_value > 0 else 0.0
+            
+            # Rebuild under the DPG mutex so the renderer never sees a half-built table
+            with dpg.mutex():
+                dpg.delete_item(table, children_only=True, slot=1)
                 
-                with dpg.table_row(parent=f"{self.module_id}_balances_table"):
-                    dpg.add_text(asset)
-                    dpg.add_text(f"{balance['available']:.{self._value_precision}f}")
-                    dpg.add_text(f"{balance['in_orders']:.{self._value_precision}f}")
-                    dpg.add_text(f"{balance['total']:.{self._value_precision}f}")
-                    dpg.add_text(f"${value:.{self._fiat_precision}f}")
-                    dpg.add_text("0.00%")  # Will be updated after total calculation
-            
-            # Update percentages
-            if total_value > 0:
-                for row in dpg.get_item_children(f"{self.module_id}_balances_table", slot=1):
-                    asset = dpg.get_item_children(row)[0]
-                    value_cell = dpg.get_item_children(row)[4]
-                    pct_cell = dpg.get_item_children(row)[5]
-                    
-                    value = float(dpg.get_value(value_cell).replace('$', ''))
-                    percentage = (value / total_value) * 100
-                    dpg.set_value(pct_cell, f"{percentage:.2f}%")
+                for asset, balance, value in values:
+                    with dpg.table_row(parent=table):
+                        dpg.add_text(asset)
+                        dpg.add_text(val_fmt % balance["available"])
+                        dpg.add_text(val_fmt % balance["in_orders"])
+                        dpg.add_text(val_fmt % balance["total"])
+                        dpg.add_text(fiat_fmt % value)
+                        dpg.add_text(pct_fmt % (value * pct_scale))
             
             # Update total value display
-            dpg.set_value(f"{self.module_id}_total_value", f"${total_value:.{self._fiat_precision}f}")
+            dpg.set_value(f"{self.module_id}_total_value", fiat_fmt % total_value)
             
             # Update 24h change
             self._update_24h_change(total_value)
@@ -230,19 +325,70 @@ class AccountBalance(ModuleBase):
         except Exception as e:
             self.logger.error(f"Error updating balances table: {str(e)}")
 
-    def _get_asset_value_usd(self, asset: str, amount: float) -> float:
-        """Get USD value of an asset amount"""
+    def _update_24h_change(self, total_value: float):
+        """Show the change in total equity against the last history sample at least 24 hours old"""
+        timestamps = self._equity_history.timestamps
+        if not len(timestamps):
+            return
+        cutoff = time.time_ns() // 1000 - HISTORY_PERIODS_US["24 Hours"]
+        # Oldest sample when the history does not reach back 24 hours
+        i = max(int(np.searchsorted(timestamps, cutoff, side="right")) - 1, 0)
+        past_value = self._equity_history.column("value")[i]
+        if past_value > 0:
+            dpg.set_value(f"{self.module_id}_24h_change", "%+.2f%%" % ((total_value / past_value - 1) * 100))
+
+    def _update_portfolio_analysis(self):
+        """Recompute the allocation chart and portfolio metrics, deferred while the tab is hidden"""
+        if not dpg.is_item_visible(f"{self.module_id}_allocation_plot"):
+            self._portfolio_dirty = True
+            return
+        self._portfolio_dirty = False
+        
         try:
-            if asset == "USD":
-                return amount
+            prices = self._unit_prices()
+            held = [
+                (asset, prices[asset] * balance["total"])
+                for asset, balance in self._balances.items()
+            ]
+            held = [(asset, value) for asset, value in held if value > 0]
+            
+            assets = [asset for asset, _ in held]
+            values = np.array([value for _, value in held], dtype=np.float64)
+            dpg.configure_item(f"{self.module_id}_allocation_series", values=values.tolist(), labels=assets)
+            dpg.set_value(f"{self.module_id}_total_assets", str(len(assets)))
             
-            # Get price from state manager
-            price = state_manager.get_state(f"price_{asset}/USD", None)
-            if price is None:
-                # Try to get price through another pair (e.g., USDT)
-                price = state_manager.get_state(f"price_{asset}/USDT", 0.0)
+            if not len(values):
+                dpg.set_value(f"{self.module_id}_most_valuable", "-")
+                dpg.set_value(f"{self.module_id}_diversity_index", "0.00")
+                dpg.set_value(f"{self.module_id}_portfolio_score", "0.00")
+                return
             
-            return amount * price
+            # Gini-Simpson diversity of the value weights; the score scales it to the
+            # maximum possible for this many assets
+            weights = values / values.sum()
+            diversity = 1.0 - float(np.dot(weights, weights))
+            score = diversity / (1.0 - 1.0 / len(values)) * 100 if len(values) > 1 else 0.0
+            
+            dpg.set_value(f"{self.module_id}_most_valuable", assets[int(values.argmax())])
+            dpg.set_value(f"{self.module_id}_diversity_index", "%.2f" % diversity)
+            dpg.set_value(f"{self.module_id}_portfolio_score", "%.2f" % score)
+            
+        except Exception as e:
+            self.logger.error(f"Error updating portfolio analysis: {str(e)}")
+
+    def _on_portfolio_visible(self, sender, app_data):
+        """Run the portfolio analysis skipped while its tab was hidden"""
+        if self._portfolio_dirty:
+            self._update_portfolio_analysis()
+
+    def _unit_prices(self) -> Dict[str, float]:
+        """Snapshot the USD price of one unit of every held asset"""
+        return {asset: self._get_asset_value_usd(asset, 1.0) for asset in self._balances}
+
+    def _get_asset_value_usd(self, asset: str, amount: float) -> float:
+        """Get USD value of an asset amount"""
+        try:
+            return amount * _resolve_unit_price(asset, self._price_epoch)
             
         except Exception as e:
             self.logger.error(f"Error calculating asset value: {str(e)}")
@@ -251,74 +397,207 @@ class AccountBalance(ModuleBase):
     def _track_balance_history(self):
         """Track current balances in history"""
         try:
-            timestamp = datetime.utcnow()
+            timestamp = time.time_ns() // 1000
             
-            # Track individual asset balances
-            for asset, balance in self._balances.items():
-                if asset not in self._balance_history:
-                    self._balance_history[asset] = []
-                
-                self._balance_history[asset].append({
-                    "timestamp": timestamp,
-                    "amount": balance["total"],
-                    "value_usd": self._get_asset_value_usd(asset, balance["total"])
-                })
-            
-            # Track total equity
-            total_value = sum(
-                self._get_asset_value_usd(asset, balance["total"])
+            # One price lookup per asset, shared by the asset records and the total
+            prices = self._unit_prices()
+            assets = {
+                asset: (balance["total"], prices[asset] * balance["total"])
                 for asset, balance in self._balances.items()
-            )
+            }
+            total_value = sum(value_usd for _, value_usd in assets.values())
+            
+            self._record_history(timestamp, assets, total_value)
+            self._history_queue.put((timestamp, assets, total_value))
+            self._history_dirty = True
+            
+        except Exception as e:
+            self.logger.error(f"Error tracking balance history: {str(e)}")
+
+    def _update_history_view(self, sender=None, value=None):
+        """Plot the equity history for the selected time period"""
+        try:
+            period = value or dpg.get_value(f"{self.module_id}_time_period")
+            timestamps = self._equity_history.timestamps
+            
+            if period == "YTD":
+                now = datetime.now(timezone.utc)
+                cutoff = int(datetime(now.year, 1, 1, tzinfo=timezone.utc).timestamp() * 1_000_000)
+            else:
+                span = HISTORY_PERIODS_US.get(period)
+                cutoff = None if span is None else time.time_ns() // 1000 - span
             
-            self._equity_history.append({
+            # Timestamps are sorted, so the period is a contiguous tail of every column
+            start = 0 if cutoff is None else int(np.searchsorted(timestamps, cutoff))
+            dpg.set_value(f"{self.module_id}_equity_series", [
+                timestamps[start:] / 1e6,
+                self._equity_history.column("value")[start:]
+            ])
+            dpg.fit_axis_data(f"{self.module_id}_balance_y_axis")
+            
+        except Exception as e:
+            self.logger.error(f"Error updating history view: {str(e)}")
+
+    def _record_history(self, timestamp: int, assets: Dict[str, Sequence[float]], total_value: float):
+        """
+        Add one tracking interval to the in-memory history
+        Args:
+            timestamp: Sample time in epoch microseconds
+            assets: Asset -> (amount, value_usd)
+            total_value: Total equity in USD
+        """
+        for asset, (amount, value_usd) in assets.items():
+            history = self._balance_history.get(asset)
+            if history is None:
+                history = self._balance_history[asset] = ColumnHistory(("amount", "value_usd"), maxlen=self._history_maxlen())
+            history.append(timestamp, amount, value_usd)
+        
+        self._equity_history.append(timestamp, total_value)
+
+    def _history_writer_loop(self):
+        """Append queued tracking intervals to the history log until stopped"""
+        while True:
+            entry = self._history_queue.get()
+            if entry is None:
+                break
+            self._append_history_entry(*entry)
+
+    def _append_history_entry(self, timestamp: int, assets: Dict[str, Sequence[float]], total_value: float):
+        """Append one tracking interval to the history log"""
+        try:
+            if self._hist_fh is None:
+                HISTORY_LOG_PATH.parent.mkdir(exist_ok=True)
+                self._hist_fh = open(HISTORY_LOG_PATH, "a")
+            
+            self._hist_fh.write(fast_json.dumps({
                 "timestamp": timestamp,
-                "value": total_value
-            })
+                "value": total_value,
+                "assets": assets
+            }) + "\n")
+            self._hist_fh.flush()
             
-            # Save history to file
-            self._save_history()
+        except Exception as e:
+            self.logger.error(f"Error appending balance history: {str(e)}")
+
+    def _load_history(self):
+        """Load the history snapshot, then replay entries logged after it"""
+        try:
+            if HISTORY_SNAPSHOT_PATH.exists():
+                with open(HISTORY_SNAPSHOT_PATH, "rb") as f:
+                    history_data = fast_json.loads(f.read())
+                if "equity_history" in history_data:
+                    history_data = self._columns_from_records(history_data)
+                
+                equity = history_data["equity"]
+                self._equity_history.extend(equity["timestamp"], equity["value"])
+                for asset, columns in history_data["assets"].items():
+                    history = self._balance_history[asset] = ColumnHistory(("amount", "value_usd"), maxlen=self._history_maxlen())
+                    history.extend(columns["timestamp"], columns["amount"], columns["value_usd"])
+            
+            if HISTORY_LOG_PATH.exists():
+                # Entries already in the snapshot are left over from an interrupted compaction
+                timestamps = self._equity_history.timestamps
+                last = int(timestamps[-1]) if len(timestamps) else None
+                with open(HISTORY_LOG_PATH, "r") as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        entry = fast_json.loads(line)
+                        timestamp = _epoch_us(entry["timestamp"])
+                        if last is None or timestamp > last:
+                            self._record_history(timestamp, entry["assets"], entry["value"])
             
         except Exception as e:
-            self.logger.error(f"Error tracking balance history: {str(e)}")
+            self.logger.error(f"Error loading balance history: {str(e)}")
+
+    @staticmethod
+    def _columns_from_records(history_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a snapshot saved as lists of ISO-timestamped records to the column layout"""
+        equity = history_data.get("equity_history", [])
+        return {
+            "equity": {
+                "timestamp": _epoch_us_array([entry["timestamp"] for entry in equity]),
+                "value": [entry["value"] for entry in equity]
+            },
+            "assets": {
+                asset: {
+                    "timestamp": _epoch_us_array([entry["timestamp"] for entry in history]),
+                    "amount": [entry["amount"] for entry in history],
+                    "value_usd": [entry["value_usd"] for entry in history]
+                }
+                for asset, history in history_data.get("balance_history", {}).items()
+            }
+        }
 
     def _save_history(self):
-        """Save balance history to file"""
+        """Write the full history snapshot and truncate the history log it supersedes"""
         try:
+            # Column views are serialized directly, without building lists
             history_data = {
-                "equity_history": [
-                    {
-                        "timestamp": entry["timestamp"].isoformat(),
-                        "value": entry["value"]
+                "equity": {
+                    "timestamp": self._equity_history.timestamps,
+                    "value": self._equity_history.column("value")
+                },
+                "assets": {
+                    asset: {
+                        "timestamp": history.timestamps,
+                        "amount": history.column("amount"),
+                        "value_usd": history.column("value_usd")
                     }
-                    for entry in self._equity_history
-                ],
-                "balance_history": {
-                    asset: [
-                        {
-                            "timestamp": entry["timestamp"].isoformat(),
-                            "amount": entry["amount"],
-                            "value_usd": entry["value_usd"]
-                        }
-                        for entry in history
-                    ]
                     for asset, history in self._balance_history.items()
                 }
             }
             
-            with open("data/balance_history.json", "w") as f:
-                json.dump(history_data, f, indent=4)
+            HISTORY_SNAPSHOT_PATH.parent.mkdir(exist_ok=True)
+            tmp_path = HISTORY_SNAPSHOT_PATH.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(fast_json.dumps_bytes(history_data))
+            os.replace(tmp_path, HISTORY_SNAPSHOT_PATH)
+            
+            # Everything logged so far is now in the snapshot
+            if self._hist_fh is not None:
+                self._hist_fh.close()
+                self._hist_fh = None
+            HISTORY_LOG_PATH.unlink(missing_ok=True)
                 
         except Exception as e:
             self.logger.error(f"Error saving balance history: {str(e)}")
 
     def update(self) -> None:
-        """Update the module"""
-        pass  # Updates are handled by event callbacks
+        """Repaint the balance displays if they changed, at most once per refresh interval"""
+        if self._track_due:
+            self._track_due = False
+            self._track_balance_history()
+        
+        if not self._ui_dirty:
+            return
+        now = time.monotonic()
+        if now - self._last_ui_refresh < self._ui_refresh_interval:
+            return
+        
+        try:
+            # Cleared before repainting so updates arriving meanwhile trigger another pass
+            self._ui_dirty = False
+            self._last_ui_refresh = now
+            self._update_balances_table()
+            self._update_portfolio_analysis()
+            if self._history_dirty:
+                self._history_dirty = False
+                self._update_history_view()
+            
+        except Exception as e:
+            self.logger.error(f"Error refreshing balance displays: {str(e)}")
 
     def cleanup(self) -> None:
         """Cleanup module resources"""
         event_system.unsubscribe(EventTypes.BALANCE_UPDATE, self._handle_balance_update)
         event_system.unsubscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
+        
+        # Let the writer drain the queue so the snapshot supersedes every logged entry
+        if self._history_writer is not None:
+            self._history_queue.put(None)
+            self._history_writer.join()
+            self._history_writer = None
         self._save_history()
 
     def get_data(self) -> Dict[str, Any]:
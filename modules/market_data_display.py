@@ -1,11 +1,11 @@
 import dearpygui.dearpygui as dpg
-from typing import Dict, List, Any, Optional
+import numpy as np
+from typing import Dict, List, Any, Tuple
 from datetime import datetime
-import logging
+import time
 
 from core.base_module import ModuleBase
 from core.event_system import event_system, Event, EventTypes
-from core.state_manager import state_manager
 
 class MarketDataDisplay(ModuleBase):
     def __init__(self, module_id: str):
@@ -17,12 +17,27 @@ class MarketDataDisplay(ModuleBase):
         self._price_cache: Dict[str, float] = {}
         self._volume_cache: Dict[str, float] = {}
         self._orderbook_cache: Dict[str, Dict] = {}
+        # Trade batches for the selected pair not yet shown; swapped out by the updater
+        self._pending_trades: List[np.ndarray] = []
+        self._last_trade_ts_shown = 0.0
         
         # Display settings
         self._orderbook_depth = 10
+        self._trades_depth = 10
         self._selected_pair = ""
         self._price_precision = 2
         self._size_precision = 6
+        self._set_precision(self._price_precision, self._size_precision)
+        
+        # Book/trade tables are repainted from the caches at most once per interval
+        self._ui_refresh_interval = 0.25  # seconds
+        self._last_ui_refresh = 0.0
+        self._book_dirty = False
+        self._trades_dirty = False
+        
+        # Persistent (price, size, total) cells per book row, updated in place
+        self._book_cells: Dict[str, List[Tuple[int, int, int]]] = {"bids": [], "asks": []}
+        self._book_rows_shown: Dict[str, int] = {"bids": 0, "asks": 0}
 
     def initialize(self) -> bool:
         """Initialize the module"""
@@ -75,6 +90,7 @@ class MarketDataDisplay(ModuleBase):
                     dpg.add_table_column(label="Price")
                     dpg.add_table_column(label="Size")
                     dpg.add_table_column(label="Total")
+                self._book_cells["bids"] = self._create_book_rows(f"{self.module_id}_bids_table")
             
             # Asks
             with dpg.child_window(width=200, height=300):
@@ -88,6 +104,7 @@ class MarketDataDisplay(ModuleBase):
                     dpg.add_table_column(label="Price")
                     dpg.add_table_column(label="Size")
                     dpg.add_table_column(label="Total")
+                self._book_cells["asks"] = self._create_book_rows(f"{self.module_id}_asks_table")
         
         dpg.add_separator()
         
@@ -105,23 +122,30 @@ class MarketDataDisplay(ModuleBase):
                 dpg.add_table_column(label="Size")
                 dpg.add_table_column(label="Side")
 
+    def _set_precision(self, price_precision: int, size_precision: int):
+        """Set display precision and rebuild the number format templates"""
+        self._price_precision = price_precision
+        self._size_precision = size_precision
+        self._price_fmt = "%%.%df" % price_precision
+        self._size_fmt = "%%.%df" % size_precision
+
     def _handle_price_update(self, event: Event):
         """Handle price updates"""
-        data = event.data
-        pair = data["pair"]
+        ticker = event.data
+        pair = ticker.pair
         
         if pair != self._selected_pair:
             return
             
-        price = data["ticker"]["price"]
-        volume = data["ticker"]["volume"]
+        price = ticker.price
+        volume = ticker.volume
         
         self._price_cache[pair] = price
         self._volume_cache[pair] = volume
         
         # Update display
-        dpg.set_value(f"{self.module_id}_price", f"{price:.{self._price_precision}f}")
-        dpg.set_value(f"{self.module_id}_volume", f"{volume:.{self._size_precision}f}")
+        dpg.set_value(f"{self.module_id}_price", self._price_fmt % price)
+        dpg.set_value(f"{self.module_id}_volume", self._size_fmt % volume)
 
     def _handle_orderbook_update(self, event: Event):
         """Handle order book updates"""
@@ -131,32 +155,44 @@ class MarketDataDisplay(ModuleBase):
         if pair != self._selected_pair:
             return
             
-        book = data["book"]
-        self._orderbook_cache[pair] = book
-        
-        # Update bids
-        bids = sorted(book["bids"].items(), key=lambda x: float(x[0]), reverse=True)[:self._orderbook_depth]
+        self._orderbook_cache[pair] = data["book"]
+        self._book_dirty = True
+
+    def _create_book_rows(self, table: str) -> List[Tuple[int, int, int]]:
+        """Create the fixed pool of empty order book rows for a table"""
+        cells = []
+        for _ in range(self._orderbook_depth):
+            with dpg.table_row(parent=table):
+                cells.append((dpg.add_text(""), dpg.add_text(""), dpg.add_text("")))
+        return cells
+
+    def _render_orderbook(self, book: Dict):
+        """Update the bid and ask rows in place from a book snapshot"""
+        # Levels arrive as float (price, size) pairs already in price order, best first
+        self._render_book_side("bids", book["bids"][:self._orderbook_depth])
+        self._render_book_side("asks", book["asks"][:self._orderbook_depth])
+
+    def _render_book_side(self, side: str, levels: List[Tuple[float, float]]):
+        """
+        Write price levels into a side's row pool, blanking rows no longer used
+        Args:
+            side: "bids" or "asks"
+            levels: (price, size) pairs, best first, at most the pool size
+        """
+        cells = self._book_cells[side]
+        price_fmt = self._price_fmt
+        size_fmt = self._size_fmt
         total = 0
-        dpg.delete_item(f"{self.module_id}_bids_table", children_only=True, slot=1)
-        
-        for price, size in bids:
+        for (price_cell, size_cell, total_cell), (price, size) in zip(cells, levels):
             total += size
-            with dpg.table_row(parent=f"{self.module_id}_bids_table"):
-                dpg.add_text(f"{float(price):.{self._price_precision}f}")
-                dpg.add_text(f"{size:.{self._size_precision}f}")
-                dpg.add_text(f"{total:.{self._size_precision}f}")
-        
-        # Update asks
-        asks = sorted(book["asks"].items(), key=lambda x: float(x[0]))[:self._orderbook_depth]
-        total = 0
-        dpg.delete_item(f"{self.module_id}_asks_table", children_only=True, slot=1)
+            dpg.set_value(price_cell, price_fmt % price)
+            dpg.set_value(size_cell, size_fmt % size)
+            dpg.set_value(total_cell, size_fmt % total)
         
-        for price, size in asks:
-            total += size
-            with dpg.table_row(parent=f"{self.module_id}_asks_table"):
-                dpg.add_text(f"{float(price):.{self._price_precision}f}")
-                dpg.add_text(f"{size:.{self._size_precision}f}")
-                dpg.add_text(f"{total:.{self._size_precision}f}")
+        for row in cells[len(levels):self._book_rows_shown[side]]:
+            for cell in row:
+                dpg.set_value(cell, "")
+        self._book_rows_shown[side] = len(levels)
 
     def _handle_trade_update(self, event: Event):
         """Handle trade updates"""
@@ -166,33 +202,76 @@ class MarketDataDisplay(ModuleBase):
         if pair != self._selected_pair:
             return
             
-        trades = data["trades"]
+        self._pending_trades.append(data["trades"])
+        self._trades_dirty = True
+
+    def _render_trades(self, batches: List[np.ndarray]):
+        """
+        Prepend trades newer than those shown to the trades table and drop the overflow rows
+        Args:
+            batches: Trade arrays in arrival order, each oldest first
+        """
+        trades = np.concatenate(batches)
+        new = trades[trades["time"] > self._last_trade_ts_shown][-self._trades_depth:]
+        if not len(new):
+            return
+        self._last_trade_ts_shown = float(new["time"].max())
         
-        # Update trades table
-        dpg.delete_item(f"{self.module_id}_trades_table", children_only=True, slot=1)
+        table = f"{self.module_id}_trades_table"
+        rows = dpg.get_item_children(table, slot=1)
+        before = rows[0] if rows else 0
         
-        for trade in trades[:10]:  # Show last 10 trades
-            with dpg.table_row(parent=f"{self.module_id}_trades_table"):
+        # Newest first, each inserted above the rows already shown
+        for trade in new[::-1]:
+            with dpg.table_row(parent=table, before=before):
                 trade_time = datetime.fromtimestamp(trade["time"]).strftime("%H:%M:%S")
                 dpg.add_text(trade_time)
-                dpg.add_text(f"{trade['price']:.{self._price_precision}f}")
-                dpg.add_text(f"{trade['volume']:.{self._size_precision}f}")
+                dpg.add_text(self._price_fmt % trade["price"])
+                dpg.add_text(self._size_fmt % trade["volume"])
                 dpg.add_text(trade["side"])
+        
+        for row in dpg.get_item_children(table, slot=1)[self._trades_depth:]:
+            dpg.delete_item(row)
 
     def _on_pair_selected(self, sender, value):
         """Handle pair selection"""
         self._selected_pair = value
+        self._book_dirty = False
+        self._trades_dirty = False
+        self._pending_trades = []
+        self._last_trade_ts_shown = 0.0
         
         # Clear displays
         dpg.set_value(f"{self.module_id}_price", "0.00")
         dpg.set_value(f"{self.module_id}_volume", "0.00")
-        dpg.delete_item(f"{self.module_id}_bids_table", children_only=True, slot=1)
-        dpg.delete_item(f"{self.module_id}_asks_table", children_only=True, slot=1)
+        self._render_book_side("bids", [])
+        self._render_book_side("asks", [])
         dpg.delete_item(f"{self.module_id}_trades_table", children_only=True, slot=1)
 
     def update(self) -> None:
-        """Update the module"""
-        pass  # Updates are handled by event callbacks
+        """Repaint the book and trade tables if they changed, at most once per refresh interval"""
+        if not (self._book_dirty or self._trades_dirty):
+            return
+        now = time.monotonic()
+        if now - self._last_ui_refresh < self._ui_refresh_interval:
+            return
+        self._last_ui_refresh = now
+        
+        # Flags are cleared before reading the caches so newer data triggers another pass
+        pair = self._selected_pair
+        try:
+            if self._book_dirty:
+                self._book_dirty = False
+                self._render_orderbook(self._orderbook_cache[pair])
+            if self._trades_dirty:
+                self._trades_dirty = False
+                # Swap rather than clear so batches arriving meanwhile land in the new list
+                batches, self._pending_trades = self._pending_trades, []
+                if batches:
+                    self._render_trades(batches)
+                
+        except Exception as e:
+            self.logger.error(f"Error refreshing market data displays: {str(e)}")
 
     def cleanup(self) -> None:
         """Cleanup module resources"""
@@ -1,19 +1,71 @@
 import dearpygui.dearpygui as dpg
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from types import SimpleNamespace
 import logging
-from decimal import Decimal
 
 from core.base_module import ModuleBase
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
 
+# Column headers of the open orders table
+OPEN_ORDER_COLUMNS = (
+    "Time",
+    "Pair",
+    "Type",
+    "Side",
+    "Price",
+    "Size",
+    "Filled",
+    "Status",
+    "Actions"
+)
+
+# Column headers of the order history table
+ORDER_HISTORY_COLUMNS = (
+    "Time",
+    "Pair",
+    "Type",
+    "Side",
+    "Price",
+    "Size",
+    "Status",
+    "Details"
+)
+
 class OrderManagement(ModuleBase):
     def __init__(self, module_id: str):
         super().__init__(module_id)
         self.module_name = "Order Management"
         self.module_description = "Manages order entry and active orders"
         
+        # Item tags, built once since module_id never changes
+        self.tags = SimpleNamespace(**{
+            name: f"{module_id}_{name}"
+            for name in (
+                "pair_selector",
+                "best_bid",
+                "best_ask",
+                "order_type",
+                "order_size",
+                "limit_price",
+                "stop_price",
+                "buy_button",
+                "sell_button",
+                "preview_label",
+                "preview_group",
+                "preview_type",
+                "preview_size",
+                "preview_price",
+                "preview_total",
+                "open_orders_table",
+                "order_history_table",
+                "max_position_pct",
+                "max_order_pct",
+                "price_deviation"
+            )
+        })
+        
         # Order tracking
         self._open_orders: Dict[str, Dict] = {}
         self._order_history: List[Dict] = []
@@ -21,21 +73,42 @@ class OrderManagement(ModuleBase):
         # Trading settings
         self._trading_pairs: List[str] = []
         self._selected_pair = ""
-        self._price_precision = 2
-        self._size_precision = 6
+        self._set_precision(2, 6)
+        # (order type, size, price) the preview currently shows
+        self._last_preview: Optional[Tuple[str, float, float]] = None
         
         # Risk management
         self._max_position_size: Dict[str, float] = {}
         self._max_order_size: Dict[str, float] = {}
         self._price_deviation_limit = 0.05  # 5% default
+        
+        # Best bid / ask of the selected pair; the widgets only display these
+        self._best_bid = 0.0
+        self._best_ask = 0.0
+        
+        # Event handlers, bound once so subscribe and unsubscribe get the same objects
+        self._handlers = {
+            EventTypes.ORDER_UPDATE: self._handle_order_update,
+            EventTypes.PRICE_UPDATE: self._handle_price_update
+        }
+
+    def _set_precision(self, price_precision: int, size_precision: int):
+        """Set display precision and rebuild the number format templates"""
+        self._price_precision = price_precision
+        self._size_precision = size_precision
+        self._price_fmt = "%%.%df" % price_precision
+        self._size_fmt = "%%.%df" % size_precision
+        self._preview_size_fmt = "Size: " + self._size_fmt
+        self._preview_price_fmt = "Price: " + self._price_fmt
+        self._preview_total_fmt = "Total: " + self._price_fmt
+        self._last_preview = None
 
     def initialize(self) -> bool:
         """Initialize the module"""
         try:
             # Register event handlers
-            event_system.subscribe(EventTypes.ORDER_UPDATE, self._handle_order_update)
-            event_system.subscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
-            event_system.subscribe(EventTypes.BALANCE_UPDATE, self._handle_balance_update)
+            for event_type, handler in self._handlers.items():
+                event_system.subscribe(event_type, handler)
             
             # Create main window
             self.create_window()
@@ -53,22 +126,13 @@ class OrderManagement(ModuleBase):
 
     def _setup_window_contents(self):
         """Setup the module's window contents"""
-        with dpg.tab_bar():
-            # Order Entry Tab
-            with dpg.tab(label="Order Entry"):
-                self._setup_order_entry()
-            
-            # Open Orders Tab
-            with dpg.tab(label="Open Orders"):
-                self._setup_open_orders()
-            
-            # Order History Tab
-            with dpg.tab(label="Order History"):
-                self._setup_order_history()
-            
-            # Settings Tab
-            with dpg.tab(label="Settings"):
-                self._setup_settings()
+        # Only the Order Entry tab is built now; the others on first open
+        self._setup_lazy_tabs((
+            ("Order Entry", self._setup_order_entry),
+            ("Open Orders", self._setup_open_orders),
+            ("Order History", self._setup_order_history),
+            ("Settings", self._setup_settings)
+        ))
 
     def _setup_order_entry(self):
         """Setup order entry interface"""
@@ -77,7 +141,7 @@ class OrderManagement(ModuleBase):
             label="Trading Pair",
             items=self._trading_pairs,
             callback=self._on_pair_selected,
-            tag=f"{self.module_id}_pair_selector"
+            tag=self.tags.pair_selector
         )
         
         dpg.add_separator()
@@ -85,9 +149,9 @@ class OrderManagement(ModuleBase):
         # Market Data Display
         with dpg.group(horizontal=True):
             dpg.add_text("Best Bid: ")
-            dpg.add_text("0.00", tag=f"{self.module_id}_best_bid")
+            dpg.add_text("0.00", tag=self.tags.best_bid)
             dpg.add_text("  Best Ask: ")
-            dpg.add_text("0.00", tag=f"{self.module_id}_best_ask")
+            dpg.add_text("0.00", tag=self.tags.best_ask)
         
         dpg.add_separator()
         
@@ -97,7 +161,7 @@ class OrderManagement(ModuleBase):
             items=["Market", "Limit", "Stop-Limit"],
             callback=self._on_order_type_changed,
             horizontal=True,
-            tag=f"{self.module_id}_order_type"
+            tag=self.tags.order_type
         )
         
         # Order Parameters
@@ -106,7 +170,7 @@ class OrderManagement(ModuleBase):
             dpg.add_input_float(
                 label="Size",
                 callback=self._validate_order_size,
-                tag=f"{self.module_id}_order_size"
+                tag=self.tags.order_size
             )
             
             # Price inputs (for limit orders)
@@ -114,7 +178,7 @@ class OrderManagement(ModuleBase):
                 label="Limit Price",
                 show=False,
                 callback=self._validate_price,
-                tag=f"{self.module_id}_limit_price"
+                tag=self.tags.limit_price
             )
             
             # Stop price input (for stop-limit orders)
@@ -122,7 +186,7 @@ class OrderManagement(ModuleBase):
                 label="Stop Price",
                 show=False,
                 callback=self._validate_price,
-                tag=f"{self.module_id}_stop_price"
+                tag=self.tags.stop_price
             )
         
         dpg.add_separator()
@@ -132,55 +196,38 @@ class OrderManagement(ModuleBase):
             dpg.add_button(
                 label="Buy",
                 callback=self._place_buy_order,
-                tag=f"{self.module_id}_buy_button"
+                tag=self.tags.buy_button
             )
             dpg.add_button(
                 label="Sell",
                 callback=self._place_sell_order,
-                tag=f"{self.module_id}_sell_button"
+                tag=self.tags.sell_button
             )
         
         # Order Preview
         dpg.add_separator()
-        dpg.add_text("Order Preview", tag=f"{self.module_id}_preview_label")
-        with dpg.group(tag=f"{self.module_id}_preview_group"):
-            dpg.add_text("Type: ", tag=f"{self.module_id}_preview_type")
-            dpg.add_text("Size: ", tag=f"{self.module_id}_preview_size")
-            dpg.add_text("Price: ", tag=f"{self.module_id}_preview_price")
-            dpg.add_text("Total: ", tag=f"{self.module_id}_preview_total")
+        dpg.add_text("Order Preview", tag=self.tags.preview_label)
+        with dpg.group(tag=self.tags.preview_group):
+            dpg.add_text("Type: ", tag=self.tags.preview_type)
+            dpg.add_text("Size: ", tag=self.tags.preview_size)
+            dpg.add_text("Price: ", tag=self.tags.preview_price)
+            dpg.add_text("Total: ", tag=self.tags.preview_total)
 
     def _setup_open_orders(self):
         """Setup open orders display"""
-        dpg.add_table(
-            tag=f"{self.module_id}_open_orders_table",
-            header_row=True
-        )
-        with dpg.table_row():
-            dpg.add_table_column(label="Time")
-            dpg.add_table_column(label="Pair")
-            dpg.add_table_column(label="Type")
-            dpg.add_table_column(label="Side")
-            dpg.add_table_column(label="Price")
-            dpg.add_table_column(label="Size")
-            dpg.add_table_column(label="Filled")
-            dpg.add_table_column(label="Status")
-            dpg.add_table_column(label="Actions")
+        # Build the table and its header columns under one lock acquisition
+        with dpg.mutex():
+            with dpg.table(tag=self.tags.open_orders_table, header_row=True):
+                for label in OPEN_ORDER_COLUMNS:
+                    dpg.add_table_column(label=label)
 
     def _setup_order_history(self):
         """Setup order history display"""
-        dpg.add_table(
-            tag=f"{self.module_id}_order_history_table",
-            header_row=True
-        )
-        with dpg.table_row():
-            dpg.add_table_column(label="Time")
-            dpg.add_table_column(label="Pair")
-            dpg.add_table_column(label="Type")
-            dpg.add_table_column(label="Side")
-            dpg.add_table_column(label="Price")
-            dpg.add_table_column(label="Size")
-            dpg.add_table_column(label="Status")
-            dpg.add_table_column(label="Details")
+        # Build the table and its header columns under one lock acquisition
+        with dpg.mutex():
+            with dpg.table(tag=self.tags.order_history_table, header_row=True):
+                for label in ORDER_HISTORY_COLUMNS:
+                    dpg.add_table_column(label=label)
 
     def _setup_settings(self):
         """Setup trading settings"""
@@ -192,7 +239,7 @@ class OrderManagement(ModuleBase):
             label="Max Position Size (%)",
             default_value=100.0,
             callback=self._update_risk_settings,
-            tag=f"{self.module_id}_max_position_pct"
+            tag=self.tags.max_position_pct
         )
         
         # Order size limits
@@ -200,7 +247,7 @@ class OrderManagement(ModuleBase):
             label="Max Order Size (%)",
             default_value=50.0,
             callback=self._update_risk_settings,
-            tag=f"{self.module_id}_max_order_pct"
+            tag=self.tags.max_order_pct
         )
         
         # Price deviation limit
@@ -208,7 +255,7 @@ class OrderManagement(ModuleBase):
             label="Max Price Deviation (%)",
             default_value=5.0,
             callback=self._update_risk_settings,
-            tag=f"{self.module_id}_price_deviation"
+            tag=self.tags.price_deviation
         )
 
     def _validate_order_size(self, sender, value):
@@ -234,35 +281,58 @@ class OrderManagement(ModuleBase):
             if not self._selected_pair:
                 return
             
-            current_price = float(dpg.get_value(f"{self.module_id}_best_ask"))
-            deviation = abs(value - current_price) / current_price
+            current_price = self._best_ask
+            if current_price <= 0.0:
+                return
+            limit = self._price_deviation_limit
             
-            if deviation > self._price_deviation_limit:
+            if abs(value - current_price) / current_price > limit:
                 dpg.set_value(sender, current_price)
-                self._show_warning(f"Price deviation exceeds {self._price_deviation_limit*100}%")
+                self._show_warning(f"Price deviation exceeds {limit*100}%")
             
             self._update_preview()
             
         except Exception as e:
             self.logger.error(f"Error validating price: {str(e)}")
 
+    def _handle_price_update(self, event: Event):
+        """Track and display the best bid and ask of the selected pair"""
+        try:
+            ticker = event.data
+            if ticker.pair != self._selected_pair:
+                return
+            
+            self._best_bid = ticker.bid
+            self._best_ask = ticker.ask
+            dpg.set_value(self.tags.best_bid, self._price_fmt % ticker.bid)
+            dpg.set_value(self.tags.best_ask, self._price_fmt % ticker.ask)
+            
+        except Exception as e:
+            self.logger.error(f"Error handling price update: {str(e)}")
+
     def _update_preview(self):
         """Update order preview"""
         try:
-            order_type = dpg.get_value(f"{self.module_id}_order_type")
-            size = dpg.get_value(f"{self.module_id}_order_size")
+            order_type = dpg.get_value(self.tags.order_type)
+            size = dpg.get_value(self.tags.order_size)
             
             if order_type == "Market":
-                price = float(dpg.get_value(f"{self.module_id}_best_ask"))
+                price = self._best_ask
             else:
-                price = dpg.get_value(f"{self.module_id}_limit_price")
+                price = dpg.get_value(self.tags.limit_price)
+            
+            # Nothing to redraw if the inputs are unchanged since the last preview
+            preview = (order_type, size, price)
+            if preview == self._last_preview:
+                return
+            self._last_preview = preview
             
             total = size * price
             
-            dpg.set_value(f"{self.module_id}_preview_type", f"Type: {order_type}")
-            dpg.set_value(f"{self.module_id}_preview_size", f"Size: {size:.{self._size_precision}f}")
-            dpg.set_value(f"{self.module_id}_preview_price", f"Price: {price:.{self._price_precision}f}")
-            dpg.set_value(f"{self.module_id}_preview_total", f"Total: {total:.{self._price_precision}f}")
+            dpg.set_value(self.tags.preview_type, f"Type: {order_type}")
+            dpg.set_value(self.tags.preview_size, self._preview_size_fmt % size)
+            dpg.set_value(self.tags.preview_price, self._preview_price_fmt % price)
+            dpg.set_value(self.tags.preview_total, self._preview_total_fmt % total)
             
         except Exception as e:
             self.logger.error(f"Error updating preview: {str(e)}")
@@ -274,8 +344,8 @@ class OrderManagement(ModuleBase):
                 self._show_warning("Please select a trading pair")
                 return
             
-            order_type = dpg.get_value(f"{self.module_id}_order_type")
-            size = dpg.get_value(f"{self.module_id}_order_size")
+            order_type = dpg.get_value(self.tags.order_type)
+            size = dpg.get_value(self.tags.order_size)
             
             if size <= 0:
                 self._show_warning("Invalid order size")
@@ -289,14 +359,14 @@ class OrderManagement(ModuleBase):
             }
             
             if order_type != "Market":
-                price = dpg.get_value(f"{self.module_id}_limit_price")
+                price = dpg.get_value(self.tags.limit_price)
                 if price <= 0:
                     self._show_warning("Invalid price")
                     return
                 order["price"] = price
             
             if order_type == "Stop-Limit":
-                stop_price = dpg.get_value(f"{self.module_id}_stop_price")
+                stop_price = dpg.get_value(self.tags.stop_price)
                 if stop_price <= 0:
                     self._show_warning("Invalid stop price")
                     return
@@ -346,9 +416,8 @@ class OrderManagement(ModuleBase):
 
     def cleanup(self) -> None:
         """Cleanup module resources"""
-        event_system.unsubscribe(EventTypes.ORDER_UPDATE, self._handle_order_update)
-        event_system.unsubscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
-        event_system.unsubscribe(EventTypes.BALANCE_UPDATE, self._handle_balance_update)
+        for event_type, handler in self._handlers.items():
+            event_system.unsubscribe(event_type, handler)
 
     def get_data(self) -> Dict[str, Any]:
         """Get module data"""
@@ -1,12 +1,50 @@
 import dearpygui.dearpygui as dpg
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable, Set
 from datetime import datetime
+from types import SimpleNamespace
 import logging
-from decimal import Decimal
+import numpy as np
 
 from core.base_module import ModuleBase
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
+from utils.jit import njit
+
+@njit(cache=True, fastmath=True)
+def recompute_pnl(size: np.ndarray, entry: np.ndarray, current: np.ndarray, inv_notional: np.ndarray,
+                  unrealized: np.ndarray, return_pct: np.ndarray, n: int):
+    """
+    Recompute unrealized PnL and return % of the first n positions in place
+    The signed size makes the same formula correct for longs and shorts, and
+    inv_notional holds 100 / (|size| * entry), so neither step divides
+    """
+    for i in range(n):
+        pnl = (current[i] - entry[i]) * size[i]
+        unrealized[i] = pnl
+        return_pct[i] = pnl * inv_notional[i]
+
+# Column headers of the positions table
+POSITION_COLUMNS = (
+    "Pair",
+    "Size",
+    "Entry Price",
+    "Current Price",
+    "Unrealized PnL",
+    "Realized PnL",
+    "Return %",
+    "Actions"
+)
+
+# Column headers of the risk metrics table
+RISK_COLUMNS = (
+    "Pair",
+    "Position Value",
+    "% of Portfolio",
+    "Daily Volatility",
+    "VaR",
+    "Max Drawdown",
+    "Risk Level"
+)
 
 class PositionMonitor(ModuleBase):
     def __init__(self, module_id: str):
@@ -14,14 +52,44 @@ class PositionMonitor(ModuleBase):
         self.module_name = "Position Monitor"
         self.module_description = "Monitors and manages trading positions"
         
-        # Position tracking
-        self._positions: Dict[str, Dict] = {}
+        # Item tags, built once since module_id never changes
+        self.tags = SimpleNamespace(**{
+            name: f"{module_id}_{name}"
+            for name in (
+                "total_pnl",
+                "daily_pnl",
+                "positions_table",
+                "time_period",
+                "total_return",
+                "win_rate",
+                "profit_factor",
+                "sharpe_ratio",
+                "pnl_plot",
+                "pnl_series",
+                "warning_level",
+                "danger_level",
+                "risk_table"
+            )
+        })
+        
+        # Position tracking, one slot per open position in parallel float64 arrays
+        self._pos_pair_ix: Dict[str, int] = {}
+        self._pos_pairs: List[str] = []  # Pair in each slot
+        self._size = np.zeros(256, dtype=np.float64)  # Signed; negative is short
+        self._entry = np.zeros(256, dtype=np.float64)
+        self._current = np.zeros(256, dtype=np.float64)
+        self._inv_notional = np.zeros(256, dtype=np.float64)  # 100 / (|size| * entry)
+        self._unrealized = np.zeros(256, dtype=np.float64)
+        self._realized = np.zeros(256, dtype=np.float64)
+        self._return_pct = np.zeros(256, dtype=np.float64)
         self._pnl_history: List[Dict] = []
+        # Positions table row and cell items per pair, created once and updated in place
+        self._row_tags: Dict[str, Dict[str, int]] = {}
+        # Pairs whose rows changed since the last frame; swapped out by update()
+        self._dirty_pairs: Set[str] = set()
         
         # Display settings
-        self._price_precision = 2
-        self._size_precision = 6
-        self._pnl_precision = 2
+        self._set_precision(2, 6, 2)  # Prices, sizes, PnL
         
         # Risk metrics
         self._position_alerts: Dict[str, Dict] = {}
@@ -30,6 +98,15 @@ class PositionMonitor(ModuleBase):
             "danger": 0.10    # 10% drawdown
         }
 
+    def _set_precision(self, price_precision: int, size_precision: int, pnl_precision: int):
+        """Set display precision and rebuild the number format templates"""
+        self._price_precision = price_precision
+        self._size_precision = size_precision
+        self._pnl_precision = pnl_precision
+        self._price_fmt = "%%.%df" % price_precision
+        self._size_fmt = "%%.%df" % size_precision
+        self._pnl_fmt = "%%.%df" % pnl_precision
+
     def initialize(self) -> bool:
         """Initialize the module"""
         try:
@@ -51,18 +128,12 @@ class PositionMonitor(ModuleBase):
 
     def _setup_window_contents(self):
         """Setup the module's window contents"""
-        with dpg.tab_bar():
-            # Active Positions Tab
-            with dpg.tab(label="Active Positions"):
-                self._setup_positions_view()
-            
-            # PnL Analysis Tab
-            with dpg.tab(label="PnL Analysis"):
-                self._setup_pnl_analysis()
-            
-            # Risk Metrics Tab
-            with dpg.tab(label="Risk Metrics"):
-                self._setup_risk_metrics()
+        # Only the Active Positions tab is built now; the others on first open
+        self._setup_lazy_tabs((
+            ("Active Positions", self._setup_positions_view),
+            ("PnL Analysis", self._setup_pnl_analysis),
+            ("Risk Metrics", self._setup_risk_metrics)
+        ))
 
     def _setup_positions_view(self):
         """Setup positions view"""
@@ -73,26 +144,18 @@ class PositionMonitor(ModuleBase):
             
             with dpg.group(horizontal=True):
                 dpg.add_text("Total PnL: ")
-                dpg.add_text("0.00", tag=f"{self.module_id}_total_pnl")
+                dpg.add_text("0.00", tag=self.tags.total_pnl)
                 dpg.add_text("  Daily PnL: ")
-                dpg.add_text("0.00", tag=f"{self.module_id}_daily_pnl")
+                dpg.add_text("0.00", tag=self.tags.daily_pnl)
         
         dpg.add_separator()
         
         # Positions table
-        dpg.add_table(
-            tag=f"{self.module_id}_positions_table",
-            header_row=True
-        )
-        with dpg.table_row():
-            dpg.add_table_column(label="Pair")
-            dpg.add_table_column(label="Size")
-            dpg.add_table_column(label="Entry Price")
-            dpg.add_table_column(label="Current Price")
-            dpg.add_table_column(label="Unrealized PnL")
-            dpg.add_table_column(label="Realized PnL")
-            dpg.add_table_column(label="Return %")
-            dpg.add_table_column(label="Actions")
+        # Build the table and its header columns under one lock acquisition
+        with dpg.mutex():
+            with dpg.table(tag=self.tags.positions_table, header_row=True):
+                for label in POSITION_COLUMNS:
+                    dpg.add_table_column(label=label)
 
     def _setup_pnl_analysis(self):
         """Setup PnL analysis view"""
@@ -102,7 +165,7 @@ class PositionMonitor(ModuleBase):
             items=["Today", "1 Week", "1 Month", "3 Months", "YTD", "All Time"],
             default_value="Today",
             callback=self._update_pnl_analysis,
-            tag=f"{self.module_id}_time_period"
+            tag=self.tags.time_period
         )
         
         dpg.add_separator()
@@ -114,16 +177,16 @@ class PositionMonitor(ModuleBase):
                 # Left column
                 with dpg.group():
                     dpg.add_text("Total Return: ")
-                    dpg.add_text("0.00%", tag=f"{self.module_id}_total_return")
+                    dpg.add_text("0.00%", tag=self.tags.total_return)
                     dpg.add_text("Win Rate: ")
-                    dpg.add_text("0.00%", tag=f"{self.module_id}_win_rate")
+                    dpg.add_text("0.00%", tag=self.tags.win_rate)
                 
                 # Right column
                 with dpg.group():
                     dpg.add_text("Profit Factor: ")
-                    dpg.add_text("0.00", tag=f"{self.module_id}_profit_factor")
+                    dpg.add_text("0.00", tag=self.tags.profit_factor)
                     dpg.add_text("Sharpe Ratio: ")
-                    dpg.add_text("0.00", tag=f"{self.module_id}_sharpe_ratio")
+                    dpg.add_text("0.00", tag=self.tags.sharpe_ratio)
         
         dpg.add_separator()
         
@@ -132,7 +195,7 @@ class PositionMonitor(ModuleBase):
             label="PnL History",
             height=300,
             width=-1,
-            tag=f"{self.module_id}_pnl_plot"
+            tag=self.tags.pnl_plot
         ):
             dpg.add_plot_legend()
             dpg.add_plot_axis(dpg.mvXAxis, label="Date")
@@ -144,7 +207,7 @@ class PositionMonitor(ModuleBase):
                 [],  # y values (PnL)
                 label="Cumulative PnL",
                 parent=dpg.last_item(),
-                tag=f"{self.module_id}_pnl_series"
+                tag=self.tags.pnl_series
             )
 
     def _setup_risk_metrics(self):
@@ -158,31 +221,24 @@ class PositionMonitor(ModuleBase):
                 label="Warning Level (%)",
                 default_value=self._risk_levels["warning"] * 100,
                 callback=self._update_risk_levels,
-                tag=f"{self.module_id}_warning_level"
+                tag=self.tags.warning_level
             )
             
             dpg.add_input_float(
                 label="Danger Level (%)",
                 default_value=self._risk_levels["danger"] * 100,
                 callback=self._update_risk_levels,
-                tag=f"{self.module_id}_danger_level"
+                tag=self.tags.danger_level
             )
         
         dpg.add_separator()
         
         # Risk metrics table
-        dpg.add_table(
-            tag=f"{self.module_id}_risk_table",
-            header_row=True
-        )
-        with dpg.table_row():
-            dpg.add_table_column(label="Pair")
-            dpg.add_table_column(label="Position Value")
-            dpg.add_table_column(label="% of Portfolio")
-            dpg.add_table_column(label="Daily Volatility")
-            dpg.add_table_column(label="VaR")
-            dpg.add_table_column(label="Max Drawdown")
-            dpg.add_table_column(label="Risk Level")
+        # Build the table and its header columns under one lock acquisition
+        with dpg.mutex():
+            with dpg.table(tag=self.tags.risk_table, header_row=True):
+                for label in RISK_COLUMNS:
+                    dpg.add_table_column(label=label)
 
     def _handle_position_update(self, event: Event):
         """Handle position updates"""
@@ -190,12 +246,14 @@ class PositionMonitor(ModuleBase):
             position = event.data
             pair = position["pair"]
             
-            # Update position tracking
-            self._positions[pair] = position
+            # Update position tracking; a flat position is closed
+            if position["size"] == 0:
+                self._remove_position(pair)
+            else:
+                self._store_position(position)
             
-            # Update displays
-            self._update_positions_table()
-            self._update_risk_metrics()
+            # Displays are refreshed by the next update()
+            self._dirty_pairs.add(pair)
             self._check_risk_alerts(pair)
             
         except Exception as e:
@@ -204,77 +262,162 @@ class PositionMonitor(ModuleBase):
     def _handle_price_update(self, event: Event):
         """Handle price updates"""
         try:
-            data = event.data
-            pair = data["pair"]
-            price = data["ticker"]["price"]
+            ticker = event.data
+            pair = ticker.pair
+            price = ticker.price
             
-            if pair in self._positions:
-                # Update unrealized PnL
-                position = self._positions[pair]
-                entry_price = position["entry_price"]
-                size = position["size"]
-                
-                if size > 0:  # Long position
-                    pnl = (price - entry_price) * size
-                else:  # Short position
-                    pnl = (entry_price - price) * abs(size)
+            i = self._pos_pair_ix.get(pair)
+            if i is not None:
+                # Update unrealized PnL of every position in one compiled pass
+                self._current[i] = price
+                self._recompute_pnl()
                 
-                position["unrealized_pnl"] = pnl
-                position["current_price"] = price
-                position["return_pct"] = (pnl / (abs(size) * entry_price)) * 100
-                
-                # Update displays
-                self._update_positions_table()
-                self._update_risk_metrics()
+                # Displays are refreshed by the next update()
+                self._dirty_pairs.add(pair)
                 
         except Exception as e:
             self.logger.error(f"Error handling price update: {str(e)}")
 
-    def _update_positions_table(self):
-        """Update positions table display"""
+    def _store_position(self, position: Dict[str, Any]):
+        """Write a position into its slot, allocating one for a new pair"""
+        pair = position["pair"]
+        i = self._pos_pair_ix.get(pair)
+        if i is None:
+            i = len(self._pos_pairs)
+            if i == len(self._size):
+                self._grow_positions(2 * i)
+            self._pos_pair_ix[pair] = i
+            self._pos_pairs.append(pair)
+        
+        self._size[i] = position["size"]
+        self._entry[i] = position["entry_price"]
+        notional = abs(self._size[i]) * self._entry[i]
+        self._inv_notional[i] = 100.0 / notional if notional else 0.0
+        self._current[i] = position.get("current_price", position["entry_price"])
+        self._realized[i] = position.get("realized_pnl", 0.0)
+        self._recompute_pnl()
+
+    def _recompute_pnl(self):
+        """Refresh unrealized PnL and return % of all open positions from current prices"""
+        recompute_pnl(self._size, self._entry, self._current, self._inv_notional,
+                      self._unrealized, self._return_pct, len(self._pos_pairs))
+
+    def _remove_position(self, pair: str):
+        """Free a position's slot by moving the last position into it"""
+        i = self._pos_pair_ix.pop(pair, None)
+        if i is None:
+            return
+        last = len(self._pos_pairs) - 1
+        moved = self._pos_pairs.pop()
+        if i != last:
+            self._pos_pairs[i] = moved
+            self._pos_pair_ix[moved] = i
+            for column in self._position_columns():
+                column[i] = column[last]
+
+    def _position_columns(self) -> List[np.ndarray]:
+        """Every per-position array"""
+        return [self._size, self._entry, self._current, self._inv_notional,
+                self._unrealized, self._realized, self._return_pct]
+
+    def _grow_positions(self, capacity: int):
+        """Reallocate the position arrays with room for `capacity` positions"""
+        (self._size, self._entry, self._current, self._inv_notional,
+         self._unrealized, self._realized, self._return_pct) = (
+            np.resize(column, capacity) for column in self._position_columns()
+        )
+
+    def _position_dict(self, pair: str) -> Dict[str, Any]:
+        """A position as a plain dict"""
+        i = self._pos_pair_ix[pair]
+        return {
+            "pair": pair,
+            "size": float(self._size[i]),
+            "entry_price": float(self._entry[i]),
+            "current_price": float(self._current[i]),
+            "unrealized_pnl": float(self._unrealized[i]),
+            "realized_pnl": float(self._realized[i]),
+            "return_pct": float(self._return_pct[i])
+        }
+
+    def _create_position_row(self, pair: str) -> Dict[str, int]:
+        """Add a positions table row for a pair and return its row and cell items"""
+        with dpg.table_row(parent=self.tags.positions_table) as row:
+            dpg.add_text(pair)
+            cells = {
+                "row": row,
+                "size": dpg.add_text(""),
+                "entry": dpg.add_text(""),
+                "current": dpg.add_text(""),
+                "unrealized": dpg.add_text(""),
+                "realized": dpg.add_text(""),
+                "return": dpg.add_text("")
+            }
+            
+            # Close position button
+            dpg.add_button(
+                label="Close",
+                callback=self._on_close_clicked,
+                user_data=pair
+            )
+        return cells
+
+    def _update_positions_table(self, pairs: Optional[Iterable[str]] = None):
+        """
+        Update positions table display
+        Args:
+            pairs: Pairs whose rows to refresh, or None for every position
+        """
         try:
-            # Clear existing rows
-            dpg.delete_item(f"{self.module_id}_positions_table", children_only=True, slot=1)
+            # Aggregate first, in one vectorized pass over the filled slots
+            n = len(self._pos_pairs)
+            total_pnl = float(self._unrealized[:n].sum() + self._realized[:n].sum())
             
-            total_pnl = 0
+            price_fmt = self._price_fmt
+            size_fmt = self._size_fmt
+            pnl_fmt = self._pnl_fmt
             
-            # Add position rows
-            for pair, position in self._positions.items():
-                with dpg.table_row(parent=f"{self.module_id}_positions_table"):
-                    dpg.add_text(pair)
-                    dpg.add_text(f"{position['size']:.{self._size_precision}f}")
-                    dpg.add_text(f"{position['entry_price']:.{self._price_precision}f}")
-                    dpg.add_text(f"{position['current_price']:.{self._price_precision}f}")
-                    dpg.add_text(f"{position['unrealized_pnl']:.{self._pnl_precision}f}")
-                    dpg.add_text(f"{position['realized_pnl']:.{self._pnl_precision}f}")
-                    dpg.add_text(f"{position['return_pct']:.2f}%")
-                    
-                    # Close position button
-                    dpg.add_button(
-                        label="Close",
-                        callback=lambda s, a, u: self._close_position(u),
-                        user_data=pair
-                    )
+            # Rows are created for new positions only; existing rows just get new values,
+            # and rows of closed positions are removed
+            for pair in self._pos_pairs if pairs is None else pairs:
+                i = self._pos_pair_ix.get(pair)
+                if i is None:
+                    cells = self._row_tags.pop(pair, None)
+                    if cells is not None:
+                        dpg.delete_item(cells["row"])
+                    continue
                 
-                total_pnl += position['unrealized_pnl'] + position['realized_pnl']
+                cells = self._row_tags.get(pair)
+                if cells is None:
+                    cells = self._row_tags[pair] = self._create_position_row(pair)
+                dpg.set_value(cells["size"], size_fmt % self._size[i])
+                dpg.set_value(cells["entry"], price_fmt % self._entry[i])
+                dpg.set_value(cells["current"], price_fmt % self._current[i])
+                dpg.set_value(cells["unrealized"], pnl_fmt % self._unrealized[i])
+                dpg.set_value(cells["realized"], pnl_fmt % self._realized[i])
+                dpg.set_value(cells["return"], "%.2f%%" % self._return_pct[i])
             
             # Update total PnL
-            dpg.set_value(f"{self.module_id}_total_pnl", f"{total_pnl:.{self._pnl_precision}f}")
+            dpg.set_value(self.tags.total_pnl, pnl_fmt % total_pnl)
             
         except Exception as e:
             self.logger.error(f"Error updating positions table: {str(e)}")
 
+    def _on_close_clicked(self, sender, app_data, user_data):
+        """Close button callback; the row's pair is its user_data"""
+        self._close_position(user_data)
+
     def _close_position(self, pair: str):
         """Request to close a position"""
         try:
-            position = self._positions[pair]
+            size = float(self._size[self._pos_pair_ix[pair]])
             
             # Create market order to close position
             order = {
                 "pair": pair,
                 "type": "market",
-                "side": "sell" if position["size"] > 0 else "buy",
-                "size": abs(position["size"])
+                "side": "sell" if size > 0 else "buy",
+                "size": abs(size)
             }
             
             # Publish order request
@@ -289,8 +432,19 @@ class PositionMonitor(ModuleBase):
             self._show_error("Close Position Error", str(e))
 
     def update(self) -> None:
-        """Update the module"""
-        pass  # Updates are handled by event callbacks
+        """Refresh the rows of positions changed since the last frame, once per frame"""
+        if not self._dirty_pairs:
+            return
+        # Swap rather than clear so pairs marked meanwhile land in the new set
+        pairs, self._dirty_pairs = self._dirty_pairs, set()
+        
+        try:
+            with dpg.mutex():
+                self._update_positions_table(pairs)
+                self._update_risk_metrics()
+                
+        except Exception as e:
+            self.logger.error(f"Error refreshing position displays: {str(e)}")
 
     def cleanup(self) -> None:
         """Cleanup module resources"""
@@ -301,7 +455,7 @@ class PositionMonitor(ModuleBase):
     def get_data(self) -> Dict[str, Any]:
         """Get module data"""
         return {
-            "positions": self._positions,
+            "positions": {pair: self._position_dict(pair) for pair in self._pos_pairs},
             "pnl_history": self._pnl_history,
             "risk_levels": self._risk_levels,
             "position_alerts": self._position_alerts
@@ -1,6 +1,145 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, Tuple, List, Callable
+import functools
 import numpy as np
 from modules.trading_strategy import TradingStrategy
+from core.event_system import event_system, Event, EventTypes
+from core.data_manager import TickerSnapshot
+from utils.jit import njit, prange
+
+# Kernels are declared with explicit signatures so numba compiles them (or loads them
+# from its cache) up front instead of on the first tick
+@njit("f8(f8[::1], i8, i8)", cache=True)
+def _window_sum(buf: np.ndarray, idx: int, k: int) -> float:
+    """Sum of the last k prices written to a ring buffer holding idx writes"""
+    size = buf.shape[0]
+    total = 0.0
+    for i in range(idx - k, idx):
+        total += buf[i % size]
+    return total
+
+@njit(cache=True, fastmath=True, inline="always")
+def _ma_cross_step(buf: np.ndarray, idx: int, count: int, fast_k: int, slow_k: int,
+                   inv_fast_k: float, inv_slow_k: float,
+                   fast_sum: float, slow_sum: float, price: float,
+                   last_cross: int) -> Tuple[int, int, float, float, int, float]:
+    """
+    Add a price to a pair's ring buffer and check the moving averages for a crossover
+    Inlined into the kernels built by make_kernels, which pass the window constants
+    Args:
+        buf: Ring buffer of max(fast_k, slow_k) prices, updated in place
+        idx: Number of prices written so far
+        count: Number of valid prices in the buffer
+        fast_k: Fast window length
+        slow_k: Slow window length
+        inv_fast_k: 1 / fast_k
+        inv_slow_k: 1 / slow_k
+        fast_sum: Running sum of the fast window
+        slow_sum: Running sum of the slow window
+        price: New price
+        last_cross: Direction of the last signal: 1 up, -1 down, 0 none
+    Returns:
+        (idx, count, fast_sum, slow_sum, signal_dir, strength); signal_dir is 1 or -1
+        when the averages cross against last_cross and 0 otherwise
+    """
+    size = buf.shape[0]
+    
+    # Slide both windows, adding the new price to each sum and dropping the evicted one
+    fast_sum += price
+    slow_sum += price
+    if idx >= fast_k:
+        fast_sum -= buf[(idx - fast_k) % size]
+    if idx >= slow_k:
+        slow_sum -= buf[(idx - slow_k) % size]
+    buf[idx % size] = price
+    idx += 1
+    count = min(idx, size)
+    
+    # Re-add from scratch once per slow window so rounding error cannot accumulate
+    if idx % slow_k == 0:
+        fast_sum = _window_sum(buf, idx, min(idx, fast_k))
+        slow_sum = _window_sum(buf, idx, min(idx, slow_k))
+    
+    # Check for sufficient history
+    if idx < slow_k:
+        return idx, count, fast_sum, slow_sum, 0, 0.0
+    
+    # Multiply by the reciprocals; the fast window is only short of
+    # fast_k when it is longer than the slow one
+    fast_ma = fast_sum * (inv_fast_k if idx >= fast_k else 1.0 / idx)
+    slow_ma = slow_sum * inv_slow_k
+    
+    # Branchless: +1 / -1 from the comparison, zeroed when it repeats the last signal
+    direction = 2 * int(fast_ma > slow_ma) - 1
+    signal = direction * int(direction != last_cross)
+    return idx, count, fast_sum, slow_sum, signal, signal * (fast_ma - slow_ma) * (1.0 / slow_ma)
+
+@functools.lru_cache(maxsize=None)
+def make_kernels(fast_k: int, slow_k: int) -> Tuple[Callable, Callable]:
+    """
+    Build MA cross kernels specialized for a pair of window lengths
+    The lengths and their reciprocals are closure constants, so numba compiles them
+    in as literals. Kernels are compiled eagerly from explicit signatures (or loaded
+    from numba's cache) when first built, and reused for the same lengths.
+    Args:
+        fast_k: Fast window length
+        slow_k: Slow window length
+    Returns:
+        (step, batch) kernels; see their docstrings
+    """
+    inv_fast_k = 1.0 / fast_k
+    inv_slow_k = 1.0 / slow_k
+    
+    @njit("Tuple((i8, i8, f8, f8, i8, f8))(f8[::1], i8, i8, f8, f8, f8, i1)",
+          cache=True, fastmath=True)
+    def ma_cross_step(buf: np.ndarray, idx: int, count: int, fast_sum: float, slow_sum: float,
+                      price: float, last_cross: int) -> Tuple[int, int, float, float, int, float]:
+        """Apply one tick to a pair's state; arguments and results as in _ma_cross_step"""
+        return _ma_cross_step(buf, idx, count, fast_k, slow_k, inv_fast_k, inv_slow_k,
+                              fast_sum, slow_sum, price, last_cross)
+    
+    @njit("Tuple((i1[::1], f8[::1]))(f8[:, ::1], i8[::1], i8[::1], f8[::1], f8[::1], i1[::1], "
+          "i8[::1], f8[::1])", cache=True, parallel=True)
+    def ma_cross_batch(buf: np.ndarray, idx: np.ndarray, count: np.ndarray, fast_sum: np.ndarray,
+                       slow_sum: np.ndarray, last_cross: np.ndarray,
+                       pair_ix: np.ndarray, prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Apply a batch of ticks for many pairs to their row of the strategy state
+        Pairs are processed in parallel, and each pair's ticks in arrival order
+        Args:
+            buf: Ring buffers, one row per pair; this and the other state arrays are updated in place
+            idx, count, fast_sum, slow_sum, last_cross: Per-pair state as in _ma_cross_step
+            pair_ix: Row of each tick, in arrival order
+            prices: Price of each tick
+        Returns:
+            (directions, strengths) per tick; direction is 1 or -1 for a signal and 0 otherwise
+        """
+        n = pair_ix.shape[0]
+        directions = np.zeros(n, dtype=np.int8)
+        strengths = np.zeros(n, dtype=np.float64)
+        
+        # Group tick positions by pair, keeping arrival order within each pair
+        order = np.argsort(pair_ix, kind="mergesort")
+        bounds = np.flatnonzero(np.diff(pair_ix[order])) + 1
+        starts = np.concatenate((np.zeros(1, dtype=bounds.dtype), bounds))
+        ends = np.concatenate((bounds, np.full(1, n, dtype=bounds.dtype)))
+        
+        for g in prange(starts.shape[0]):
+            p = pair_ix[order[starts[g]]]
+            row = buf[p]
+            for j in range(starts[g], ends[g]):
+                t = order[j]
+                (idx[p], count[p], fast_sum[p], slow_sum[p],
+                 direction, strength) = _ma_cross_step(
+                    row, idx[p], count[p], fast_k, slow_k, inv_fast_k, inv_slow_k,
+                    fast_sum[p], slow_sum[p], prices[t], last_cross[p]
+                )
+                if direction != 0:
+                    last_cross[p] = direction
+                    directions[t] = direction
+                    strengths[t] = strength
+        return directions, strengths
+    
+    return ma_cross_step, ma_cross_batch
 
 class MovingAverageCross(TradingStrategy):
     def __init__(self, module_id: str):
@@ -17,70 +156,119 @@ class MovingAverageCross(TradingStrategy):
             "exit_threshold": 0.0005   # 0.05%
         }
         
-        # Strategy state
-        self._price_history: Dict[str, List[float]] = {}
-        self._last_cross: Dict[str, str] = {}  # "up" or "down"
+        # Strategy state, one row / element per pair in _pair_ix order:
+        # ring buffer of the last max(fast_ma, slow_ma) prices, the number of prices
+        # written to it so far, running sums of the fast and slow windows, and the
+        # direction of the last signal (1 up, -1 down, 0 none yet)
+        self._step_kernel: Optional[Callable] = None
+        self._batch_kernel: Optional[Callable] = None
+        self._pairs: List[str] = []
+        self._pair_ix: Dict[str, int] = {}
+        self._buf = np.zeros((0, 1), dtype=np.float64)
+        self._idx = np.zeros(0, dtype=np.int64)
+        self._count = np.zeros(0, dtype=np.int64)
+        self._fast_sum = np.zeros(0, dtype=np.float64)
+        self._slow_sum = np.zeros(0, dtype=np.float64)
+        self._last_cross = np.zeros(0, dtype=np.int8)
+        
+        # (pair index, price) ticks since the last frame; swapped out by update()
+        self._pending_ticks: List[Tuple[int, float]] = []
 
     def _initialize_strategy(self) -> None:
         """Initialize strategy-specific components"""
-        # Initialize price history for each pair
-        for pair in self._trading_pairs:
-            self._price_history[pair] = []
-            self._last_cross[pair] = ""
+        # Initialize price windows for each pair
+        fast_k = int(self.parameters["fast_ma"])
+        slow_k = int(self.parameters["slow_ma"])
+        self._step_kernel, self._batch_kernel = make_kernels(fast_k, slow_k)
+        window = max(fast_k, slow_k)
+        n = len(self._trading_pairs)
+        self._pairs = sorted(self._trading_pairs)
+        self._pair_ix = {pair: i for i, pair in enumerate(self._pairs)}
+        self._buf = np.zeros((n, window), dtype=np.float64)
+        self._idx = np.zeros(n, dtype=np.int64)
+        self._count = np.zeros(n, dtype=np.int64)
+        self._fast_sum = np.zeros(n, dtype=np.float64)
+        self._slow_sum = np.zeros(n, dtype=np.float64)
+        self._last_cross = np.zeros(n, dtype=np.int8)
 
-    def _process_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Process price updates and generate signals"""
-        pair = data["pair"]
-        if pair not in self._trading_pairs:
-            return None
-            
-        price = data["ticker"]["price"]
-        volume = data["ticker"]["volume"]
-        
-        # Update price history
-        self._price_history[pair].append(price)
+    def _subscribe_price_updates(self):
+        """Subscribe once per tracked pair so the event system drops other pairs' ticks"""
+        for pair in self._pairs:
+            event_system.subscribe(EventTypes.PRICE_UPDATE, self._handle_price_update,
+                                   filter_key="pair", filter_value=pair)
+
+    def _unsubscribe_price_updates(self):
+        """Undo _subscribe_price_updates"""
+        for pair in self._pairs:
+            event_system.unsubscribe(EventTypes.PRICE_UPDATE, self._handle_price_update,
+                                     filter_key="pair", filter_value=pair)
+
+    def _handle_price_update(self, event: Event):
+        """Queue ticks; only tracked pairs are delivered, and they are processed together once per frame"""
+        if not self._active:
+            return
+        ticker = event.data
+        self._record_price(ticker.pair, ticker.price)
+        # Low-volume prints are dropped before they reach the averages
+        if ticker.volume < self.parameters["min_volume"]:
+            return
+        self._pending_ticks.append((self._pair_ix[ticker.pair], ticker.price))
+
+    def update(self) -> None:
+        """Process the ticks queued since the last frame, then update the displays"""
+        if self._pending_ticks:
+            try:
+                self._process_pending_ticks()
+            except Exception as e:
+                self.logger.error(f"Error processing price updates: {str(e)}")
+        super().update()
+
+    def _process_pending_ticks(self):
+        """Run queued ticks for all pairs through one batch kernel call and act on the signals"""
+        # Swap rather than clear so ticks arriving meanwhile land in the new list
+        ticks, self._pending_ticks = self._pending_ticks, []
+        pair_ix = np.fromiter((tick[0] for tick in ticks), dtype=np.int64, count=len(ticks))
+        prices = np.fromiter((tick[1] for tick in ticks), dtype=np.float64, count=len(ticks))
         
-        # Keep only needed history
-        max_length = max(self.parameters["fast_ma"], self.parameters["slow_ma"]) * 2
-        if len(self._price_history[pair]) > max_length:
-            self._price_history[pair] = self._price_history[pair][-max_length:]
+        directions, strengths = self._batch_kernel(
+            self._buf, self._idx, self._count, self._fast_sum, self._slow_sum, self._last_cross,
+            pair_ix, prices
+        )
         
-        # Check for sufficient history
-        if len(self._price_history[pair]) < self.parameters["slow_ma"]:
+        for t in np.flatnonzero(directions):
+            self._submit_signal({
+                "pair": self._pairs[pair_ix[t]],
+                "direction": "buy" if directions[t] > 0 else "sell",
+                "strength": float(strengths[t]),
+                "price": float(prices[t])
+            })
+
+    def _process_data(self, ticker: TickerSnapshot) -> Optional[Dict[str, Any]]:
+        """Process a single price update and generate a signal"""
+        i = self._pair_ix.get(ticker.pair)
+        if i is None:
             return None
             
-        # Check volume
-        if volume < self.parameters["min_volume"]:
+        # Low-volume prints neither move the averages nor signal
+        if ticker.volume < self.parameters["min_volume"]:
             return None
             
-        # Calculate moving averages
-        fast_ma = np.mean(self._price_history[pair][-self.parameters["fast_ma"]:])
-        slow_ma = np.mean(self._price_history[pair][-self.parameters["slow_ma"]:])
-        
-        # Generate signals
-        signal = None
-        
-        # Check for crossover
-        if fast_ma > slow_ma:
-            if self._last_cross[pair] != "up":
-                signal = {
-                    "pair": pair,
-                    "direction": "buy",
-                    "strength": (fast_ma - slow_ma) / slow_ma,
-                    "price": price
-                }
-                self._last_cross[pair] = "up"
-        else:
-            if self._last_cross[pair] != "down":
-                signal = {
-                    "pair": pair,
-                    "direction": "sell",
-                    "strength": (slow_ma - fast_ma) / slow_ma,
-                    "price": price
-                }
-                self._last_cross[pair] = "down"
+        price = ticker.price
+        (self._idx[i], self._count[i], self._fast_sum[i], self._slow_sum[i],
+         direction, strength) = self._step_kernel(
+            self._buf[i], self._idx[i], self._count[i],
+            self._fast_sum[i], self._slow_sum[i], price, self._last_cross[i]
+        )
+        if direction == 0:
+            return None
         
-        return signal
+        self._last_cross[i] = direction
+        return {
+            "pair": ticker.pair,
+            "direction": "buy" if direction > 0 else "sell",
+            "strength": strength,
+            "price": price
+        }
 
     def _generate_order(self, signal: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Generate order from signal"""
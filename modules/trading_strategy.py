@@ -1,8 +1,7 @@
 import dearpygui.dearpygui as dpg
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Any, Optional, Tuple, FrozenSet
 from datetime import datetime
 import logging
-from decimal import Decimal
 import json
 import numpy as np
 from abc import ABC, abstractmethod
@@ -10,9 +9,13 @@ from abc import ABC, abstractmethod
 from core.base_module import ModuleBase
 from core.event_system import event_system, Event, EventTypes
 from core.state_manager import state_manager
+from core.data_manager import TickerSnapshot
+from utils.column_history import ColumnHistory
 
 class TradingStrategy(ModuleBase, ABC):
     """Base class for trading strategies"""
+    # Number of recent prices per pair kept for correlation checks
+    PRICE_WINDOW = 256
     
     def __init__(self, module_id: str):
         super().__init__(module_id)
@@ -21,13 +24,20 @@ class TradingStrategy(ModuleBase, ABC):
         
         # Strategy state
         self._active = False
-        self._trading_pairs: List[str] = []
+        self._trading_pairs: FrozenSet[str] = frozenset()
         self._position_sizes: Dict[str, float] = {}
         self._risk_per_trade: float = 0.01  # 1% default
+        # USD account value as of the last balance update, and the largest risk
+        # amount a single order may carry at that value
+        self._account_value: float = 0.0
+        self._risk_per_trade_abs: float = 0.0
         
         # Performance tracking
-        self._trades_history: List[Dict] = []
+        # Closed trades, column-wise: realized PnL and return in percent
+        self._trades_history = ColumnHistory(("pnl", "return_pct"))
         self._performance_metrics: Dict[str, float] = {}
+        # Number of trades the metrics were last computed from
+        self._metrics_trade_count = 0
         
         # Strategy parameters (to be overridden by specific strategies)
         self.parameters: Dict[str, Any] = {}
@@ -36,12 +46,19 @@ class TradingStrategy(ModuleBase, ABC):
         self._max_positions = 3
         self._max_risk_per_pair = 0.05  # 5% default
         self._correlation_threshold = 0.7
+        # Recent prices of the trading pairs: one float32 ring buffer row per pair,
+        # the number of prices written to each row, and each row's z-scores in
+        # chronological order, cached until the row's next price
+        self._pair_row: Dict[str, int] = {}
+        self._price_matrix = np.zeros((8, self.PRICE_WINDOW), dtype=np.float32)
+        self._price_count = np.zeros(8, dtype=np.int64)
+        self._price_z = np.zeros((8, self.PRICE_WINDOW), dtype=np.float32)
+        self._z_valid = np.zeros(8, dtype=bool)
 
     def initialize(self) -> bool:
         """Initialize the strategy"""
         try:
             # Register event handlers
-            event_system.subscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
             event_system.subscribe(EventTypes.ORDER_BOOK_UPDATE, self._handle_orderbook_update)
             event_system.subscribe(EventTypes.TRADE_UPDATE, self._handle_trade_update)
             event_system.subscribe(EventTypes.BALANCE_UPDATE, self._handle_balance_update)
@@ -55,6 +72,9 @@ class TradingStrategy(ModuleBase, ABC):
             # Initialize strategy-specific components
             self._initialize_strategy()
             
+            # Price updates last, once the trading pairs are known
+            self._subscribe_price_updates()
+            
             return True
         except Exception as e:
             self.logger.error(f"Error initializing strategy: {str(e)}")
@@ -106,7 +126,7 @@ class TradingStrategy(ModuleBase, ABC):
         with dpg.group():
             dpg.add_text("Trading Pairs")
             dpg.add_listbox(
-                items=self._trading_pairs,
+                items=sorted(self._trading_pairs),
                 num_items=5,
                 callback=self._update_selected_pairs,
                 tag=f"{self.module_id}_pairs_list"
@@ -131,38 +151,39 @@ class TradingStrategy(ModuleBase, ABC):
             dpg.add_text("Strategy Parameters")
             dpg.add_separator()
             
-            # Add parameter inputs dynamically based on strategy parameters
-            for param_name, param_value in self.parameters.items():
-                if isinstance(param_value, bool):
-                    dpg.add_checkbox(
-                        label=param_name,
-                        default_value=param_value,
-                        callback=lambda s, a, u: self._update_parameter(u, a),
-                        user_data=param_name,
-                        tag=f"{self.module_id}_param_{param_name}"
-                    )
-                elif isinstance(param_value, (int, float)):
-                    dpg.add_input_float(
-                        label=param_name,
-                        default_value=param_value,
-                        callback=lambda s, a, u: self._update_parameter(u, a),
-                        user_data=param_name,
-                        tag=f"{self.module_id}_param_{param_name}"
-                    )
-                elif isinstance(param_value, str):
-                    dpg.add_input_text(
-                        label=param_name,
-                        default_value=param_value,
-                        callback=lambda s, a, u: self._update_parameter(u, a),
-                        user_data=param_name,
-                        tag=f"{self.module_id}_param_{param_name}"
-                    )
+            # Add parameter inputs dynamically based on strategy parameters, one table
+            # row each, all sharing a single bound callback keyed by user_data
+            with dpg.mutex():
+                with dpg.table(header_row=False):
+                    dpg.add_table_column()
+                    dpg.add_table_column()
+                    for param_name, param_value in self.parameters.items():
+                        if isinstance(param_value, bool):
+                            add_input = dpg.add_checkbox
+                        elif isinstance(param_value, (int, float)):
+                            add_input = dpg.add_input_float
+                        elif isinstance(param_value, str):
+                            add_input = dpg.add_input_text
+                        else:
+                            continue
+                        with dpg.table_row():
+                            dpg.add_text(param_name)
+                            add_input(
+                                default_value=param_value,
+                                callback=self._on_parameter_changed,
+                                user_data=param_name,
+                                tag=f"{self.module_id}_param_{param_name}"
+                            )
             
             dpg.add_button(
                 label="Save Parameters",
                 callback=self._save_parameters
             )
 
+    def _on_parameter_changed(self, sender, app_data, user_data):
+        """Parameter input callback; the parameter name is the widget's user_data"""
+        self._update_parameter(user_data, app_data)
+
     def _setup_performance_panel(self):
         """Setup performance monitoring panel"""
         with dpg.group():
@@ -243,9 +264,9 @@ class TradingStrategy(ModuleBase, ABC):
         pass
 
     @abstractmethod
-    def _process_data(self, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _process_data(self, ticker: TickerSnapshot) -> Optional[Dict[str, Any]]:
         """
-        Process incoming market data
+        Process incoming ticker updates
         Returns signal dict if a trading signal is generated
         """
         pass
@@ -269,30 +290,44 @@ class TradingStrategy(ModuleBase, ABC):
             dpg.set_value(f"{self.module_id}_status", "Inactive")
             self.logger.info("Strategy stopped")
 
+    def _subscribe_price_updates(self):
+        """Subscribe to price updates for all pairs"""
+        event_system.subscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
+
+    def _unsubscribe_price_updates(self):
+        """Undo _subscribe_price_updates"""
+        event_system.unsubscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
+
     def _handle_price_update(self, event: Event):
         """Handle price updates"""
         if not self._active:
             return
             
         try:
+            self._record_price(event.data.pair, event.data.price)
+            
             # Process data for signals
             signal = self._process_data(event.data)
             
             if signal:
-                # Generate and validate order
-                order = self._generate_order(signal)
-                
-                if order and self._validate_order(order):
-                    # Submit order
-                    event_system.publish(Event(
-                        type=EventTypes.ORDER_REQUEST,
-                        data=order,
-                        source=self.module_id
-                    ))
+                self._submit_signal(signal)
                     
         except Exception as e:
             self.logger.error(f"Error processing price update: {str(e)}")
 
+    def _submit_signal(self, signal: Dict[str, Any]):
+        """Turn a trading signal into an order request if it passes risk checks"""
+        # Generate and validate order
+        order = self._generate_order(signal)
+        
+        if order and self._validate_order(order):
+            # Submit order
+            event_system.publish(Event(
+                type=EventTypes.ORDER_REQUEST,
+                data=order,
+                source=self.module_id
+            ))
+
     def _validate_order(self, order: Dict[str, Any]) -> bool:
         """Validate order against risk management rules"""
         try:
@@ -301,9 +336,7 @@ class TradingStrategy(ModuleBase, ABC):
                 return False
             
             # Check risk per trade
-            account_value = self._get_account_value()
-            risk_amount = order.get("risk_amount", 0)
-            if risk_amount / account_value > self._risk_per_trade:
+            if order.get("risk_amount", 0) > self._risk_per_trade_abs:
                 return False
             
             # Check correlation with existing positions
@@ -316,28 +349,150 @@ class TradingStrategy(ModuleBase, ABC):
             self.logger.error(f"Error validating order: {str(e)}")
             return False
 
+    def _handle_balance_update(self, event: Event):
+        """Revalue the account so order validation is a plain comparison"""
+        try:
+            account_value = 0.0
+            for asset, balance in event.data["balances"].items():
+                account_value += balance["total"] * state_manager.get_usd_price(asset)
+            self._account_value = account_value
+            self._risk_per_trade_abs = account_value * self._risk_per_trade
+            
+        except Exception as e:
+            self.logger.error(f"Error handling balance update: {str(e)}")
+
+    def _get_account_value(self) -> float:
+        """USD account value as of the last balance update"""
+        return self._account_value
+
+    def _update_risk_settings(self, sender, app_data):
+        """Apply the risk panel inputs"""
+        try:
+            self._risk_per_trade = dpg.get_value(f"{self.module_id}_risk_per_trade") / 100
+            self._max_risk_per_pair = dpg.get_value(f"{self.module_id}_max_risk_per_pair") / 100
+            self._max_positions = dpg.get_value(f"{self.module_id}_max_positions")
+            self._correlation_threshold = dpg.get_value(f"{self.module_id}_correlation_threshold")
+            self._risk_per_trade_abs = self._account_value * self._risk_per_trade
+            
+        except Exception as e:
+            self.logger.error(f"Error updating risk settings: {str(e)}")
+
+    def _record_trade(self, timestamp_us: int, pnl: float, return_pct: float):
+        """
+        Add a closed trade to the history
+        Args:
+            timestamp_us: Close time in epoch microseconds
+            pnl: Realized profit or loss
+            return_pct: Return of the trade in percent
+        """
+        self._trades_history.append(timestamp_us, pnl, return_pct)
+
+    def _update_performance_metrics(self):
+        """Recompute the performance metrics from the trade history when it has grown"""
+        count = len(self._trades_history)
+        if count == self._metrics_trade_count:
+            return
+        self._metrics_trade_count = count
+        
+        try:
+            pnl = self._trades_history.column("pnl")
+            returns = self._trades_history.column("return_pct") / 100
+            
+            equity = np.cumprod(1 + returns)
+            peak = np.maximum(np.maximum.accumulate(equity), 1.0)
+            total_return = (equity[-1] - 1) * 100
+            max_drawdown = (1 - (equity / peak).min()) * 100
+            gains = pnl[pnl > 0].sum()
+            losses = -pnl[pnl < 0].sum()
+            std = returns.std()
+            
+            metrics = {
+                "total_return": total_return,
+                "win_rate": np.count_nonzero(pnl > 0) / count * 100,
+                "profit_factor": gains / losses if losses > 0 else 0.0,
+                "sharpe_ratio": returns.mean() / std * np.sqrt(252) if std > 0 else 0.0,
+                "max_drawdown": max_drawdown,
+                "recovery_factor": total_return / max_drawdown if max_drawdown > 0 else 0.0
+            }
+            self._performance_metrics = {name: float(value) for name, value in metrics.items()}
+            
+            for name, template in (
+                ("total_return", "%.2f%%"),
+                ("win_rate", "%.2f%%"),
+                ("profit_factor", "%.2f"),
+                ("sharpe_ratio", "%.2f"),
+                ("max_drawdown", "%.2f%%"),
+                ("recovery_factor", "%.2f")
+            ):
+                dpg.set_value(f"{self.module_id}_{name}", template % self._performance_metrics[name])
+                
+        except Exception as e:
+            self.logger.error(f"Error updating performance metrics: {str(e)}")
+
+    def _record_price(self, pair: str, price: float):
+        """Write a trading pair's price into its row of the price matrix"""
+        if pair not in self._trading_pairs:
+            return
+        row = self._pair_row.get(pair)
+        if row is None:
+            row = len(self._pair_row)
+            if row == len(self._price_count):
+                self._grow_price_matrix(2 * row)
+            self._pair_row[pair] = row
+        count = self._price_count[row]
+        self._price_matrix[row, count % self.PRICE_WINDOW] = price
+        self._price_count[row] = count + 1
+        self._z_valid[row] = False
+
+    def _grow_price_matrix(self, rows: int):
+        """Reallocate the price matrix and its per-row arrays with room for `rows` pairs"""
+        window = self.PRICE_WINDOW
+        n = len(self._price_count)
+        self._price_matrix = np.vstack((self._price_matrix, np.zeros((rows - n, window), dtype=np.float32)))
+        self._price_z = np.vstack((self._price_z, np.zeros((rows - n, window), dtype=np.float32)))
+        self._price_count = np.resize(self._price_count, rows)
+        self._price_count[n:] = 0
+        self._z_valid = np.resize(self._z_valid, rows)
+        self._z_valid[n:] = False
+
+    def _refresh_zscores(self, rows: np.ndarray):
+        """Recompute the cached z-scores of full rows whose prices changed"""
+        stale = rows[~self._z_valid[rows]]
+        if not stale.size:
+            return
+        window = self.PRICE_WINDOW
+        # Unroll each ring buffer so every row starts at its oldest price
+        columns = (self._price_count[stale, None] + np.arange(window)) % window
+        x = self._price_matrix[stale[:, None], columns]
+        x -= x.mean(axis=1, keepdims=True)
+        std = x.std(axis=1, keepdims=True)
+        # Flat rows get all-zero scores, so they correlate with nothing
+        self._price_z[stale] = np.divide(x, std, out=np.zeros_like(x), where=std > 0)
+        self._z_valid[stale] = True
+
     def _check_correlation(self, pair: str) -> bool:
         """Check correlation with existing positions"""
         try:
             if not self._position_sizes:
                 return True
                 
-            # Get price history for correlation calculation
-            prices = {}
-            for existing_pair in self._position_sizes.keys():
-                prices[existing_pair] = self._get_price_history(existing_pair)
-            prices[pair] = self._get_price_history(pair)
-            
-            # Calculate correlations
-            for existing_pair, existing_prices in prices.items():
-                if existing_pair == pair:
-                    continue
-                    
-                correlation = np.corrcoef(prices[pair], existing_prices)[0, 1]
-                if abs(correlation) > self._correlation_threshold:
-                    return False
+            # Only pairs with a full window of prices can be compared
+            window = self.PRICE_WINDOW
+            candidate = self._pair_row.get(pair)
+            if candidate is None or self._price_count[candidate] < window:
+                return True
+            rows = np.fromiter(
+                (self._pair_row[p] for p in self._position_sizes if p != pair and p in self._pair_row),
+                dtype=np.int64
+            )
+            rows = rows[self._price_count[rows] >= window]
+            if not rows.size:
+                return True
             
-            return True
+            # Correlation with every existing position as one matrix-vector product of z-scores
+            self._refresh_zscores(np.append(rows, candidate))
+            correlations = self._price_z[rows] @ self._price_z[candidate] * (1.0 / window)
+            return not np.any(np.abs(correlations) > self._correlation_threshold)
             
         except Exception as e:
             self.logger.error(f"Error checking correlation: {str(e)}")
@@ -352,7 +507,7 @@ class TradingStrategy(ModuleBase, ABC):
     def cleanup(self) -> None:
         """Cleanup module resources"""
         self.stop_strategy()
-        event_system.unsubscribe(EventTypes.PRICE_UPDATE, self._handle_price_update)
+        self._unsubscribe_price_updates()
         event_system.unsubscribe(EventTypes.ORDER_BOOK_UPDATE, self._handle_orderbook_update)
         event_system.unsubscribe(EventTypes.TRADE_UPDATE, self._handle_trade_update)
         event_system.unsubscribe(EventTypes.BALANCE_UPDATE, self._handle_balance_update)
@@ -364,6 +519,13 @@ class TradingStrategy(ModuleBase, ABC):
             "active": self._active,
             "parameters": self.parameters,
             "position_sizes": self._position_sizes,
-            "trades_history": self._trades_history,
+            "trades_history": [
+                {"timestamp": int(ts), "pnl": float(pnl), "return_pct": float(ret)}
+                for ts, pnl, ret in zip(
+                    self._trades_history.timestamps,
+                    self._trades_history.column("pnl"),
+                    self._trades_history.column("return_pct")
+                )
+            ],
             "performance_metrics": self._performance_metrics
         } 
\ No newline at end of file
@@ -0,0 +1,107 @@
+# utils/column_history.py
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+class ColumnHistory:
+    """
+    Append-only time series stored column-wise in contiguous numpy arrays
+    Timestamps are int64 microseconds since the epoch and every other column
+    is float64. Capacity doubles when full, so appends are amortized O(1)
+    and each column can be sliced without copying. With a maxlen only the
+    newest maxlen samples are kept: the window start advances past dropped
+    samples, and once the buffer (at most twice the maxlen) fills, the window
+    is shifted back to the front so columns stay contiguous
+    """
+    def __init__(self, columns: Sequence[str], capacity: int = 64, maxlen: Optional[int] = None):
+        self.columns = tuple(columns)
+        self.maxlen = maxlen
+        self._start = 0
+        self._end = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._values: Dict[str, np.ndarray] = {
+            name: np.empty(capacity, dtype=np.float64) for name in self.columns
+        }
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """View of the sample times, oldest first"""
+        return self._timestamps[self._start:self._end]
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one value column, oldest first"""
+        return self._values[name][self._start:self._end]
+
+    def append(self, timestamp_us: int, *values: float):
+        """
+        Add a sample
+        Args:
+            timestamp_us: Sample time in epoch microseconds, not older than the last sample
+            values: One value per column, in column order
+        """
+        if self._end == len(self._timestamps):
+            self._make_room(1)
+        i = self._end
+        self._timestamps[i] = timestamp_us
+        for name, value in zip(self.columns, values):
+            self._values[name][i] = value
+        self._end = i + 1
+        self._trim()
+
+    def extend(self, timestamps: Sequence[int], *columns: Sequence[float]):
+        """
+        Add many samples at once
+        Args:
+            timestamps: Sample times in epoch microseconds, oldest first
+            columns: One sequence per column, in column order, each as long as timestamps
+        """
+        n = len(timestamps)
+        if self._end + n > len(self._timestamps):
+            self._make_room(n)
+        end = self._end + n
+        self._timestamps[self._end:end] = timestamps
+        for name, values in zip(self.columns, columns):
+            self._values[name][self._end:end] = values
+        self._end = end
+        self._trim()
+
+    def set_maxlen(self, maxlen: Optional[int]):
+        """Change the retained sample count, dropping the oldest samples beyond it"""
+        self.maxlen = maxlen
+        self._trim()
+
+    def _trim(self):
+        """Advance the window start past samples beyond the maxlen"""
+        if self.maxlen is not None and len(self) > self.maxlen:
+            self._start = self._end - self.maxlen
+
+    def _make_room(self, count: int):
+        """Ensure `count` more samples fit after the window, compacting before growing"""
+        size = len(self)
+        if self._start and size + count <= len(self._timestamps):
+            # Dropped samples left enough space at the front; shift the window down
+            self._timestamps[:size] = self._timestamps[self._start:self._end]
+            for values in self._values.values():
+                values[:size] = values[self._start:self._end]
+            self._start, self._end = 0, size
+            return
+
+        capacity = max(1, 2 * size, size + count)
+        if self.maxlen is not None:
+            capacity = max(min(capacity, 2 * self.maxlen), size + count)
+        self._grow(capacity)
+
+    def _grow(self, capacity: int):
+        """Reallocate every column with room for `capacity` samples, window first"""
+        window = slice(self._start, self._end)
+        size = len(self)
+        timestamps = np.empty(capacity, dtype=np.int64)
+        timestamps[:size] = self._timestamps[window]
+        self._timestamps = timestamps
+        for name, values in self._values.items():
+            grown = np.empty(capacity, dtype=np.float64)
+            grown[:size] = values[window]
+            self._values[name] = grown
+        self._start, self._end = 0, size
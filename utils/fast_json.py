@@ -0,0 +1,54 @@
+# utils/fast_json.py
+from typing import Any, Union
+import json
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+def dumps(obj: Any, indent: bool = False) -> str:
+    """
+    Serialize an object to a JSON string
+    Args:
+        obj: Object to serialize
+        indent: Pretty-print with two-space indentation
+    Returns:
+        str: Compact JSON unless indent is set
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode()
+    if indent:
+        return json.dumps(obj, indent=2)
+    return json.dumps(obj, separators=(",", ":"))
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Serialize an object, which may contain numpy arrays, to compact UTF-8 JSON
+    Args:
+        obj: Object to serialize; numpy arrays are written as lists
+    Returns:
+        bytes: Compact JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":"), default=_to_list).encode()
+
+def _to_list(obj: Any) -> Any:
+    """Fallback encoder hook for numpy arrays and scalars"""
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def loads(data: Union[str, bytes]) -> Any:
+    """
+    Deserialize a JSON document
+    Args:
+        data: JSON text or UTF-8 bytes
+    Returns:
+        Decoded object
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
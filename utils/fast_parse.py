@@ -0,0 +1,63 @@
+# utils/fast_parse.py
+from typing import List, Tuple
+import numpy as np
+
+# Structured record layout for a single trade
+TRADE_DTYPE = np.dtype([
+    ("price", "f8"),
+    ("volume", "f8"),
+    ("time", "f8"),
+    ("side", "U1"),  # "b" (buy) / "s" (sell)
+    ("type", "U1")   # "m" (market) / "l" (limit)
+])
+
+def parse_trades(payload: List) -> np.ndarray:
+    """
+    Convert a decoded trade payload into a structured array
+    Args:
+        payload: List of [price, volume, time, side, type, ...] entries
+    Returns:
+        Array of TRADE_DTYPE records in payload order
+    """
+    trades = np.empty(len(payload), dtype=TRADE_DTYPE)
+    if not payload:
+        return trades
+
+    # Column-wise assignment lets numpy parse each field in one C loop
+    columns = list(zip(*payload))
+    trades["price"] = columns[0]
+    trades["volume"] = columns[1]
+    trades["time"] = columns[2]
+    trades["side"] = columns[3]
+    trades["type"] = columns[4]
+    return trades
+
+def decimal_scale(value: str) -> int:
+    """
+    Get the integer scale implied by a fixed-point decimal string
+    Args:
+        value: Decimal string such as "5541.30000"
+    Returns:
+        10 ** number of fractional digits
+    """
+    _, _, fraction = value.partition(".")
+    return 10 ** len(fraction)
+
+def parse_book_levels(levels: List, price_scale: int, volume_scale: int) -> Tuple[List[Tuple[int, int]], List[int]]:
+    """
+    Convert an order book delta into integer levels to set and remove
+    Args:
+        levels: List of [price, volume, timestamp, ...] entries
+        price_scale: Ticks per unit of price
+        volume_scale: Lots per unit of volume
+    Returns:
+        Tuple of (ticks, lots) updates and tick prices to remove
+    """
+    # Coalesce by price so a later entry for the same level wins
+    deltas = {
+        round(float(level[0]) * price_scale): round(float(level[1]) * volume_scale)
+        for level in levels
+    }
+    updates = [(ticks, lots) for ticks, lots in deltas.items() if lots != 0]
+    removals = [ticks for ticks, lots in deltas.items() if lots == 0]
+    return updates, removals
@@ -1,9 +1,11 @@
 # utils/logger.py
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from queue import SimpleQueue
+import atexit
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import Any, List, Optional
 import os
 
 class TradingLogger:
@@ -20,6 +22,10 @@ class TradingLogger:
         # Trade log file
         self.trade_log = self.log_dir / "trades.log"
         
+        # Background threads writing each logger's records; stopped at exit so queued records are flushed
+        self._listeners: List[QueueListener] = []
+        atexit.register(self.stop)
+        
         # Initialize loggers
         self.main_logger = self._setup_logger("TradingSystem", self.main_log)
         self.error_logger = self._setup_logger("ErrorLog", self.error_log, level=logging.ERROR)
@@ -55,14 +61,28 @@ class TradingLogger:
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+        # QueueHandler formats each record on the calling thread and enqueues it;
+        # a listener thread does the file and console writes, so that I/O never
+        # blocks the logging thread
+        log_queue = SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, console_handler)
+        listener.start()
+        self._listeners.append(listener)
+        
+        logger.addHandler(QueueHandler(log_queue))
         
         return logger
 
+    def stop(self):
+        """Flush queued records and stop the writer threads"""
+        listeners, self._listeners = self._listeners, []
+        for listener in listeners:
+            listener.stop()
+
     def log_trade(self, trade_data: dict):
         """Log trade information"""
-        self.trade_logger.info(f"TRADE: {trade_data}")
+        # The dict is only rendered if the record passes the level check
+        self.trade_logger.info("TRADE: %s", trade_data)
 
     def log_error(self, error_msg: str, exc_info: Optional[Exception] = None):
         """Log error information"""
@@ -71,17 +91,17 @@ class TradingLogger:
         else:
             self.error_logger.error(error_msg)
 
-    def log_info(self, msg: str):
-        """Log general information"""
-        self.main_logger.info(msg)
+    def log_info(self, msg: str, *args: Any):
+        """Log general information, %-formatting args into the message only if it is emitted"""
+        self.main_logger.info(msg, *args)
 
-    def log_warning(self, msg: str):
-        """Log warning information"""
-        self.main_logger.warning(msg)
+    def log_warning(self, msg: str, *args: Any):
+        """Log warning information, %-formatting args into the message only if it is emitted"""
+        self.main_logger.warning(msg, *args)
 
-    def log_debug(self, msg: str):
-        """Log debug information"""
-        self.main_logger.debug(msg)
+    def log_debug(self, msg: str, *args: Any):
+        """Log debug information, %-formatting args into the message only if it is emitted"""
+        self.main_logger.debug(msg, *args)
 
 # Global logger instance
 trading_logger = TradingLogger()
@@ -0,0 +1,135 @@
+# utils/ring_buffer.py
+from typing import Dict, Optional, Tuple
+from multiprocessing import shared_memory
+import numpy as np
+
+# Header words at the start of a shared block
+_HEAD = 0      # Records committed (visible to readers)
+_RESERVED = 1  # Records claimed by the writer, possibly still being copied in
+_HEADER_BYTES = 16
+
+class RingBuffer:
+    """
+    Fixed-capacity ring buffer backed by a numpy array
+    Appends overwrite the oldest records in place without reallocating
+    With shared=True the records live in a SharedMemory block that other
+    processes can map with RingBuffer.attach() and read without pickling
+    """
+    def __init__(self, capacity: int, dtype: np.dtype, shared: bool = False,
+                 name: Optional[str] = None, _create: bool = True):
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._owner = shared and _create
+        # limit -> (head, records) from the last latest() call; reused until the head moves
+        self._latest_cache: Dict[int, Tuple[int, np.ndarray]] = {}
+
+        if shared:
+            size = _HEADER_BYTES + capacity * self.dtype.itemsize
+            self._shm = shared_memory.SharedMemory(name=name, create=_create, size=size)
+            buffer = self._shm.buf
+            self._header = np.ndarray(2, dtype=np.uint64, buffer=buffer)
+            self._buf = np.ndarray(capacity, dtype=self.dtype, buffer=buffer, offset=_HEADER_BYTES)
+            if _create:
+                self._header[:] = 0
+        else:
+            self._header = np.zeros(2, dtype=np.uint64)
+            self._buf = np.empty(capacity, dtype=self.dtype)
+
+    @classmethod
+    def attach(cls, name: str, capacity: int, dtype: np.dtype) -> "RingBuffer":
+        """
+        Map an existing shared ring created by another process
+        Args:
+            name: Shared memory block name
+            capacity: Capacity the ring was created with
+            dtype: Record dtype the ring was created with
+        Returns:
+            Read-side view of the ring
+        """
+        return cls(capacity, dtype, shared=True, name=name, _create=False)
+
+    @property
+    def name(self) -> Optional[str]:
+        """Shared memory block name, or None for a private ring"""
+        return self._shm.name if self._shm else None
+
+    def __len__(self) -> int:
+        return min(self.head, self.capacity)
+
+    @property
+    def head(self) -> int:
+        """Total number of records written since creation"""
+        return int(self._header[_HEAD])
+
+    def extend(self, records: np.ndarray):
+        """
+        Append records, evicting the oldest when full
+        Single writer only; readers may run concurrently in other processes
+        Args:
+            records: Array of records with this buffer's dtype
+        """
+        n = len(records)
+        if n == 0:
+            return
+        head = self.head
+        if n >= self.capacity:
+            # Only the newest `capacity` records survive
+            records = records[-self.capacity:]
+            head += n - self.capacity
+            n = self.capacity
+
+        # Claim the slots before overwriting so readers can detect torn copies
+        self._header[_RESERVED] = head + n
+        start = head % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = records[:first]
+        if first < n:
+            self._buf[:n - first] = records[first:]
+        self._header[_HEAD] = head + n
+
+    def latest(self, limit: int) -> np.ndarray:
+        """
+        Get the most recent records, oldest first
+        Args:
+            limit: Maximum number of records to return
+        Returns:
+            Read-only copy of up to `limit` records, shared between calls
+            until new records arrive
+        """
+        cached = self._latest_cache.get(limit)
+        if cached is not None and cached[0] == self.head:
+            return cached[1]
+
+        while True:
+            head = self.head
+            n = min(limit, head, self.capacity)
+            if n <= 0:
+                return np.empty(0, dtype=self.dtype)
+            end = head % self.capacity
+            start = end - n
+            if start >= 0:
+                records = self._buf[start:end].copy()
+            else:
+                # Wrapped: stitch the tail and head segments together
+                records = np.concatenate((self._buf[start:], self._buf[:end]))
+            # Retry if the writer lapped into the copied slots meanwhile
+            if int(self._header[_RESERVED]) <= head - n + self.capacity:
+                break
+
+        records.flags.writeable = False
+        self._latest_cache[limit] = (head, records)
+        return records
+
+    def close(self):
+        """Release the shared mapping, removing the block if this ring created it"""
+        if self._shm is None:
+            return
+        # Drop the views first; SharedMemory refuses to close with exported buffers
+        self._header = np.zeros(2, dtype=np.uint64)
+        self._buf = np.empty(0, dtype=self.dtype)
+        self._latest_cache.clear()
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+        self._shm = None
@@ -1,27 +1,226 @@
 # utils/websocket_client.py
 
 import websockets
-import json
 import logging
 import asyncio
+import sys
+import functools
 import hmac
 import base64
-import hashlib
 import time
-import urllib.parse
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Any, NamedTuple, Tuple, Union
+from dataclasses import dataclass, field
 from config.config import KRAKEN_API_KEY, KRAKEN_API_SECRET
+from utils import fast_json
+
+# Shared by both connections: frames are small JSON documents, so per-message
+# deflate costs more CPU than it saves, and a bounded size still guards the reader
+CONNECT_OPTIONS = {
+    "compression": None,
+    "max_size": 2 ** 22
+}
+
+# Signed ahead of the nonce in private connection auth
+AUTH_SIGN_PREFIX = b"v2/private/subscribe"
+
+try:
+    import msgspec
+except ImportError:  # Frames are decoded with fast_json and wrapped afterwards
+    msgspec = None
+
+if msgspec is not None:
+    # Data frames are JSON arrays; msgspec decodes them straight into these
+    # structs in one pass, without building the intermediate list
+    class PublicFrame(msgspec.Struct, array_like=True):
+        """Public data frame: [channel id, channel, pair, payload]"""
+        channel_id: Any
+        channel: str
+        pair: str
+        payload: Any
+
+    class PrivateFrame(msgspec.Struct, array_like=True):
+        """Private data frame: [channel id, channel, payload]"""
+        channel_id: Any
+        channel: str
+        payload: Any
+else:
+    class PublicFrame(NamedTuple):
+        """Public data frame: [channel id, channel, pair, payload]"""
+        channel_id: Any
+        channel: str
+        pair: str
+        payload: Any
+
+    class PrivateFrame(NamedTuple):
+        """Private data frame: [channel id, channel, payload]"""
+        channel_id: Any
+        channel: str
+        payload: Any
+
+def frame_decoder(frame_type: type) -> Callable[[Union[str, bytes]], Union[Dict[str, Any], Any]]:
+    """
+    Build a decoder for one websocket stream
+    Args:
+        frame_type: PublicFrame or PrivateFrame
+    Returns:
+        Function decoding a message into an event dict or a frame_type data frame
+    """
+    if msgspec is not None:
+        return msgspec.json.Decoder(Union[frame_type, Dict[str, Any]]).decode
+
+    # msgspec ignores trailing array elements, so the fallback drops them too
+    fields = len(frame_type._fields)
+
+    def decode(message: Union[str, bytes]) -> Union[Dict[str, Any], Any]:
+        data = fast_json.loads(message)
+        return data if isinstance(data, dict) else frame_type(*data[:fields])
+    return decode
+
+@functools.lru_cache(maxsize=256)
+def _public_subscribe_payload(pair: str, channels: Tuple[str, ...]) -> str:
+    """Serialized subscribe request for public channels of one pair"""
+    return fast_json.dumps({
+        "event": "subscribe",
+        "pair": [pair],
+        "subscription": {
+            "name": list(channels)
+        }
+    })
+
+@functools.lru_cache(maxsize=16)
+def _private_subscribe_payload(channels: Tuple[str, ...]) -> str:
+    """Serialized subscribe request for private channels"""
+    return fast_json.dumps({
+        "event": "subscribe",
+        "subscription": {
+            "name": list(channels),
+            "token": KRAKEN_API_KEY
+        }
+    })
+
+@dataclass(slots=True)
+class BookUpdate:
+    """
+    Order book update for a pair, passed to on_order_book
+    Instances are pooled and refilled for later messages once the callback
+    returns, so callbacks must copy anything they keep
+    """
+    pair: str = ""
+    # [price, volume, ...] levels per side; empty when the side did not change
+    bids: List[List[str]] = field(default_factory=list)
+    asks: List[List[str]] = field(default_factory=list)
+    checksum: Optional[str] = None
+
+    def fill(self, pair: str, payload: Dict):
+        """Load a decoded book payload"""
+        self.pair = pair
+        self.bids = payload.get("bids") or []
+        self.asks = payload.get("asks") or []
+        self.checksum = payload.get("checksum")
+
+@dataclass(slots=True)
+class TradeUpdate:
+    """
+    Trades for a pair, passed to on_trade
+    Pooled like BookUpdate; callbacks must copy anything they keep
+    """
+    pair: str = ""
+    # [price, volume, time, side, type, misc] per trade
+    trades: List[List[str]] = field(default_factory=list)
+
+    def fill(self, pair: str, payload: List):
+        """Load a decoded trade payload"""
+        self.pair = pair
+        self.trades = payload
+
+class MessagePool:
+    """
+    Bounded free list of reusable message objects
+    acquire() takes a free object or makes a new one when none is free;
+    release() keeps the object for reuse unless the pool is already full
+    """
+    def __init__(self, factory: Callable[[], Any], size: int = 64):
+        self._factory = factory
+        self._size = size
+        self._free: List[Any] = []
+
+    def acquire(self) -> Any:
+        """Take a message object"""
+        free = self._free
+        return free.pop() if free else self._factory()
+
+    def release(self, message: Any):
+        """Return a message object once nothing references it"""
+        if len(self._free) < self._size:
+            self._free.append(message)
+
+class _ChannelCallback:
+    """
+    Callback attribute that also registers itself in a channel dispatch table
+    Assigning the attribute updates the table, so message handlers route a
+    channel with one dict lookup instead of comparing channel names. With a
+    message type, the table entry fills a pooled message from the pair and
+    payload, passes only that to the callback and recycles it afterwards
+    """
+    def __init__(self, table: str, channel: str, message: Optional[type] = None):
+        self.table = table
+        self.channel = channel
+        self.message = message
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = "_" + name
+
+    def __get__(self, instance: Any, owner: type) -> Optional[Callable]:
+        if instance is None:
+            return self
+        return instance.__dict__.get(self.name)
+
+    def __set__(self, instance: Any, callback: Optional[Callable]):
+        instance.__dict__[self.name] = callback
+        table = instance.__dict__[self.table]
+        if callback is None:
+            table.pop(self.channel, None)
+        elif self.message is None:
+            table[self.channel] = callback
+        else:
+            table[self.channel] = self._pooled(callback, MessagePool(self.message))
+
+    @staticmethod
+    def _pooled(callback: Callable, pool: MessagePool) -> Callable:
+        """Adapt a message callback to the (pair, payload) dispatch signature"""
+        def dispatch(pair: str, payload: Any):
+            message = pool.acquire()
+            message.fill(pair, payload)
+            try:
+                callback(message)
+            finally:
+                pool.release(message)
+        return dispatch
 
 class KrakenWebsocketClient:
     """
     Kraken WebSocket API v2 client
     Handles WebSocket connection and message routing
     """
+    # Data callbacks, each routed from its channel through a dispatch table
+    on_order_book = _ChannelCallback("_public_dispatch", "book", BookUpdate)
+    on_trade = _ChannelCallback("_public_dispatch", "trade", TradeUpdate)
+    on_ticker = _ChannelCallback("_public_dispatch", "ticker")
+    on_own_trades = _ChannelCallback("_private_dispatch", "owns")
+    on_open_orders = _ChannelCallback("_private_dispatch", "openOrders")
+    on_balances = _ChannelCallback("_private_dispatch", "balances")
+
     def __init__(self):
         self.logger = logging.getLogger("KrakenWebSocket")
         self.ws = None
         self.running = False
         
+        # Channel -> callback for the callbacks currently set
+        self._public_dispatch: Dict[str, Callable] = {}
+        self._private_dispatch: Dict[str, Callable] = {}
+        self._decode_public = frame_decoder(PublicFrame)
+        self._decode_private = frame_decoder(PrivateFrame)
+        
         # Callback handlers
         self.on_order_book: Optional[Callable] = None
         self.on_trade: Optional[Callable] = None
@@ -35,6 +234,7 @@ class KrakenWebsocketClient:
         # Private WebSocket connection
         self.ws_private = None
         self.running_private = False
+        self._token: Optional[bytes] = None  # Decoded API secret
         
         # Additional callback handlers for private data
         self.on_own_trades: Optional[Callable] = None
@@ -48,23 +248,19 @@ class KrakenWebsocketClient:
             Dict with authentication headers
         """
         try:
-            nonce = str(int(time.time() * 1000))
-            token = base64.b64decode(KRAKEN_API_SECRET)
-            
-            # Create signature
-            signature_message = f"v2/private/subscribe{nonce}"
-            signature = hmac.new(
-                token,
-                signature_message.encode('utf-8'),
-                hashlib.sha256
-            ).digest()
+            # Millisecond nonce formatted straight to bytes, from integer time
+            nonce = b"%d" % (time.time_ns() // 1_000_000)
+            # The secret never changes, so it is decoded once
+            if self._token is None:
+                self._token = base64.b64decode(KRAKEN_API_SECRET)
             
-            signature_b64 = base64.b64encode(signature).decode('utf-8')
+            # Create signature with the one-shot C HMAC, no HMAC object per call
+            signature = hmac.digest(self._token, AUTH_SIGN_PREFIX + nonce, "sha256")
             
             return {
                 "API-Key": KRAKEN_API_KEY,
-                "API-Sign": signature_b64,
-                "API-Nonce": nonce
+                "API-Sign": base64.b64encode(signature).decode(),
+                "API-Nonce": nonce.decode()
             }
         except Exception as e:
             self.logger.error(f"Error generating auth headers: {str(e)}")
@@ -73,7 +269,7 @@ class KrakenWebsocketClient:
     async def connect(self):
         """Connect to Kraken WebSocket"""
         try:
-            self.ws = await websockets.connect(self.ws_public_url)
+            self.ws = await websockets.connect(self.ws_public_url, **CONNECT_OPTIONS)
             self.running = True
             asyncio.create_task(self._message_handler())
             self.logger.info("Connected to Kraken WebSocket")
@@ -89,7 +285,8 @@ class KrakenWebsocketClient:
             headers = self._get_auth_headers()
             self.ws_private = await websockets.connect(
                 self.ws_private_url,
-                extra_headers=headers
+                additional_headers=headers,
+                **CONNECT_OPTIONS
             )
             self.running_private = True
             asyncio.create_task(self._private_message_handler())
@@ -114,101 +311,95 @@ class KrakenWebsocketClient:
             self.ws_private = None
 
     async def _message_handler(self):
-        """Handle incoming WebSocket messages"""
-        while self.running and self.ws:
-            try:
-                message = await self.ws.recv()
-                data = json.loads(message)
-                
-                if "event" in data:
-                    await self._handle_event(data)
-                else:
-                    await self._handle_data(data)
+        """Handle incoming WebSocket messages until the connection closes"""
+        try:
+            while True:
+                # Raw frame bytes go straight to the decoder, skipping the UTF-8 decode to str
+                message = await self.ws.recv(decode=False)
+                try:
+                    # Decoded inline on purpose: frames must be applied in order, and
+                    # shipping a decoded frame back from a worker process costs more
+                    # than the one-pass msgspec decode itself
+                    data = self._decode_public(message)
                     
-            except websockets.exceptions.ConnectionClosed:
-                self.logger.error("WebSocket connection closed")
-                break
-            except Exception as e:
-                self.logger.error(f"Error handling message: {str(e)}")
-                if self.on_error:
-                    self.on_error(str(e))
+                    if isinstance(data, dict):
+                        await self._handle_event(data)
+                    else:
+                        await self._handle_data(data)
+                        
+                except Exception as e:
+                    self.logger.error("Error handling message: %s", e)
+                    if self.on_error:
+                        self.on_error(str(e))
+        except websockets.exceptions.ConnectionClosedOK:
+            # disconnect() closed the socket
+            pass
+        except websockets.exceptions.ConnectionClosed:
+            self.logger.error("WebSocket connection closed")
 
     async def _handle_event(self, event: Dict):
         """Handle WebSocket events"""
         if event["event"] == "error":
-            self.logger.error(f"WebSocket error event: {event}")
+            self.logger.error("WebSocket error event: %s", event)
             if self.on_error:
                 self.on_error(event["msg"])
 
-    async def _handle_data(self, data: List):
+    async def _handle_data(self, frame: PublicFrame):
         """Handle WebSocket data messages"""
         try:
-            channel = data[1]
-            pair = data[2]
-            payload = data[3]
-
-            if channel == "book":
-                if self.on_order_book:
-                    self.on_order_book(pair, payload)
-            elif channel == "trade":
-                if self.on_trade:
-                    self.on_trade(pair, payload)
-            elif channel == "ticker":
-                if self.on_ticker:
-                    self.on_ticker(pair, payload)
+            callback = self._public_dispatch.get(frame.channel)
+            if callback:
+                # Every message decodes a fresh pair string; the interned copy makes
+                # downstream per-pair dict lookups identity hits
+                callback(sys.intern(frame.pair), frame.payload)
                     
         except Exception as e:
-            self.logger.error(f"Error processing data: {str(e)}")
+            self.logger.error("Error processing data: %s", e)
             if self.on_error:
                 self.on_error(str(e))
 
     async def _private_message_handler(self):
-        """Handle incoming private WebSocket messages"""
-        while self.running_private and self.ws_private:
-            try:
-                message = await self.ws_private.recv()
-                data = json.loads(message)
-                
-                if "event" in data:
-                    await self._handle_private_event(data)
-                else:
-                    await self._handle_private_data(data)
+        """Handle incoming private WebSocket messages until the connection closes"""
+        try:
+            while True:
+                # Raw frame bytes go straight to the decoder, skipping the UTF-8 decode to str
+                message = await self.ws_private.recv(decode=False)
+                try:
+                    data = self._decode_private(message)
                     
-            except websockets.exceptions.ConnectionClosed:
-                self.logger.error("Private WebSocket connection closed")
-                break
-            except Exception as e:
-                self.logger.error(f"Error handling private message: {str(e)}")
-                if self.on_error:
-                    self.on_error(str(e))
+                    if isinstance(data, dict):
+                        await self._handle_private_event(data)
+                    else:
+                        await self._handle_private_data(data)
+                        
+                except Exception as e:
+                    self.logger.error("Error handling private message: %s", e)
+                    if self.on_error:
+                        self.on_error(str(e))
+        except websockets.exceptions.ConnectionClosedOK:
+            # disconnect() closed the socket
+            pass
+        except websockets.exceptions.ConnectionClosed:
+            self.logger.error("Private WebSocket connection closed")
 
     async def _handle_private_event(self, event: Dict):
         """Handle private WebSocket events"""
         if event["event"] == "error":
-            self.logger.error(f"Private WebSocket error event: {event}")
+            self.logger.error("Private WebSocket error event: %s", event)
             if self.on_error:
                 self.on_error(event["msg"])
         elif event["event"] == "subscribed":
-            self.logger.info(f"Successfully subscribed to private channel: {event}")
+            self.logger.info("Successfully subscribed to private channel: %s", event)
 
-    async def _handle_private_data(self, data: List):
+    async def _handle_private_data(self, frame: PrivateFrame):
         """Handle private WebSocket data messages"""
         try:
-            channel = data[1]
-            payload = data[2]
-
-            if channel == "owns":
-                if self.on_own_trades:
-                    self.on_own_trades(payload)
-            elif channel == "openOrders":
-                if self.on_open_orders:
-                    self.on_open_orders(payload)
-            elif channel == "balances":
-                if self.on_balances:
-                    self.on_balances(payload)
+            callback = self._private_dispatch.get(frame.channel)
+            if callback:
+                callback(frame.payload)
                     
         except Exception as e:
-            self.logger.error(f"Error processing private data: {str(e)}")
+            self.logger.error("Error processing private data: %s", e)
             if self.on_error:
                 self.on_error(str(e))
 
@@ -219,15 +410,7 @@ class KrakenWebsocketClient:
             pair: Trading pair
             channels: List of channels to subscribe to
         """
-        message = {
-            "event": "subscribe",
-            "pair": [pair],
-            "subscription": {
-                "name": channels
-            }
-        }
-        
-        await self.ws.send(json.dumps(message))
+        await self.ws.send(_public_subscribe_payload(pair, tuple(channels)))
 
     async def subscribe_private(self, channels: List[str]):
         """
@@ -243,15 +426,7 @@ class KrakenWebsocketClient:
             await self.connect_private()
 
         try:
-            message = {
-                "event": "subscribe",
-                "subscription": {
-                    "name": channels,
-                    "token": KRAKEN_API_KEY
-                }
-            }
-            
-            await self.ws_private.send(json.dumps(message))
+            await self.ws_private.send(_private_subscribe_payload(tuple(channels)))
             self.logger.info(f"Subscribed to private channels: {channels}")
             
         except Exception as e: